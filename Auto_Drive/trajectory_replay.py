@@ -6,6 +6,7 @@ from Motor.motor import MotorController
 from Motor.config import MOTORS
 from Motor.ESP32.main import ESP32SerialReader
 from BLT.continuous_steering import ContinuousSteeringController
+from Motor.watchdog import Watchdog, failsafe
 from Redis.redis_manager import RedisManager
 from GPS.GPS_reader import SerialGPSReader
 from server.config.server_config import REDIS_HOST, BIKE_ID
@@ -25,13 +26,19 @@ class TrajectoryReplayer:
         gps_reader=None,
         redis_client=None,
         bike_id="bike-001",
+        heartbeat=None,
     ):
+        """
+        :param heartbeat: Watchdog heartbeat (Motor/watchdog.py), beaten while
+                          frames are being played and released when done
+        """
         self.filepath = filepath
         self.motor = motor_controller
         self.steering = steering_controller
         self.gps_reader = gps_reader
         self.redis = redis_client
         self.bike_id = bike_id
+        self.heartbeat = heartbeat
         self.trajectory = []
         self.abort_flag = False
 
@@ -60,6 +67,17 @@ class TrajectoryReplayer:
         if self.gps_reader:
             threading.Thread(target=gps_loop, daemon=True).start()
 
+    def _wait(self, delay, slice_seconds=0.01):
+        """Sleep until the next frame, beating the heartbeat meanwhile."""
+        end = time.monotonic() + delay
+        while not self.abort_flag:
+            if self.heartbeat:
+                self.heartbeat.beat()
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(slice_seconds, remaining))
+
     def play(self):
         """
         Play back the recorded throttle and steering commands
@@ -75,6 +93,8 @@ class TrajectoryReplayer:
         for i, frame in enumerate(self.trajectory):
             if self.abort_flag:
                 break
+            if self.heartbeat:
+                self.heartbeat.beat()
 
             now = time.time()
             target_time = now + (frame["timestamp"] - start_time)
@@ -90,7 +110,7 @@ class TrajectoryReplayer:
                 self.motor.motor_control("reverse", speed=pwm)
 
             # Convert normalized steering to angle
-            center_angle = 150.0
+            center_angle = self.steering.center_angle
             angle_delta = steering * 60
             self.steering.set_target_angle(center_angle + angle_delta)
 
@@ -98,17 +118,21 @@ class TrajectoryReplayer:
             if i < len(self.trajectory) - 1:
                 next_ts = self.trajectory[i + 1]["timestamp"]
                 delay = next_ts - frame["timestamp"]
-                time.sleep(max(0.01, delay))
+                self._wait(max(0.01, delay))
 
         print("✅ Trajectory replay finished.")
         self.motor.stop_immediately()
         self.steering.stop()
+        # Finished on purpose: no longer a source the watchdog should expect
+        if self.heartbeat:
+            self.heartbeat.close()
 
 
 # Example usage
 if __name__ == "__main__":
     esp32 = ESP32SerialReader()
     esp32.connect()
+    esp32.start_streaming()
 
     motor = MotorController(MOTORS["big_motor"])
 
@@ -116,14 +140,16 @@ if __name__ == "__main__":
     steering = ContinuousSteeringController(
         motor=steering_motor,
         esp32=esp32,
-        initial_angle=150.0,
-        gear_ratio=1.5,
     )
     steering.start()
 
     gps = SerialGPSReader()
     redis_client = RedisManager(REDIS_HOST, 6379)
 
+    # Cut the drive and center the wheel if the replay stalls or dies
+    watchdog = Watchdog(failsafe(motor, steering), deadline=0.05)
+    watchdog.start()
+
     replayer = TrajectoryReplayer(
         filepath="recorded_drive.json",
         motor_controller=motor,
@@ -131,6 +157,7 @@ if __name__ == "__main__":
         gps_reader=gps,
         redis_client=redis_client,
         bike_id=BIKE_ID,
+        heartbeat=watchdog.register("replay"),
     )
 
     try:
@@ -139,3 +166,5 @@ if __name__ == "__main__":
         print("❌ Ctrl+C detected! Stopping the bike...")
         motor.stop_immediately()
         steering.stop()
+    finally:
+        watchdog.stop()
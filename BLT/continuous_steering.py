@@ -1,11 +1,12 @@
 # continuous_steering.py
 
 import threading
-import time
 import logging
-from Motor.PID.pid_controller import PIDController  # your existing PID class
+from Motor.PID.pid_controller import TimedPIDController
+from Motor.PID.fixed_rate import FixedRateExecutor, LatencyHistogram
 from Motor.ESP32.main import ESP32SerialReader
 from Motor.motor import MotorController
+from Motor.friction import FrictionCompensator
 
 logging.basicConfig(level=logging.INFO)
 
@@ -20,27 +21,65 @@ class ContinuousSteeringController:
         self,
         motor: MotorController,
         esp32: ESP32SerialReader,
-        initial_angle: float = 150.0,
-        gear_ratio: float = 1.0,
+        initial_angle: float = None,
         kp: float = 0.8,
-        ki: float = 0.001,
-        kd: float = 0.05,
+        ki: float = 0.05,
+        kd: float = 0.001,
         output_limits=(-100, 100),
+        period: float = 0.02,
+        feedback_deadline_ms: float = 15.0,
+        max_feedback_age: float = 0.1,
+        hold_period: float = 0.2,
+        settle_tolerance: float = 1.0,
+        settle_time: float = 0.3,
+        track_error: float = 3.0,
+        friction: FrictionCompensator = None,
     ):
         """
         :param motor: MotorController instance for the steering DC motor
         :param esp32: ESP32SerialReader instance for reading the current angle
-        :param initial_angle: Starting target angle (e.g. 150.0 for center)
-        :param gear_ratio: If your motor output ratio differs from the sensor angle
-        :param kp, ki, kd: PID gains
+        :param initial_angle: Starting target angle (defaults to the calibrated center)
+        :param kp, ki, kd: PID gains, ki per second and kd in seconds
+                           (the defaults match the old per-tick 0.001 / 0.05 at 50 Hz)
         :param output_limits: clamp output to e.g. -100..+100 for PWM
+        :param period: Control period in seconds (0.02 = 50 Hz)
+        :param feedback_deadline_ms: Time budget for one angle read; kept below
+                                     the loop period so a lost reply costs one tick
+        :param max_feedback_age: Seconds after which the angle is considered stale
+                                 and the motor is held still instead of steered
+        :param hold_period: Control period in hold mode, once the wheel has settled
+        :param settle_tolerance: Error (°) that counts as on target
+        :param settle_time: Seconds on target before dropping to hold mode
+        :param track_error: Error (°) that wakes hold mode back up to tracking
+        :param friction: Breakaway compensation applied to the PID output
+                         (defaults to the duties saved in the calibration)
         """
         self.motor = motor
         self.esp32 = esp32
-        self.gear_ratio = gear_ratio
+        self.calibration = esp32.calibration
+        self.center_angle = self.calibration.center
+        if initial_angle is None:
+            initial_angle = self.center_angle
+        self.friction = friction or FrictionCompensator.from_calibration(self.calibration)
+        self.feedback_deadline_ms = feedback_deadline_ms
+        self.max_feedback_age = max_feedback_age
+        self.stale_ticks = 0
 
-        # Create one PID instance, always running
-        self.pid = PIDController(
+        # Adaptive rate: "track" runs at period, "hold" at hold_period
+        self.period = period
+        self.hold_period = hold_period
+        self.settle_tolerance = settle_tolerance
+        self.settle_time = settle_time
+        self.track_error = track_error
+        self.mode = "track"
+        self.mode_time = {"track": 0.0, "hold": 0.0}
+        self.mode_switches = 0
+        self.feedback_reads = 0
+        self._settled_since = None
+
+        # Create one PID instance, always running. It integrates over the
+        # measured dt, so a slow serial read no longer changes its behaviour.
+        self.pid = TimedPIDController(
             kp=kp,
             ki=ki,
             kd=kd,
@@ -49,23 +88,52 @@ class ContinuousSteeringController:
         )
 
         self._target_angle = initial_angle
-        self._stop_flag = False
+        # Bumped by set_target_angle; the loop thread alone changes modes and
+        # compares this with the generation its last tick saw
+        self._setpoint_generation = 0
+        self._seen_generation = 0
+        self._feedback_stale = False
+        self.last_angle = None
+        self.last_angle_time = None
+        self.last_output = 0.0
+        self._executor = FixedRateExecutor(self._tick, period=period)
         self._thread = None
+        self._tick_listeners = []
+
+        # Setpoint arrival -> first motor write, see latency_stats()
+        self.setpoint_latency = LatencyHistogram()
+        self._setpoint_arrived = None
 
     def start(self):
         """Start the continuous steering thread."""
         if self._thread and self._thread.is_alive():
             logging.warning("Steering thread is already running!")
             return
-        self._stop_flag = False
-        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._executor.reset()
+        self._thread = threading.Thread(target=self.run, daemon=True)
         self._thread.start()
         logging.info("Continuous Steering Thread started.")
 
+    def run(self):
+        """
+        Run the control loop in the calling thread until stop() is called,
+        driving the motor to match the target angle. start() does this on a
+        background thread; SteeringProcess calls it in its child process.
+        """
+        self.pid.reset()
+        self._enter_mode("track")
+        if hasattr(self.esp32, "add_sample_listener"):
+            self.esp32.add_sample_listener(self._on_sample)
+        try:
+            self._executor.run()
+        finally:
+            if hasattr(self.esp32, "remove_sample_listener"):
+                self.esp32.remove_sample_listener(self._on_sample)
+
     def stop(self):
         """Stop the continuous steering thread."""
-        self._stop_flag = True
-        if self._thread:
+        self._executor.stop()
+        if self._thread and self._thread is not threading.current_thread():
             self._thread.join(timeout=2.0)
         self.motor.stop_immediately()
         logging.info("Continuous Steering Thread stopped.")
@@ -74,35 +142,136 @@ class ContinuousSteeringController:
         """
         Update the steering setpoint in degrees (e.g. 0..300).
         This can be called anytime (e.g. from the joystick).
+        Targets outside the calibrated end stops are clamped.
+        The control loop is woken at once instead of waiting for its next tick,
+        and leaves hold mode on that tick however small the change is.
         """
+        angle = self.calibration.clamp(angle)
+        if self._setpoint_arrived is None:
+            self._setpoint_arrived = self._executor.clock()
         self._target_angle = angle
-        self.pid.setpoint = angle
+        self.pid.set_setpoint(angle)
+        self._setpoint_generation += 1
         logging.info(f"New steering target = {angle:.1f}°")
+        self._executor.wake()
 
-    def _run_loop(self):
+    @property
+    def feedback_stale(self):
+        """True while the motor is held because the angle feedback is too old."""
+        return self._feedback_stale
+
+    def add_tick_listener(self, callback):
+        """Call callback(controller) on the loop thread after every control tick."""
+        self._tick_listeners.append(callback)
+
+    def _on_sample(self, sample):
+        """
+        Streaming-thread callback for each fresh angle sample. Wakes the loop
+        when it is waiting on feedback: holding on stale data, or in hold
+        mode with the wheel pushed off target.
         """
-        PID loop that continuously runs in the background, driving the motor
-        to match the target angle from self._target_angle / self.pid.setpoint.
+        if self._feedback_stale or (
+            self.mode == "hold" and abs(self.pid.setpoint - sample.angle) > self.track_error
+        ):
+            self._executor.wake()
+
+    def loop_stats(self):
+        """Scheduling jitter of the control loop (ticks, overruns, p50/p99/max ms)."""
+        return self._executor.stats.summary()
+
+    def mode_stats(self):
         """
-        # min_pwm = 20
-        while not self._stop_flag:
-            current_angle = self.esp32.request_data()  # e.g. 0..300
-            if current_angle is not None:
-                # Optionally apply gear ratio if your pot angle differs from actual motor angle
-                # pot_angle = current_angle / self.gear_ratio
+        Time spent tracking vs holding, and how many angle requests hold mode
+        saved compared with polling at the tracking rate the whole time.
+        """
+        elapsed = self.mode_time["track"] + self.mode_time["hold"]
+        return {
+            "mode": self.mode,
+            "track_s": self.mode_time["track"],
+            "hold_s": self.mode_time["hold"],
+            "switches": self.mode_switches,
+            "feedback_reads": self.feedback_reads,
+            "requests_saved": max(0, int(elapsed / self.period) - self.feedback_reads),
+        }
+
+    def latency_stats(self):
+        """Time from set_target_angle to the first motor write acting on it."""
+        return self.setpoint_latency.summary()
+
+    def _enter_mode(self, mode):
+        if mode == self.mode:
+            return
+        self.mode = mode
+        self.mode_switches += 1
+        self._settled_since = None
+        self._executor.period = self.hold_period if mode == "hold" else self.period
+        logging.debug(f"Steering loop → {mode} mode")
+
+    def _tick(self, dt):
+        self._step(dt)
+        for callback in self._tick_listeners:
+            callback(self)
+
+    def _step(self, dt):
+        """One control tick; dt is the measured time since the previous tick."""
+        self.mode_time[self.mode] += dt
+        # Read before the setpoint, so a change landing mid-tick is seen next tick
+        generation = self._setpoint_generation
+        self.feedback_reads += 1
+        reading = self.esp32.read_angle(deadline_ms=self.feedback_deadline_ms)
+        if reading.value is None or reading.age > self.max_feedback_age:
+            # Don't steer on an old angle; hold the motor until feedback returns
+            self.stale_ticks += 1
+            if not self._feedback_stale:
+                logging.warning(
+                    f"⚠️ Steering feedback stale ({reading.age * 1000:.0f} ms), holding motor"
+                )
+                self.motor.stop_immediately()
+                self._feedback_stale = True
+            return
+
+        if self._feedback_stale:
+            logging.info("✅ Steering feedback restored")
+            self._feedback_stale = False
+            self.pid.reset()
+
+        # Already linearised by the ESP32 reader's calibration table
+        current_angle = reading.value  # e.g. 0..300
+        self.last_angle, self.last_angle_time = current_angle, reading.timestamp
+        error = self.pid.setpoint - current_angle
+        new_setpoint = generation != self._seen_generation
+        self._seen_generation = generation
 
-                control_output = self.pid.compute(current_angle)
+        if self.mode == "hold":
+            if not new_setpoint and abs(error) <= self.track_error:
+                return
+            # New setpoint, or pushed off target: steer again
+            self._enter_mode("track")
+        elif new_setpoint:
+            self._settled_since = None
 
-                # control_output ~ -100..+100 from the PID
-                direction = "left" if control_output > 0 else "right"
+        control_output = self.pid.compute(current_angle, dt)
+        self.last_output = control_output
 
-                speed = min(100, abs(control_output))
-                # if 0 < speed < min_pwm:
-                #     speed = min_pwm
+        # control_output ~ -100..+100 from the PID; lift it out of the deadband
+        duty = self.friction.compensate(control_output, error)
+        direction = "left" if duty > 0 else "right"
 
-                self.motor.motor_control(direction=direction, speed=speed)
+        speed = min(100, abs(duty))
 
-                # If error is small, you could optionally do a partial stop, but usually
-                # we let the PID keep it stable. That might require a small Ki for hold.
+        self.motor.motor_control(direction=direction, speed=speed)
+        arrived, self._setpoint_arrived = self._setpoint_arrived, None
+        if arrived is not None:
+            self.setpoint_latency.record(self._executor.clock() - arrived)
 
-            time.sleep(0.02)  # 50 Hz update
+        # Settled for long enough: park the motor and poll slowly
+        if abs(error) > self.settle_tolerance:
+            self._settled_since = None
+        else:
+            now = self._executor.clock()
+            if self._settled_since is None:
+                self._settled_since = now
+            elif now - self._settled_since >= self.settle_time:
+                self.motor.stop_immediately()
+                self.pid.reset()
+                self._enter_mode("hold")
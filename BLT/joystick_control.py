@@ -13,8 +13,14 @@ class GamepadController:
         2: "RX",  # Right stick X-axis => steering
     }
 
-    def __init__(self, device_path="/dev/input/event4"):
+    def __init__(self, device_path="/dev/input/event4", heartbeat=None):
+        """
+        :param device_path: evdev device of the gamepad
+        :param heartbeat: Watchdog heartbeat (Motor/watchdog.py), beaten on
+                          every pass of the input loop
+        """
         self.device_path = device_path
+        self.heartbeat = heartbeat
         self.gamepad = None
         self.axis_state = {"LY": 0.0, "RX": 0.0}
         self.running = False
@@ -47,9 +53,19 @@ class GamepadController:
     def process_controller_inputs(self):
         """Process inputs from the gamepad."""
         while self.running:
+            # Beat even when the sticks are still; a disconnect raises out of
+            # read() and ends the loop, which the watchdog then notices
+            if self.heartbeat:
+                self.heartbeat.beat()
             r, _, _ = select([self.gamepad.fd], [], [], 0.01)
             if r:
-                for event in self.gamepad.read():
+                try:
+                    events = list(self.gamepad.read())
+                except OSError as e:
+                    print(f"🎮 Gamepad lost: {e}")
+                    self.running = False
+                    return
+                for event in events:
                     if event.type == ecodes.EV_ABS:
                         code = event.code
                         axis_name = self.AXIS_CODES.get(code)
@@ -141,9 +157,14 @@ class DriveController:
 class SteeringController:
     """Controls the steering mechanism."""
 
-    def __init__(self, continuous_controller, center_angle=150.0, max_angle_delta=60):
+    def __init__(self, continuous_controller, center_angle=None, max_angle_delta=60):
         self.steering_controller = continuous_controller
-        self.center_angle = center_angle
+        # Default to the calibrated center loaded by the continuous controller
+        self.center_angle = (
+            center_angle
+            if center_angle is not None
+            else continuous_controller.center_angle
+        )
         self.max_angle_delta = max_angle_delta
 
     def handle_steering_input(self, value):
@@ -170,11 +191,21 @@ class SteeringController:
 class RCCarController:
     """Main controller class for the RC car."""
 
-    def __init__(self):
+    def __init__(self, steering_process=False, steering_cpu=None, steering_priority=None,
+                 watchdog_deadline=0.05):
+        """
+        :param steering_process: Run the steering loop in its own process
+                                 (BLT/steering_process.py) instead of a thread
+        :param steering_cpu: CPU to pin the steering process to
+        :param steering_priority: SCHED_FIFO priority for the steering process
+        :param watchdog_deadline: Seconds of gamepad silence before the drive is
+                                  cut and the steering centered (None = off)
+        """
         # Existing setup...
         from Motor.motor import MotorController
         from Motor.config import MOTORS
         from Motor.ESP32.main import ESP32SerialReader
+        from Motor.watchdog import Watchdog
         from BLT.continuous_steering import ContinuousSteeringController
 
         # GPS + Redis
@@ -190,22 +221,39 @@ class RCCarController:
         self.big_motor = MotorController(MOTORS["big_motor"])
         self.drive_controller = DriveController(self.big_motor)
 
-        self.esp32 = ESP32SerialReader()
-        self.steering_motor = MotorController(MOTORS["small_motor"])
-        self.continuous_steering = ContinuousSteeringController(
-            motor=self.steering_motor,
-            esp32=self.esp32,
-            initial_angle=150.0,
-            gear_ratio=1.5,
-        )
+        if steering_process:
+            from BLT.steering_process import SteeringProcess
+
+            # Motor and ESP32 are opened inside the steering process
+            self.esp32 = None
+            self.steering_motor = None
+            self.continuous_steering = SteeringProcess(
+                cpu=steering_cpu, realtime_priority=steering_priority
+            )
+        else:
+            self.esp32 = ESP32SerialReader()
+            self.steering_motor = MotorController(MOTORS["small_motor"])
+            self.continuous_steering = ContinuousSteeringController(
+                motor=self.steering_motor,
+                esp32=self.esp32,
+            )
         self.steering_controller = SteeringController(self.continuous_steering)
 
-        # Gamepad
+        # Gamepad, watched: if its loop stops the drive is cut and the wheel centered
         self.gamepad = GamepadController()
+        self.watchdog = (
+            Watchdog(self._failsafe, deadline=watchdog_deadline) if watchdog_deadline else None
+        )
+
+    def _failsafe(self, source, silence):
+        self.drive_controller.stop()
+        self.steering_controller.center_steering()
 
     def initialize(self):
         """Initialize all components."""
-        self.esp32.connect()
+        if self.esp32:
+            self.esp32.connect()
+            self.esp32.start_streaming()
         self.continuous_steering.start()
 
         # Start GPS loop
@@ -227,19 +275,27 @@ class RCCarController:
             print("Failed to initialize components.")
             return False
 
-        # Start gamepad input processing
+        # Start gamepad input processing, watched from its first beat on
+        if self.watchdog:
+            self.gamepad.heartbeat = self.watchdog.register("gamepad")
         self.gamepad.start()
+        if self.watchdog:
+            self.watchdog.start()
         print("RC Car Controller started. Press Ctrl+C to exit.")
         return True
 
     def stop(self):
         """Stop all components."""
         print("Shutting down RC Car Controller...")
+        if self.watchdog:
+            self.watchdog.stop()
         self.gamepad.stop()
         self.drive_controller.stop()
         self.steering_controller.stop()
-        self.steering_motor.cleanup()
-        self.esp32.close()
+        if self.steering_motor:
+            self.steering_motor.cleanup()
+        if self.esp32:
+            self.esp32.close()
         print("Shutdown complete.")
 
     def start_gps_thread(self):
@@ -264,7 +320,23 @@ class RCCarController:
 
 def main():
     """Main entry point."""
-    rc_car = RCCarController()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gamepad control for the bike")
+    parser.add_argument("--steering-process", action="store_true",
+                        help="Run the steering loop in a separate process")
+    parser.add_argument("--steering-cpu", type=int, default=None)
+    parser.add_argument("--steering-priority", type=int, default=None)
+    parser.add_argument("--watchdog-deadline", type=float, default=0.05,
+                        help="Seconds of gamepad silence before the failsafe (0 = off)")
+    args = parser.parse_args()
+
+    rc_car = RCCarController(
+        steering_process=args.steering_process,
+        steering_cpu=args.steering_cpu,
+        steering_priority=args.steering_priority,
+        watchdog_deadline=args.watchdog_deadline,
+    )
 
     try:
         if rc_car.start():
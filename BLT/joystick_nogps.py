@@ -107,9 +107,14 @@ class DriveController:
 
 
 class SteeringController:
-    def __init__(self, continuous_controller, center_angle=150.0, max_angle_delta=60):
+    def __init__(self, continuous_controller, center_angle=None, max_angle_delta=60):
         self.steering_controller = continuous_controller
-        self.center_angle = center_angle
+        # Default to the calibrated center loaded by the continuous controller
+        self.center_angle = (
+            center_angle
+            if center_angle is not None
+            else continuous_controller.center_angle
+        )
         self.max_angle_delta = max_angle_delta
         self.latest_steering = 0.0
 
@@ -145,8 +150,6 @@ class RCCarController:
         self.continuous_steering = ContinuousSteeringController(
             motor=self.steering_motor,
             esp32=self.esp32,
-            initial_angle=150.0,
-            gear_ratio=1.5,
         )
         self.steering_controller = SteeringController(self.continuous_steering)
 
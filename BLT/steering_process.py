@@ -0,0 +1,367 @@
+# steering_process.py
+
+"""
+Host the steering PID loop in its own process so GIL stalls from the
+gamepad, GPS, logging and MQTT threads cannot delay it.
+
+The parent talks to the child through a small shared-memory block
+(setpoint in, angle and loop health out) plus two events (wake, stop).
+SteeringProcess has the same start/stop/set_target_angle API as
+ContinuousSteeringController, so it can be dropped into SteeringController.
+
+    python3 -m BLT.steering_process --benchmark
+"""
+
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+from Motor.calibration import SteeringCalibration
+
+logging.basicConfig(level=logging.INFO)
+
+
+class SharedSteeringState:
+    """
+    Fixed-layout shared-memory block. 8-byte fields come first so every
+    double is naturally aligned and written in one store.
+    """
+
+    FIELDS = (
+        ("setpoint", "d"),
+        ("setpoint_seq", "Q"),
+        ("angle", "d"),
+        ("angle_time", "d"),
+        ("output", "d"),
+        ("heartbeat", "d"),
+        ("ticks", "Q"),
+        ("overruns", "Q"),
+        ("mean_lateness", "d"),
+        ("p99_lateness", "d"),
+        ("max_lateness", "d"),
+        ("stale", "i"),
+        ("hold", "i"),
+    )
+
+    def __init__(self, name=None):
+        self._offsets = {}
+        offset = 0
+        for field, fmt in self.FIELDS:
+            self._offsets[field] = (offset, "<" + fmt)
+            offset += struct.calcsize(fmt)
+        self.size = offset
+
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.size)
+            self.shm.buf[: self.size] = bytes(self.size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+
+    def get(self, field):
+        offset, fmt = self._offsets[field]
+        return struct.unpack_from(fmt, self.shm.buf, offset)[0]
+
+    def set(self, field, value):
+        offset, fmt = self._offsets[field]
+        struct.pack_into(fmt, self.shm.buf, offset, value)
+
+    def snapshot(self):
+        return {field: self.get(field) for field, _ in self.FIELDS}
+
+    def close(self, unlink=False):
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def apply_realtime(cpu=None, priority=None):
+    """
+    Pin the calling process to one CPU and/or switch it to SCHED_FIFO.
+    Both need privileges on most systems; failures are logged, not raised.
+    """
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cpu})
+            logging.info(f"📌 Steering process pinned to CPU {cpu}")
+        except (AttributeError, OSError) as e:
+            logging.warning(f"⚠️ Could not pin steering process to CPU {cpu}: {e}")
+    if priority is not None:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+            logging.info(f"⏱️ Steering process running SCHED_FIFO priority {priority}")
+        except (AttributeError, OSError) as e:
+            logging.warning(f"⚠️ Could not set SCHED_FIFO priority {priority}: {e}")
+
+
+def hardware_factory():
+    """Build the real steering motor and ESP32 reader inside the child process."""
+    from Motor.config import MOTORS
+    from Motor.motor import MotorController
+    from Motor.ESP32.main import ESP32SerialReader
+
+    esp32 = ESP32SerialReader()
+    esp32.connect()
+    esp32.start_streaming()
+    return MotorController(MOTORS["small_motor"]), esp32
+
+
+def simulated_factory():
+    """Simulated steering hardware, for benchmarks and bench testing."""
+    from Motor.simulation import SimulatedESP32, SimulatedMotor, SimulatedSteeringPlant
+
+    plant = SimulatedSteeringPlant()
+    return SimulatedMotor(plant), SimulatedESP32(plant)
+
+
+def _child_main(factory, shm_name, wake, stop, options, cpu, priority):
+    from BLT.continuous_steering import ContinuousSteeringController
+
+    apply_realtime(cpu, priority)
+    state = SharedSteeringState(shm_name)
+    motor, esp32 = factory()
+    controller = ContinuousSteeringController(motor, esp32, **options)
+    ticks = 0
+
+    def publish(controller):
+        nonlocal ticks
+        ticks += 1
+        state.set("heartbeat", time.monotonic())
+        if controller.last_angle is not None:
+            state.set("angle", controller.last_angle)
+            state.set("angle_time", controller.last_angle_time)
+        state.set("output", controller.last_output)
+        state.set("stale", int(controller.feedback_stale))
+        state.set("hold", int(controller.mode == "hold"))
+        if ticks % 10 == 0:
+            stats = controller.loop_stats()
+            state.set("ticks", stats["ticks"])
+            state.set("overruns", stats["overruns"])
+            state.set("mean_lateness", stats.get("mean_ms", 0.0) / 1000)
+            state.set("p99_lateness", stats.get("p99_ms", 0.0) / 1000)
+            state.set("max_lateness", stats.get("max_ms", 0.0) / 1000)
+
+    def relay():
+        # Hand new setpoints to the controller the way a joystick thread would
+        seen_seq = 0
+        while not stop.is_set():
+            if wake.wait(0.1):
+                wake.clear()
+            seq = state.get("setpoint_seq")
+            if seq != seen_seq:
+                seen_seq = seq
+                controller.set_target_angle(state.get("setpoint"))
+        controller.stop()
+
+    controller.add_tick_listener(publish)
+    threading.Thread(target=relay, daemon=True).start()
+    try:
+        controller.run()
+    finally:
+        motor.stop_immediately()
+        if hasattr(motor, "cleanup"):
+            motor.cleanup()
+        esp32.close()
+        state.close()
+
+
+class SteeringProcess:
+    """
+    Drop-in replacement for ContinuousSteeringController that runs the
+    control loop in a child process.
+    """
+
+    def __init__(
+        self,
+        factory=hardware_factory,
+        cpu=None,
+        realtime_priority=None,
+        calibration=None,
+        **controller_options,
+    ):
+        """
+        :param factory: Module-level callable returning (motor, esp32); it runs
+                        in the child, so hardware is only opened there
+        :param cpu: CPU to pin the child to (None = no pinning)
+        :param realtime_priority: SCHED_FIFO priority 1..99 (None = normal)
+        :param calibration: Used for center_angle and clamping in the parent
+        :param controller_options: Passed on to ContinuousSteeringController
+        """
+        self.factory = factory
+        self.cpu = cpu
+        self.realtime_priority = realtime_priority
+        self.calibration = calibration or SteeringCalibration.load()
+        self.center_angle = self.calibration.center
+        self.controller_options = controller_options
+
+        # spawn: the child must not inherit the parent's threads and locks
+        self._ctx = mp.get_context("spawn")
+        self._wake = self._ctx.Event()
+        self._stop = self._ctx.Event()
+        self._state = None
+        self._process = None
+        self._target = controller_options.get("initial_angle")
+
+    def start(self):
+        """Start the steering process."""
+        if self._process and self._process.is_alive():
+            logging.warning("Steering process is already running!")
+            return
+        self._state = SharedSteeringState()
+        # A target set before start() becomes the child's initial setpoint
+        initial = self._target if self._target is not None else self.center_angle
+        self._state.set("setpoint", initial)
+        options = dict(self.controller_options, initial_angle=initial)
+        self._wake.clear()
+        self._stop.clear()
+        self._process = self._ctx.Process(
+            target=_child_main,
+            args=(
+                self.factory,
+                self._state.name,
+                self._wake,
+                self._stop,
+                options,
+                self.cpu,
+                self.realtime_priority,
+            ),
+            daemon=True,
+        )
+        self._process.start()
+        logging.info(f"Steering process started (pid {self._process.pid}).")
+
+    def stop(self):
+        """Stop the steering process; the child stops the motor on exit."""
+        self._stop.set()
+        if self._process:
+            self._process.join(timeout=2.0)
+            if self._process.is_alive():
+                logging.warning("⚠️ Steering process did not exit, terminating")
+                self._process.terminate()
+                self._process.join(timeout=1.0)
+        if self._state:
+            self._state.close(unlink=True)
+            self._state = None
+        logging.info("Steering process stopped.")
+
+    def set_target_angle(self, angle: float):
+        """
+        Update the steering setpoint in degrees; the child is woken at once.
+        Before start() the target is kept and used as the initial setpoint.
+        """
+        angle = self.calibration.clamp(angle)
+        self._target = angle
+        if self._state is None:
+            return
+        self._state.set("setpoint", angle)
+        self._state.set("setpoint_seq", self._state.get("setpoint_seq") + 1)
+        self._wake.set()
+
+    @property
+    def current_angle(self):
+        return self._state.get("angle") if self._state else None
+
+    def health(self):
+        """Child liveness and loop state from the shared block."""
+        if not self._state:
+            return {"alive": False}
+        snapshot = self._state.snapshot()
+        return {
+            "alive": bool(self._process and self._process.is_alive()),
+            "heartbeat_age": time.monotonic() - snapshot["heartbeat"],
+            "angle": snapshot["angle"],
+            "setpoint": snapshot["setpoint"],
+            "output": snapshot["output"],
+            "stale": bool(snapshot["stale"]),
+            "hold": bool(snapshot["hold"]),
+        }
+
+    def loop_stats(self):
+        """Scheduling jitter of the child's control loop (same keys as the thread's)."""
+        if not self._state:
+            return {"ticks": 0, "overruns": 0}
+        snapshot = self._state.snapshot()
+        return {
+            "ticks": snapshot["ticks"],
+            "overruns": snapshot["overruns"],
+            "mean_ms": snapshot["mean_lateness"] * 1000,
+            "p99_ms": snapshot["p99_lateness"] * 1000,
+            "max_ms": snapshot["max_lateness"] * 1000,
+        }
+
+
+def _burn_cpu(stop):
+    """Synthetic load: JSON encoding, like the logging and Redis threads do."""
+    import json
+
+    payload = {"samples": [{"t": i * 0.02, "angle": 150.0 + i % 7} for i in range(2000)]}
+    while not stop.is_set():
+        json.loads(json.dumps(payload))
+
+
+def benchmark(duration=10.0, load_threads=3, cpu=None, priority=None):
+    """Compare loop jitter with the controller in a thread vs a child process."""
+    from BLT.continuous_steering import ContinuousSteeringController
+
+    results = {}
+    for mode in ("thread", "process"):
+        if mode == "thread":
+            motor, esp32 = simulated_factory()
+            controller = ContinuousSteeringController(motor, esp32)
+        else:
+            controller = SteeringProcess(
+                factory=simulated_factory,
+                cpu=cpu,
+                realtime_priority=priority,
+                calibration=SteeringCalibration.linear(),
+            )
+
+        stop_load = threading.Event()
+        loads = [
+            threading.Thread(target=_burn_cpu, args=(stop_load,), daemon=True)
+            for _ in range(load_threads)
+        ]
+        controller.start()
+        for t in loads:
+            t.start()
+
+        start = time.monotonic()
+        while time.monotonic() - start < duration:
+            # Swing the setpoint like a driver would
+            controller.set_target_angle(150.0 + (30.0 if int(time.monotonic()) % 2 else -30.0))
+            time.sleep(0.25)
+
+        results[mode] = controller.loop_stats()
+        stop_load.set()
+        controller.stop()
+        for t in loads:
+            t.join()
+
+    print(f"📊 Steering loop jitter under {load_threads} load threads, {duration:.0f} s each")
+    print(f"{'mode':>8} {'ticks':>6} {'overruns':>9} {'mean ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for mode, stats in results.items():
+        print(
+            f"{mode:>8} {stats['ticks']:6d} {stats['overruns']:9d} {stats.get('mean_ms', 0):8.2f} "
+            f"{stats.get('p99_ms', 0):8.2f} {stats.get('max_ms', 0):8.2f}"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Steering loop in a separate process")
+    parser.add_argument("--benchmark", action="store_true", help="Thread vs process jitter")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--load-threads", type=int, default=3)
+    parser.add_argument("--cpu", type=int, default=None, help="Pin the steering process")
+    parser.add_argument("--priority", type=int, default=None, help="SCHED_FIFO priority")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.duration, args.load_threads, args.cpu, args.priority)
+    else:
+        parser.print_help()
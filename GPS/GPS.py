@@ -3,7 +3,7 @@ from abc import ABC, abstractmethod
 from typing import Optional
 
 from Redis.redis_manager import RedisManager
-import serial
+from GPS.GPS_reader import GPSDrain
 
 # Redis Configuration
 REDIS_HOST = "3.15.51.67"
@@ -77,27 +77,28 @@ class NMEAParser:
 
 # --- Concrete Implementation for Serial GPS Reader ---
 class SerialGPSReader(IGPSReader):
-    """Handles GPS communication and data reading via a serial connection."""
-
-    def __init__(self, port: str = "/dev/ttyAMA0", baudrate: int = 9600):
-        self.serial_connection = serial.Serial(port, baudrate, timeout=1)
+    """
+    Newest fix from the shared drain thread of the port (GPS/GPS_reader.py),
+    so this reader never competes with other readers for lines.
+    """
+
+    def __init__(self, port: str = "/dev/ttyAMA0", baudrate: int = 9600, max_fix_age: float = 2.0):
+        """
+        :param max_fix_age: Seconds after which read_data() stops returning
+                            the last fix (None, as when the receiver is silent)
+        """
+        self.drain = GPSDrain.for_port(port, baudrate)
+        self.max_fix_age = max_fix_age
+        self._closed = False
 
     def read_data(self) -> Optional[dict]:
-        try:
-            line = (
-                self.serial_connection.readline()
-                .decode("utf-8", errors="ignore")
-                .strip()
-            )
-            if line.startswith("$GNGGA") or line.startswith("$GNRMC"):
-                return NMEAParser.parse(line)
-            return None
-        except Exception as e:
-            print(f"Error reading GPS data: {e}")
-            return None
+        reading = self.drain.store.latest(self.max_fix_age)
+        return None if reading is None else reading.value
 
     def close(self) -> None:
-        self.serial_connection.close()
+        if not self._closed:
+            self._closed = True
+            self.drain.release()
 
 
 # --- GPS Service (Coordinating GPS reading and data storage) ---
@@ -1,24 +1,51 @@
 # GPS/gps_reader.py
 
+import argparse
+import threading
+import time
+from collections import deque
+
 import serial
 from typing import Optional
 
+from GPS import ubx
+from GPS.fix_assembler import FixAssembler
+from Motor.PID.fixed_rate import LatencyHistogram
+from Transport.serial_transaction import Reading
+
+KNOTS_TO_MPS = 0.514444
+
 
 class NMEAParser:
+    """
+    The old one-sentence parser (no checksum, GGA/RMC only). The live path
+    no longer uses it: GPSDrain decodes UBX NAV-PVT, or NMEA through
+    FixAssembler. Kept as the baseline of the benchmarks.
+    """
+
     @staticmethod
     def parse(sentence: str) -> Optional[dict]:
-        parts = sentence.split(",")
-        if parts[0] == "$GNGGA":
+        parts = sentence.split("*")[0].split(",")
+        # Any talker: GN (multi-GNSS), GP (GPS only), ...
+        kind = parts[0][3:]
+        if kind == "GGA":
             return {
-                "type": "GNGGA",
+                "type": parts[0][1:],
+                "time": parts[1],
                 "latitude": NMEAParser.convert_latitude(parts[2], parts[3]),
                 "longitude": NMEAParser.convert_longitude(parts[4], parts[5]),
+                "fix_quality": int(parts[6] or 0),
+                "satellites": int(parts[7] or 0),
             }
-        elif parts[0] == "$GNRMC":
+        elif kind == "RMC":
             return {
-                "type": "GNRMC",
+                "type": parts[0][1:],
+                "time": parts[1],
                 "latitude": NMEAParser.convert_latitude(parts[3], parts[4]),
                 "longitude": NMEAParser.convert_longitude(parts[5], parts[6]),
+                "speed_knots": NMEAParser.convert_speed(parts[7]),
+                "speed_mps": NMEAParser.convert_speed(parts[7], KNOTS_TO_MPS),
+                "status": "Valid" if parts[2] == "A" else "Warning",
             }
         return None
 
@@ -38,24 +65,386 @@ class NMEAParser:
         minutes = float(value[3:]) / 60
         return round(degrees + minutes, 6) * (-1 if direction == "W" else 1)
 
+    @staticmethod
+    def convert_speed(value: str, scale: float = 1.0) -> Optional[float]:
+        if not value:
+            return None
+        return float(value) * scale
 
-class SerialGPSReader:
-    def __init__(self, port: str = "/dev/ttyAMA0", baudrate: int = 9600):
-        self.serial_connection = serial.Serial(port, baudrate, timeout=1)
 
-    def read_data(self) -> Optional[dict]:
+class FixStore:
+    """
+    Newest GPS fix plus a short history, shared by every consumer of a port.
+
+    Each fix is kept as a Reading stamped with its receive time. Consumers
+    read without blocking. `staleness` records the age of each fix when a
+    consumer first gets it, however often the store is polled.
+    """
+
+    def __init__(self, history=32):
+        self._history = deque(maxlen=history)
+        self._latest = None
+        self._condition = threading.Condition()
+        self.sequence = 0
+        self.staleness = LatencyHistogram()
+        self._recorded = 0  # sequence of the last fix whose age was recorded
+
+    def put(self, fix, received=None):
+        if received is None:
+            received = time.monotonic()
+        with self._condition:
+            self._latest = Reading(fix, received)
+            self._history.append(self._latest)
+            self.sequence += 1
+            self._condition.notify_all()
+
+    def latest(self, max_age=None) -> Optional[Reading]:
+        """Newest fix, or None if there is none (or it is older than max_age)."""
+        with self._condition:
+            reading = self._latest
+            if reading is None or (max_age is not None and reading.age > max_age):
+                return None
+            self._record(reading)
+        return reading
+
+    def wait_newer(self, sequence, timeout) -> Optional[Reading]:
+        """Block until a fix newer than `sequence` arrives; None on timeout."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.sequence > sequence, timeout):
+                return None
+            reading = self._latest
+            self._record(reading)
+        return reading
+
+    def _record(self, reading):
+        """Record the newest fix's age once. Caller holds the condition."""
+        if self._recorded != self.sequence:
+            self._recorded = self.sequence
+            self.staleness.record(reading.age)
+
+    def history(self, since=None):
+        """Fixes oldest first, optionally only those received after `since`."""
+        with self._condition:
+            readings = list(self._history)
+        if since is None:
+            return readings
+        return [r for r in readings if r.timestamp > since]
+
+
+class GPSDrain:
+    """
+    The one thread reading a GPS port. It drains every sentence as it
+    arrives, so the OS buffer never backs up, assembles each epoch with a
+    FixAssembler (checksums, GGA/RMC/GSA/VTG merge, quality gates) and
+    publishes the accepted fixes to a FixStore as dicts (GNSSFix.to_dict).
+    In UBX mode the receiver is switched to NAV-PVT first (GPS/ubx.py) and
+    the stream is decoded as UBX; if that fails the drain stays on NMEA.
+    Use for_port() so all readers of a port share one drain.
+    """
+
+    _drains = {}
+    _registry_lock = threading.Lock()
+
+    @classmethod
+    def for_port(cls, port, baudrate=9600, **kwargs):
+        """Shared drain for port, started on first use."""
+        while True:
+            with cls._registry_lock:
+                drain = cls._drains.get(port)
+                created = drain is None
+                if created:
+                    drain = cls(port, baudrate, **kwargs)
+                    cls._drains[port] = drain
+                drain.users += 1
+            if created:
+                break
+            drain.ready.wait()
+            if drain._running:
+                return drain
+            # The first user's start() failed and dropped the drain: try again
+
+        # The UBX handshake takes a while: only users of this port wait for it
         try:
-            line = (
-                self.serial_connection.readline()
-                .decode("utf-8", errors="ignore")
-                .strip()
-            )
-            if line.startswith("$GNGGA") or line.startswith("$GNRMC"):
-                return NMEAParser.parse(line)
-            return None
-        except Exception as e:
-            print(f"Error reading GPS data: {e}")
-            return None
+            drain.start()
+        except Exception:
+            # Out of the registry before waiters wake, so none of them gets it
+            with cls._registry_lock:
+                if cls._drains.get(port) is drain:
+                    del cls._drains[port]
+            drain.stop()
+            raise
+        finally:
+            drain.ready.set()
+        return drain
+
+    def __init__(self, port, baudrate=9600, history=32, ser=None, assembler=None,
+                 ubx_mode=False, ubx_baudrate=115200, rate_hz=10):
+        """
+        :param port: Serial device of the receiver
+        :param baudrate: Receiver baud rate
+        :param history: Fixes kept in the store
+        :param ser: Already-open serial object (tests, simulations)
+        :param assembler: FixAssembler with the quality thresholds to apply
+        :param ubx_mode: Switch the receiver to UBX NAV-PVT in start()
+        :param ubx_baudrate: UART speed in UBX mode
+        :param rate_hz: Navigation rate in UBX mode
+        """
+        self.port = port
+        self.ser = ser or serial.Serial(port, baudrate, timeout=0.1)
+        self.store = FixStore(history)
+        self.assembler = assembler or FixAssembler()
+        self.ubx = None
+        self.protocol = "nmea"
+        self._ubx_setup = (ubx_baudrate, rate_hz) if ubx_mode else None
+        self.ready = threading.Event()  # set once started, see for_port()
+        self.users = 0
+        self._listeners = []
+        self._buffer = bytearray()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._ubx_setup is not None:
+            ubx_baudrate, rate_hz = self._ubx_setup
+            self._ubx_setup = None
+            try:
+                ubx.configure(self.ser, ubx_baudrate, rate_hz)
+                self.ubx = ubx.UBXParser()
+                self.protocol = "ubx"
+            except ubx.UBXConfigError as e:
+                print(f"⚠️ GPS UBX setup failed ({e}), staying on NMEA")
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def release(self):
+        """Drop one user; the last one stops the thread and closes the port."""
+        with self._registry_lock:
+            self.users -= 1
+            if self.users > 0:
+                return
+            if self._drains.get(self.port) is self:
+                del self._drains[self.port]
+        self.stop()
+
+    def stop(self):
+        self._running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        if self.ser.is_open:
+            self.ser.close()
+
+    def add_listener(self, callback):
+        """
+        Call callback(fix) from the drain thread for every accepted fix,
+        e.g. to see each speed exactly once. Keep callbacks short.
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _run(self):
+        while self._running:
+            try:
+                chunk = self.ser.read(self.ser.in_waiting or 1)
+            except (serial.SerialException, OSError) as e:
+                if not self._running:
+                    return
+                print(f"Error reading GPS data: {e}")
+                time.sleep(0.5)
+                continue
+            if not chunk:
+                continue
+            received = time.monotonic()
+            if self.ubx is not None:
+                for fix in self.ubx.feed(chunk, received):
+                    if fix["accepted"]:
+                        self._publish(fix, received)
+                continue
+            self._buffer += chunk
+            while True:
+                end = self._buffer.find(b"\n")
+                if end < 0:
+                    break
+                line = bytes(self._buffer[:end])
+                del self._buffer[: end + 1]
+                self._handle(line, received)
+
+    def _handle(self, line, received):
+        fix = self.assembler.feed(line, received)
+        if fix is not None and fix.accepted:
+            self._publish(fix.to_dict(), received)
+
+    def _publish(self, fix, received):
+        self.store.put(fix, received)
+        for callback in list(self._listeners):
+            try:
+                callback(fix)
+            except Exception as e:
+                print(f"❗ GPS listener error: {e}")
+
+    def stats(self):
+        decoder = self.ubx if self.ubx is not None else self.assembler
+        return {
+            "protocol": self.protocol,
+            **decoder.stats(),
+            "fixes": self.store.sequence,
+            "backlog_bytes": self.ser.in_waiting if self.ser.is_open else 0,
+            "staleness": self.store.staleness.summary(),
+        }
+
+
+class SerialGPSReader:
+    """
+    Consumer handle on the shared drain of a GPS port. Any number of readers
+    may exist for the same port; none of them touches the serial link.
+    """
+
+    def __init__(
+        self,
+        port: str = "/dev/ttyAMA0",
+        baudrate: int = 9600,
+        deadline_ms: float = 1000,
+        ubx: bool = False,
+        ubx_baudrate: int = 115200,
+        rate_hz: float = 10,
+        max_fix_age: float = 2.0,
+    ):
+        """
+        :param port: Serial device of the receiver
+        :param baudrate: Receiver's baud rate at power-up
+        :param deadline_ms: Default wait of read()
+        :param ubx: Switch the receiver to UBX NAV-PVT (falls back to NMEA);
+                    only the first reader of a port configures it
+        :param ubx_baudrate: UART speed in UBX mode
+        :param rate_hz: Navigation rate in UBX mode
+        :param max_fix_age: Default max_age of read_data(): once the receiver
+                            stops sending, it returns None again after this
+                            many seconds instead of the last fix forever
+        """
+        self.drain = GPSDrain.for_port(
+            port, baudrate, ubx_mode=ubx, ubx_baudrate=ubx_baudrate, rate_hz=rate_hz
+        )
+        self.store = self.drain.store
+        self.deadline_ms = deadline_ms
+        self.max_fix_age = max_fix_age
+        self._seen = 0
+        self._closed = False
+
+    def read(self, deadline_ms: Optional[float] = None) -> Reading:
+        """
+        Wait up to deadline_ms for a fix newer than the last one this reader
+        returned. On timeout the newest fix is returned flagged as a
+        fallback, with its age.
+        """
+        if deadline_ms is None:
+            deadline_ms = self.deadline_ms
+        reading = self.store.wait_newer(self._seen, deadline_ms / 1000.0)
+        if reading is not None:
+            self._seen = self.store.sequence
+            return reading
+        last = self.store.latest()
+        if last is None:
+            return Reading(None, None, True)
+        return Reading(last.value, last.timestamp, True)
+
+    def read_data(self, max_age: Optional[float] = None) -> Optional[dict]:
+        """
+        Newest fix without blocking; None if there is none yet or it is older
+        than max_age (default max_fix_age).
+        """
+        if max_age is None:
+            max_age = self.max_fix_age
+        reading = self.store.latest(max_age)
+        return None if reading is None else reading.value
+
+    def latest(self, max_age: Optional[float] = None) -> Optional[Reading]:
+        """Newest fix as a Reading (value, receive time, age)."""
+        return self.store.latest(max_age)
+
+    def history(self, since=None):
+        return self.store.history(since)
+
+    def add_listener(self, callback):
+        self.drain.add_listener(callback)
+
+    def remove_listener(self, callback):
+        self.drain.remove_listener(callback)
+
+    def stats(self):
+        return self.drain.stats()
 
     def close(self) -> None:
-        self.serial_connection.close()
+        if not self._closed:
+            self._closed = True
+            self.drain.release()
+
+
+def benchmark(seconds=8.0):
+    """
+    Age of the position handed to a 1 Hz consumer (the gps_loop pattern)
+    when it reads one line per call, against reading the drained store.
+    """
+    from GPS.fake_gps import FakeGPS
+
+    def run(drained):
+        gps = FakeGPS().start()
+        ages = []
+        try:
+            if drained:
+                reader = SerialGPSReader(gps.port)
+            else:
+                ser = serial.Serial(gps.port, 9600, timeout=1)
+            time.sleep(0.5)  # consumer out of phase with the receiver epochs
+            end = time.monotonic() + seconds
+            while time.monotonic() < end:
+                time.sleep(1)
+                if drained:
+                    fix = reader.read_data()
+                else:
+                    # The old reader: one line per call, GGA/RMC only
+                    line = ser.readline().decode("ascii", errors="ignore").strip()
+                    fix = NMEAParser.parse(line) if line[3:6] in ("GGA", "RMC") else None
+                if fix and fix.get("time") in gps.sent_at:
+                    ages.append(time.monotonic() - gps.sent_at[fix["time"]])
+            if drained:
+                stats = reader.stats()
+                reader.close()
+            else:
+                stats = {"backlog_bytes": ser.in_waiting}
+                ser.close()
+        finally:
+            gps.stop()
+        return ages, stats
+
+    for label, drained in (("line per call", False), ("drain thread", True)):
+        ages, stats = run(drained)
+        shown = ", ".join(f"{a:.2f}" for a in ages)
+        print(f"📡 {label:>13}: fix age at consumption [{shown}] s, "
+              f"{len(ages)} positions, backlog {stats['backlog_bytes']} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared GPS reader")
+    parser.add_argument("--port", default="/dev/ttyAMA0")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Compare fix ages against the one-line-per-call reader (pty GPS)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    else:
+        gps = SerialGPSReader(args.port, args.baudrate)
+        try:
+            while True:
+                reading = gps.latest()
+                if reading:
+                    print(f"[GPS] {reading.value} (age {reading.age:.2f}s)")
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(f"Stopped. {gps.stats()}")
+        finally:
+            gps.close()
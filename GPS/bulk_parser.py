@@ -0,0 +1,353 @@
+"""
+Bulk NMEA parsing for recorded captures.
+
+NMEAParser decodes, splits and converts one sentence at a time, which is
+fine for a live 1 Hz receiver but slow for the multi-hour logs we
+reprocess after field tests. parse_file()/parse_buffer() work on the raw
+bytes of a whole capture with NumPy instead: sentence starts, checksums
+(XOR of each sentence via reduceat), field boundaries (comma positions)
+and numbers are all found for every sentence at once, and the result is
+one row per RMC epoch in columnar arrays. The matching GGA of the same
+epoch adds the fix quality, satellites and HDOP.
+
+Large files are memory-mapped and processed in chunks that end on a line
+break, so memory stays bounded whatever the capture length.
+
+    python3 -m GPS.bulk_parser capture.nmea
+    python3 -m GPS.bulk_parser --benchmark
+"""
+
+import argparse
+import mmap
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+KNOTS_TO_MPS = 0.514444
+
+_DOLLAR, _STAR, _COMMA = 36, 42, 44
+_DOT, _ZERO = 46, 48
+_MAX_WIDTH = 16
+_OFFSETS = np.arange(_MAX_WIDTH)
+_POWERS = 10.0 ** np.arange(-_MAX_WIDTH, _MAX_WIDTH)
+
+# Value of every byte as a decimal digit: dot and field separator count as 0,
+# anything else is NaN
+_DIGITS = np.full(256, np.nan)
+_DIGITS[_ZERO:_ZERO + 10] = np.arange(10)
+_DIGITS[_DOT] = _DIGITS[_COMMA] = 0.0
+
+# Hex digit value of every byte, 255 for anything that is not one
+_HEX = np.full(256, 255, dtype=np.uint8)
+for _i, _c in enumerate(b"0123456789ABCDEF"):
+    _HEX[_c] = _i
+for _i, _c in enumerate(b"abcdef"):
+    _HEX[_c] = 10 + _i
+
+
+@dataclass
+class NMEAColumns:
+    """One row per RMC epoch of a capture, as NumPy columns."""
+
+    time: np.ndarray  # UTC seconds since midnight
+    latitude: np.ndarray
+    longitude: np.ndarray
+    speed_mps: np.ndarray
+    course: np.ndarray
+    valid: np.ndarray  # RMC status A
+    fix_quality: np.ndarray  # GGA quality, -1 when the epoch had no GGA
+    satellites: np.ndarray  # -1 when the epoch had no GGA
+    hdop: np.ndarray  # NaN when the epoch had no GGA
+    counts: dict = field(default_factory=dict)
+
+    def __len__(self):
+        return len(self.time)
+
+
+def _decimal(buf, start, end, width):
+    """
+    Parse the ASCII numbers buf[start:end] (one per row, digits and at most
+    one dot) without leaving NumPy. Empty, too wide or malformed fields
+    give NaN.
+    """
+    length = end - start
+    offsets = _OFFSETS[:width]
+    # Right-align every field so digit j always weighs 10^(width - 1 - j);
+    # positions left of the field all read its leading comma, a zero digit
+    index = np.maximum(end[:, None] - width + offsets, (start - 1)[:, None])
+    chars = buf[index]
+
+    # Stray characters map to NaN and poison their row
+    number = _DIGITS[chars] @ _POWERS[_MAX_WIDTH + width - 1 - offsets]
+    # The dot counts as a zero digit: number = integer * 10^(f + 1) + fraction
+    dot = chars == _DOT
+    dots = dot.sum(axis=1)
+    fraction_digits = np.where(dots > 0, width - 1 - dot.argmax(axis=1), -1)
+    # Both powers are exact: 10^(f + 1) >= 1, and the fraction is only
+    # divided by 10^f when there is one
+    unit = _POWERS[_MAX_WIDTH + fraction_digits + 1]
+    integer = np.floor(number / unit)
+    value = integer + (number - integer * unit) / _POWERS[_MAX_WIDTH + fraction_digits]
+    value[(length <= 0) | (length > width) | (dots > 1)] = np.nan
+    return value
+
+
+def _coordinate(buf, start, end, hemisphere_at, negative_hemisphere):
+    """ddmm.mmmm / dddmm.mmmm plus hemisphere field -> signed degrees."""
+    raw = _decimal(buf, start, end, 12)
+    degrees = np.floor(raw / 100)
+    value = degrees + (raw - degrees * 100) / 60
+    return np.where(buf[hemisphere_at] == negative_hemisphere, -value, value)
+
+
+def _utc_seconds(raw):
+    """hhmmss.ss -> seconds since midnight."""
+    hours = np.floor(raw / 10_000)
+    minutes = np.floor(raw / 100) % 100
+    return hours * 3600 + minutes * 60 + raw % 100
+
+
+def _parse_chunk(buf, base, counts):
+    """
+    Sentence-level columns of the GGA and RMC sentences in buf, each with
+    its absolute position (base + offset) for pairing them up later.
+    """
+    dollars = np.flatnonzero(buf == _DOLLAR)
+    counts["sentences"] += len(dollars)
+    # A sentence runs to the next '$' (or the end of the chunk)
+    next_start = np.append(dollars[1:], len(buf))
+    # Talker-independent kind check before any further work ($GNRMC, $GPGGA, ...)
+    last = len(buf) - 1
+    c3 = buf[np.minimum(dollars + 3, last)]
+    c4 = buf[np.minimum(dollars + 4, last)]
+    c5 = buf[np.minimum(dollars + 5, last)]
+    is_rmc = (c3 == ord("R")) & (c4 == ord("M")) & (c5 == ord("C"))
+    is_gga = (c3 == ord("G")) & (c4 == ord("G")) & (c5 == ord("A"))
+    keep = (is_rmc | is_gga) & (dollars + 6 < len(buf))
+    counts["ignored"] += int(np.count_nonzero(~keep))
+    starts, next_start, is_rmc = dollars[keep], next_start[keep], is_rmc[keep]
+
+    # Each sentence ends at its '*', which must come before the next one starts
+    stars = np.append(np.flatnonzero(buf == _STAR), len(buf))
+    star = stars[np.searchsorted(stars, starts)]
+    framed = (star < next_start) & (star + 2 < len(buf))
+    counts["malformed"] += int(np.count_nonzero(~framed))
+    starts, star, is_rmc = starts[framed], star[framed], is_rmc[framed]
+
+    # XOR of everything between '$' and '*': reduceat over [start+1, star) pairs
+    if len(starts):
+        bounds = np.empty(2 * len(starts), dtype=np.int64)
+        bounds[0::2] = starts + 1
+        bounds[1::2] = star
+        computed = np.bitwise_xor.reduceat(buf, bounds)[0::2]
+        expected = _HEX[buf[star + 1]].astype(np.int16) * 16 + _HEX[buf[star + 2]]
+        ok = computed == expected
+    else:
+        ok = np.zeros(0, dtype=bool)
+    counts["checksum_errors"] += int(np.count_nonzero(~ok))
+    starts, star, is_rmc = starts[ok], star[ok], is_rmc[ok]
+
+    # Field k of a sentence lies between its (k-1)th and kth comma
+    commas = np.append(np.flatnonzero(buf == _COMMA), np.full(10, len(buf) + 1))
+    first = np.searchsorted(commas, starts)
+
+    def sentence_fields(mask, needed):
+        s, end = starts[mask], star[mask]
+        c = commas[first[mask][:, None] + np.arange(needed + 1)]
+        complete = c[:, needed] <= end
+        counts["malformed"] += int(np.count_nonzero(~complete))
+        return base + s[complete], c[complete]
+
+    rmc_pos, c = sentence_fields(is_rmc, 9)
+    rmc = {
+        "pos": rmc_pos,
+        "time": _utc_seconds(_decimal(buf, c[:, 0] + 1, c[:, 1], 12)),
+        "valid": buf[np.minimum(c[:, 1] + 1, len(buf) - 1)] == ord("A"),
+        "latitude": _coordinate(buf, c[:, 2] + 1, c[:, 3], c[:, 3] + 1, ord("S")),
+        "longitude": _coordinate(buf, c[:, 4] + 1, c[:, 5], c[:, 5] + 1, ord("W")),
+        "speed_mps": _decimal(buf, c[:, 6] + 1, c[:, 7], 10) * KNOTS_TO_MPS,
+        "course": _decimal(buf, c[:, 7] + 1, c[:, 8], 8),
+    }
+
+    gga_pos, c = sentence_fields(~is_rmc, 8)
+    gga = {
+        "pos": gga_pos,
+        "time": _utc_seconds(_decimal(buf, c[:, 0] + 1, c[:, 1], 12)),
+        "fix_quality": _decimal(buf, c[:, 5] + 1, c[:, 6], 2),
+        "satellites": _decimal(buf, c[:, 6] + 1, c[:, 7], 3),
+        "hdop": _decimal(buf, c[:, 7] + 1, c[:, 8], 6),
+    }
+    return rmc, gga
+
+
+def _join(rmc, gga, counts):
+    """Attach to every RMC the GGA of the same epoch (the neighbour with its time)."""
+    n = len(rmc["pos"])
+    match = np.full(n, -1, dtype=np.int64)
+    if len(gga["pos"]):
+        after = np.searchsorted(gga["pos"], rmc["pos"])
+        for candidate in (after, after - 1):  # BN-220 sends RMC first, so prefer the next GGA
+            inside = (candidate >= 0) & (candidate < len(gga["pos"])) & (match < 0)
+            safe = np.clip(candidate, 0, len(gga["pos"]) - 1)
+            same = inside & (gga["time"][safe] == rmc["time"])
+            match[same] = candidate[same]
+    found = match >= 0
+    counts["epochs"] = n
+    counts["without_gga"] = int(n - np.count_nonzero(found))
+
+    def gga_column(name, missing, dtype):
+        column = np.full(n, missing, dtype=dtype)
+        values = gga[name][match[found]]
+        if np.issubdtype(dtype, np.integer):
+            values = np.nan_to_num(values, nan=missing)
+        column[found] = values
+        return column
+
+    return NMEAColumns(
+        time=rmc["time"],
+        latitude=rmc["latitude"],
+        longitude=rmc["longitude"],
+        speed_mps=rmc["speed_mps"],
+        course=rmc["course"],
+        valid=rmc["valid"],
+        fix_quality=gga_column("fix_quality", -1, np.int8),
+        satellites=gga_column("satellites", -1, np.int16),
+        hdop=gga_column("hdop", np.nan, np.float64),
+        counts=counts,
+    )
+
+
+def _new_counts():
+    return {"sentences": 0, "ignored": 0, "malformed": 0, "checksum_errors": 0}
+
+
+def _concat(parts):
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+def _parse_chunks(data, chunk_bytes):
+    counts = _new_counts()
+    rmc_parts, gga_parts = [], []
+    offset, size = 0, len(data)
+    while offset < size:
+        end = min(offset + chunk_bytes, size)
+        if end < size:
+            # Cut after the last complete line; a single oversized line is taken whole
+            cut = data.rfind(b"\n", offset, end)
+            end = cut + 1 if cut >= offset else size
+        buf = np.frombuffer(data, dtype=np.uint8, count=end - offset, offset=offset)
+        rmc, gga = _parse_chunk(buf, offset, counts)
+        rmc_parts.append(rmc)
+        gga_parts.append(gga)
+        offset = end
+    if not rmc_parts:
+        rmc, gga = _parse_chunk(np.zeros(0, dtype=np.uint8), 0, counts)
+        rmc_parts, gga_parts = [rmc], [gga]
+    return _join(_concat(rmc_parts), _concat(gga_parts), counts)
+
+
+def parse_buffer(data, chunk_bytes=64 << 20) -> NMEAColumns:
+    """
+    Parse NMEA held in memory (bytes, bytearray or mmap).
+    :param chunk_bytes: Bytes handed to NumPy at a time (bounds temporary arrays)
+    """
+    return _parse_chunks(data, chunk_bytes)
+
+
+def parse_file(path, chunk_bytes=64 << 20, mmap_threshold=8 << 20) -> NMEAColumns:
+    """
+    Parse an NMEA capture file. Files of mmap_threshold bytes or more are
+    memory-mapped rather than read into memory.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if size == 0:
+            return parse_buffer(b"")
+        if size < mmap_threshold:
+            return parse_buffer(f.read(), chunk_bytes)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            columns = parse_buffer(data, chunk_bytes)
+            # The columns are computed arrays, none of them views of the map
+            return columns
+
+
+def benchmark(epochs=100_000, path=None):
+    """
+    Parse a large capture in bulk and line by line with NMEAParser, and
+    check that both agree on every clean RMC.
+    """
+    from GPS.GPS_reader import NMEAParser
+    from GPS.fake_gps import FakeGPS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if path is None:
+            path = os.path.join(tmp, "capture.nmea")
+            count = FakeGPS().capture(path, epochs, degraded_every=20, corrupt_every=500)
+            print(f"📝 Capture: {count} sentences, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        start = time.perf_counter()
+        columns = parse_file(path)
+        bulk = time.perf_counter() - start
+        counts = columns.counts
+        print(f"🧮 Bulk: {bulk:.3f} s, {counts['sentences'] / bulk / 1e3:.0f}k sentences/s, "
+              f"{len(columns)} epochs")
+        print(f"   {counts}")
+
+        start = time.perf_counter()
+        rmc = []
+        with open(path, "rb") as f:
+            for line in f:
+                line = line.decode("ascii", errors="ignore").strip()
+                if line[3:6] not in ("GGA", "RMC"):
+                    continue
+                try:
+                    fix = NMEAParser.parse(line)
+                except (IndexError, ValueError):
+                    continue
+                if fix["type"].endswith("RMC"):
+                    rmc.append(fix)
+        per_line = time.perf_counter() - start
+        lines = counts["sentences"]
+        print(f"📄 Per-line NMEAParser: {per_line:.2f} s, {lines / per_line / 1e3:.0f}k sentences/s "
+              f"-> bulk is {per_line / bulk:.1f}x faster")
+
+        # NMEAParser has no checksum, so it also returns the corrupted RMCs;
+        # compare on the epochs both have
+        by_time = {}
+        for fix in rmc:
+            t = fix["time"]
+            seconds = int(t[:2]) * 3600 + int(t[2:4]) * 60 + float(t[4:])
+            by_time.setdefault(round(seconds, 2), fix)
+        worst = 0.0
+        for i in range(len(columns)):
+            fix = by_time.get(round(float(columns.time[i]), 2))
+            if fix is None:
+                continue
+            worst = max(worst, abs(fix["latitude"] - columns.latitude[i]),
+                        abs(fix["longitude"] - columns.longitude[i]),
+                        abs(fix["speed_mps"] - columns.speed_mps[i]))
+        print(f"✅ Largest difference to NMEAParser: {worst:.1e} (it rounds to 1e-6 degrees)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk NMEA capture parser")
+    parser.add_argument("capture", nargs="?", help="NMEA capture to parse")
+    parser.add_argument("--benchmark", action="store_true", help="Compare with NMEAParser")
+    parser.add_argument("--epochs", type=int, default=100_000)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.epochs, args.capture)
+    elif args.capture:
+        columns = parse_file(args.capture)
+        good = columns.valid & (columns.fix_quality > 0)
+        print(f"{len(columns)} epochs, {np.count_nonzero(good)} with a fix: {columns.counts}")
+        if np.any(good):
+            print(f"🗺️ lat {np.nanmin(columns.latitude[good]):.6f}..{np.nanmax(columns.latitude[good]):.6f}, "
+                  f"lon {np.nanmin(columns.longitude[good]):.6f}..{np.nanmax(columns.longitude[good]):.6f}, "
+                  f"max speed {np.nanmax(columns.speed_mps[good]):.2f} m/s")
+    else:
+        parser.print_help()
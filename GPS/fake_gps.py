@@ -0,0 +1,255 @@
+import os
+import pty
+import select
+import struct
+import threading
+import time
+import tty
+from functools import reduce
+
+from GPS import ubx
+
+
+def nmea_checksum(body):
+    """XOR of the characters between '$' and '*', as two hex digits."""
+    return f"{reduce(lambda acc, c: acc ^ ord(c), body, 0):02X}"
+
+
+def nmea_sentence(body):
+    return f"${body}*{nmea_checksum(body)}\r\n".encode("ascii")
+
+
+def _nmea_coordinate(value, degree_digits, positive, negative):
+    hemisphere = positive if value >= 0 else negative
+    value = abs(value)
+    degrees = int(value)
+    minutes = (value - degrees) * 60
+    return f"{degrees:0{degree_digits}d}{minutes:08.5f}", hemisphere
+
+
+class FakeGPS:
+    """
+    Emulates a BN-220 style NMEA receiver on a pseudo-terminal.
+
+    Every epoch (1 / rate_hz seconds) it sends RMC, VTG, GGA, GSA and three
+    GSV sentences, in the receiver's order and paced at the emulated baud
+    rate, for a bike moving north at speed_mps. The UTC time field counts
+    epochs from 00:00:00, and the time each epoch went on the wire is kept
+    in `sent_at` so the host can measure how old a fix is when it is
+    consumed. capture() writes the same stream to a file, without a pty.
+    """
+
+    def __init__(self, rate_hz=1.0, baudrate=9600, latitude=42.3601, longitude=-71.0589,
+                 speed_mps=1.0):
+        """
+        :param rate_hz: Navigation epochs per second
+        :param baudrate: Emulated UART speed (the pty itself is unthrottled)
+        :param latitude, longitude: Start position in degrees
+        :param speed_mps: Ground speed, heading north
+        """
+        self.rate_hz = rate_hz
+        self.baudrate = baudrate
+        self.latitude = latitude
+        self.longitude = longitude
+        self.speed_mps = speed_mps
+        self.master_fd = self._slave_fd = None
+        self.port = None  # set by start()
+
+        self.epoch = 0
+        self.sent_at = {}  # "hhmmss.ss" -> time.monotonic() when the epoch started sending
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self.master_fd, self._slave_fd = pty.openpty()
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        if self.master_fd is not None:
+            os.close(self.master_fd)
+            os.close(self._slave_fd)
+
+    def utc(self, epoch):
+        seconds = epoch / self.rate_hz
+        hours, rest = divmod(seconds, 3600)
+        minutes, seconds = divmod(rest, 60)
+        return f"{int(hours):02d}{int(minutes):02d}{seconds:05.2f}"
+
+    def sentences(self, epoch, degraded=False):
+        """
+        NMEA sentences of one epoch. A degraded epoch has no fix: GGA quality
+        0 with 3 satellites, RMC status V and a 2D GSA with a poor HDOP.
+        """
+        utc = self.utc(epoch)
+        latitude = self.latitude + epoch / self.rate_hz * self.speed_mps / 111_320.0
+        lat, ns = _nmea_coordinate(latitude, 2, "N", "S")
+        lon, ew = _nmea_coordinate(self.longitude, 3, "E", "W")
+        knots = self.speed_mps / 0.514444
+        if degraded:
+            gga = f"GNGGA,{utc},{lat},{ns},{lon},{ew},0,03,8.5,35.2,M,-33.7,M,,"
+            rmc = f"GNRMC,{utc},V,{lat},{ns},{lon},{ew},{knots:.3f},0.00,170126,,,N"
+            gsa = "GNGSA,A,2,02,05,12,,,,,,,,,,9.9,8.5,5.0"
+        else:
+            gga = f"GNGGA,{utc},{lat},{ns},{lon},{ew},1,09,0.9,35.2,M,-33.7,M,,"
+            rmc = f"GNRMC,{utc},A,{lat},{ns},{lon},{ew},{knots:.3f},0.00,170126,,,A"
+            gsa = "GNGSA,A,3,02,05,12,13,15,18,25,29,,,,,1.6,0.9,1.3"
+        bodies = [
+            rmc,
+            f"GNVTG,0.00,T,,M,{knots:.3f},N,{self.speed_mps * 3.6:.3f},K,A",
+            gga,
+            gsa,
+            "GPGSV,3,1,10,02,45,123,38,05,60,250,41,12,30,045,35,13,15,300,30",
+            "GPGSV,3,2,10,15,70,180,44,18,20,090,33,25,40,210,39,29,55,330,42",
+            "GPGSV,3,3,10,31,05,010,20,32,10,100,22",
+        ]
+        return utc, [nmea_sentence(body) for body in bodies]
+
+    def epoch_output(self, epoch):
+        """What goes on the wire in one epoch: (utc, payloads)."""
+        return self.sentences(epoch)
+
+    def capture(self, path, epochs, degraded_every=0, corrupt_every=0):
+        """
+        Write `epochs` epochs of NMEA to path, like a logged receiver stream.
+
+        :param degraded_every: Make every Nth epoch a no-fix epoch (0 = never)
+        :param corrupt_every: Flip a character in every Nth sentence (0 = never)
+        :return: Number of sentences written
+        """
+        count = 0
+        with open(path, "wb") as f:
+            for epoch in range(epochs):
+                degraded = degraded_every and epoch % degraded_every == degraded_every - 1
+                _, sentences = self.sentences(epoch, degraded=bool(degraded))
+                for sentence in sentences:
+                    count += 1
+                    if corrupt_every and count % corrupt_every == 0:
+                        # Line noise: one character changes, the checksum no longer matches
+                        i = 7 + count % (len(sentence) - 12)
+                        sentence = sentence[:i] + bytes([sentence[i] ^ 0x01]) + sentence[i + 1:]
+                    f.write(sentence)
+        return count
+
+    def _write(self, payload):
+        # Hold the line for as long as the real UART would (8N1 = 10 bits/byte)
+        time.sleep(len(payload) * 10 / self.baudrate)
+        os.write(self.master_fd, payload)
+
+    def _run(self):
+        next_epoch = time.monotonic()
+        while self._running:
+            utc, sentences = self.epoch_output(self.epoch)
+            self.sent_at[utc] = time.monotonic()
+            for sentence in sentences:
+                try:
+                    self._write(sentence)
+                except OSError:
+                    return
+            self.epoch += 1
+            next_epoch += 1.0 / self.rate_hz
+            time.sleep(max(0.0, next_epoch - time.monotonic()))
+
+
+class FakeUBXGPS(FakeGPS):
+    """
+    FakeGPS that also speaks UBX like the BN-220's u-blox M8: it answers
+    CFG-PRT, CFG-RATE and CFG-MSG from the host with ACK-ACK and applies
+    them (emulated baud rate, epoch rate, NMEA sentences on/off, NAV-PVT
+    on/off). With ubx_supported=False it ignores UBX, like an NMEA-only
+    receiver, so the host's fallback can be exercised.
+    """
+
+    def __init__(self, *args, ubx_supported=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ubx_supported = ubx_supported
+        self.nmea_enabled = {"RMC", "VTG", "GGA", "GSA", "GSV"}
+        self.nav_pvt = False
+        self.commands = []  # (class, id) of every UBX message received
+        self._parser = ubx.UBXParser(on_frame=self._on_command)
+        self._write_lock = threading.Lock()
+        self._commands_thread = None
+
+    def start(self):
+        super().start()
+        self._commands_thread = threading.Thread(target=self._read_commands, daemon=True)
+        self._commands_thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._commands_thread:
+            self._commands_thread.join(timeout=2.0)
+        super().stop()
+
+    def nav_pvt_frame(self, epoch):
+        """NAV-PVT of one epoch, on the same track as sentences()."""
+        seconds = epoch / self.rate_hz
+        hours, rest = divmod(seconds, 3600)
+        minutes, rest = divmod(rest, 60)
+        whole = int(rest)
+        latitude = self.latitude + seconds * self.speed_mps / 111_320.0
+        speed_mm = round(self.speed_mps * 1000)
+        payload = ubx.NAV_PVT_STRUCT.pack(
+            round(seconds * 1000) % 604_800_000,  # iTOW
+            2026, 1, 17, int(hours) % 24, int(minutes), whole, 0x07,  # date, time, valid
+            30, round((rest - whole) * 1e9),  # tAcc (ns), nano
+            3, 0x01, 0x00, 9,  # 3D fix, gnssFixOK, flags2, satellites
+            round(self.longitude * 1e7), round(latitude * 1e7), 2_000, 35_200,  # lon, lat, height, hMSL
+            1_500, 2_500,  # hAcc, vAcc (mm)
+            speed_mm, 0, 0, speed_mm, 0,  # velN, velE, velD, gSpeed (mm/s), headMot
+            150, 500_000,  # sAcc (mm/s), headAcc (1e-5 deg)
+            160,  # pDOP (0.01)
+            0, 0, 0,  # headVeh, magDec, magAcc
+        )
+        return ubx.ubx_frame(ubx.NAV, ubx.NAV_PVT, payload)
+
+    def epoch_output(self, epoch):
+        utc, sentences = self.sentences(epoch)
+        payloads = [s for s in sentences if s[3:6].decode() in self.nmea_enabled]
+        if self.nav_pvt:
+            payloads.append(self.nav_pvt_frame(epoch))
+        return utc, payloads
+
+    def _write(self, payload):
+        with self._write_lock:
+            super()._write(payload)
+
+    def _read_commands(self):
+        while self._running:
+            try:
+                ready, _, _ = select.select([self.master_fd], [], [], 0.1)
+                if ready:
+                    self._parser.feed(os.read(self.master_fd, 1024))
+            except (OSError, ValueError):
+                return
+
+    def _on_command(self, msg_class, msg_id, payload):
+        self.commands.append((msg_class, msg_id))
+        if not self.ubx_supported or msg_class != ubx.CFG:
+            return
+        if msg_id == ubx.CFG_RATE:
+            old_rate = self.rate_hz
+            self.rate_hz = 1000 / struct.unpack_from("<H", payload)[0]
+            # Keep the UTC clock continuous across the rate change
+            self.epoch = round(self.epoch * self.rate_hz / old_rate)
+        elif msg_id == ubx.CFG_MSG and len(payload) == 3:
+            target_class, target_id, rate = payload
+            if target_class == ubx.NMEA_CLASS:
+                names = {v: k for k, v in ubx.NMEA_IDS.items()}
+                name = names.get(target_id)
+                if name:
+                    (self.nmea_enabled.add if rate else self.nmea_enabled.discard)(name)
+            elif (target_class, target_id) == (ubx.NAV, ubx.NAV_PVT):
+                self.nav_pvt = bool(rate)
+        # The ACK goes out at the old baud rate, then CFG-PRT takes effect
+        self._write(ubx.ubx_frame(ubx.ACK, ubx.ACK_ACK, bytes((ubx.CFG, msg_id))))
+        if msg_id == ubx.CFG_PRT:
+            self.baudrate = struct.unpack_from("<I", payload, 8)[0]
@@ -0,0 +1,346 @@
+"""
+Epoch-based GNSS fix assembly from NMEA.
+
+A receiver sends one burst of sentences per navigation epoch (BN-220:
+RMC, VTG, GGA, GSA, GSV..., GLL). FixAssembler checks each sentence's
+*hh checksum, merges GGA, RMC, GSA and VTG of the same epoch into one
+typed GNSSFix and gates it on quality:
+
+- GGA: time, position, altitude, fix quality, satellites, HDOP
+- RMC: time, position, status, speed, course, date
+- GSA: fix type (2D/3D), PDOP/HDOP/VDOP
+- VTG: speed and course (used when RMC has none)
+
+An epoch is emitted as soon as GGA, RMC and GSA have all arrived, or when
+a sentence with a new UTC time shows the epoch is over. GSA/VTG carry no
+time and belong to the epoch in progress.
+
+    python3 -m GPS.fix_assembler capture.nmea
+    python3 -m GPS.fix_assembler --benchmark
+"""
+
+import argparse
+import operator
+import os
+import tempfile
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from functools import reduce
+from typing import Optional
+
+KNOTS_TO_MPS = 0.514444
+KMH_TO_MPS = 1 / 3.6
+
+
+@dataclass
+class GNSSFix:
+    """One navigation epoch merged from its NMEA sentences."""
+
+    time: str
+    received: float  # time.monotonic() when the first sentence of the epoch arrived
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    altitude: Optional[float] = None
+    speed_mps: Optional[float] = None
+    course: Optional[float] = None
+    fix_quality: Optional[int] = None  # GGA: 0 none, 1 GPS, 2 DGPS, 4/5 RTK, 6 dead reckoning
+    fix_type: Optional[int] = None  # GSA: 1 none, 2 2D, 3 3D
+    satellites: Optional[int] = None
+    hdop: Optional[float] = None
+    pdop: Optional[float] = None
+    vdop: Optional[float] = None
+    valid: Optional[bool] = None  # RMC status A
+    date: Optional[str] = None
+    sentences: set = field(default_factory=set)
+    accepted: bool = False
+    reject_reason: Optional[str] = None
+
+    @property
+    def has_position(self):
+        return self.latitude is not None and self.longitude is not None
+
+    def to_dict(self):
+        """Flat dict in the shape the NMEAParser consumers already read."""
+        data = asdict(self)
+        data["type"] = "GNSS"
+        data["sentences"] = sorted(self.sentences)
+        data["status"] = "Valid" if self.accepted else "Warning"
+        data["speed_knots"] = None if self.speed_mps is None else self.speed_mps / KNOTS_TO_MPS
+        return data
+
+
+def checksum_ok(line: bytes) -> bool:
+    """True if line is $...*hh and hh is the XOR of everything in between."""
+    star = line.rfind(b"*")
+    if not line.startswith(b"$") or star < 0 or len(line) < star + 3:
+        return False
+    try:
+        expected = int(line[star + 1:star + 3], 16)
+    except ValueError:
+        return False
+    return reduce(operator.xor, line[1:star], 0) == expected
+
+
+def _coordinate(value, hemisphere, degree_digits):
+    if not value:
+        return None
+    degrees = float(value[:degree_digits]) + float(value[degree_digits:]) / 60
+    return -degrees if hemisphere in ("S", "W") else degrees
+
+
+def _float(value):
+    return float(value) if value else None
+
+
+def _int(value):
+    return int(value) if value else None
+
+
+class FixAssembler:
+    """Merges the NMEA sentences of each epoch into a quality-gated GNSSFix."""
+
+    KINDS = frozenset((b"GGA", b"RMC", b"GSA", b"VTG"))
+    COMPLETE = frozenset(("GGA", "RMC", "GSA"))
+
+    def __init__(
+        self,
+        min_satellites=4,
+        max_hdop=5.0,
+        min_fix_type=2,
+        min_quality=1,
+        require_valid=True,
+    ):
+        """
+        Thresholds only apply to fields the epoch actually reported, so a
+        receiver with GSA disabled is not rejected for a missing fix type.
+
+        :param min_satellites: Fewest satellites in use (GGA)
+        :param max_hdop: Largest horizontal dilution of precision (GGA/GSA)
+        :param min_fix_type: 2 = 2D or better, 3 = 3D only (GSA)
+        :param min_quality: Lowest GGA fix quality (1 = plain GPS fix)
+        :param require_valid: Reject epochs whose RMC status is not A
+        """
+        self.min_satellites = min_satellites
+        self.max_hdop = max_hdop
+        self.min_fix_type = min_fix_type
+        self.min_quality = min_quality
+        self.require_valid = require_valid
+
+        self._merge = {
+            "GGA": self._merge_gga,
+            "RMC": self._merge_rmc,
+            "GSA": self._merge_gsa,
+            "VTG": self._merge_vtg,
+        }
+        self._fix = None
+        self.lines = 0
+        self.checksum_errors = 0
+        self.malformed = 0
+        self.ignored = 0
+        self.orphans = 0
+        self.epochs = 0
+        self.accepted = 0
+        self.rejected = Counter()
+
+    def feed(self, line, received=None) -> Optional[GNSSFix]:
+        """
+        Feed one sentence (bytes or str, with or without line ending).
+        :return: The epoch this sentence completed or closed, accepted or not
+        """
+        if isinstance(line, str):
+            line = line.encode("ascii", errors="ignore")
+        line = line.strip()
+        if not line:
+            return None
+        self.lines += 1
+        # Skip GSV/GLL/... before paying for the checksum
+        if line[3:6] not in self.KINDS:
+            self.ignored += 1
+            return None
+        if not checksum_ok(line):
+            self.checksum_errors += 1
+            return None
+
+        parts = line[1:line.rfind(b"*")].decode("ascii").split(",")
+        kind = parts[0][2:]
+        if received is None:
+            received = time.monotonic()
+
+        done = None
+        if kind in ("GGA", "RMC"):
+            utc = parts[1]
+            if self._fix is not None and self._fix.time != utc:
+                done = self._close()
+            if self._fix is None:
+                self._fix = GNSSFix(time=utc, received=received)
+        elif self._fix is None:
+            # GSA/VTG of an epoch that has already been emitted (or of the
+            # first, partial burst): no time to attach them to
+            self.orphans += 1
+            return None
+
+        try:
+            self._merge[kind](self._fix, parts)
+        except (IndexError, ValueError):
+            self.malformed += 1
+            return done
+        self._fix.sentences.add(kind)
+
+        if self.COMPLETE <= self._fix.sentences:
+            return self._close()
+        return done
+
+    def flush(self) -> Optional[GNSSFix]:
+        """Emit the epoch in progress, e.g. at the end of a file."""
+        return self._close() if self._fix is not None else None
+
+    def _close(self):
+        fix, self._fix = self._fix, None
+        self.epochs += 1
+        fix.reject_reason = self._check(fix)
+        fix.accepted = fix.reject_reason is None
+        if fix.accepted:
+            self.accepted += 1
+        else:
+            self.rejected[fix.reject_reason] += 1
+        return fix
+
+    def _check(self, fix):
+        if not fix.has_position:
+            return "no position"
+        if self.require_valid and fix.valid is False:
+            return "status void"
+        if fix.fix_quality is not None and fix.fix_quality < self.min_quality:
+            return "fix quality"
+        if fix.fix_type is not None and fix.fix_type < self.min_fix_type:
+            return "fix type"
+        if fix.satellites is not None and fix.satellites < self.min_satellites:
+            return "satellites"
+        if fix.hdop is not None and fix.hdop > self.max_hdop:
+            return "hdop"
+        return None
+
+    @staticmethod
+    def _merge_gga(fix, p):
+        fix.latitude = _coordinate(p[2], p[3], 2)
+        fix.longitude = _coordinate(p[4], p[5], 3)
+        fix.fix_quality = _int(p[6]) or 0
+        fix.satellites = _int(p[7])
+        fix.hdop = _float(p[8])
+        fix.altitude = _float(p[9])
+
+    @staticmethod
+    def _merge_rmc(fix, p):
+        fix.valid = p[2] == "A"
+        if fix.latitude is None:
+            fix.latitude = _coordinate(p[3], p[4], 2)
+            fix.longitude = _coordinate(p[5], p[6], 3)
+        if p[7]:
+            fix.speed_mps = float(p[7]) * KNOTS_TO_MPS
+        if p[8]:
+            fix.course = float(p[8])
+        fix.date = p[9] or None
+
+    @staticmethod
+    def _merge_gsa(fix, p):
+        fix.fix_type = _int(p[2])
+        fix.pdop = _float(p[15])
+        fix.hdop = _float(p[16]) if fix.hdop is None else fix.hdop
+        fix.vdop = _float(p[17])
+
+    @staticmethod
+    def _merge_vtg(fix, p):
+        if fix.course is None and p[1]:
+            fix.course = float(p[1])
+        if fix.speed_mps is None:
+            if p[7]:
+                fix.speed_mps = float(p[7]) * KMH_TO_MPS
+            elif p[5]:
+                fix.speed_mps = float(p[5]) * KNOTS_TO_MPS
+
+    def feed_file(self, path):
+        """Yield every epoch in an NMEA capture, accepted or not."""
+        with open(path, "rb") as f:
+            for line in f:
+                fix = self.feed(line, received=0.0)
+                if fix is not None:
+                    yield fix
+        fix = self.flush()
+        if fix is not None:
+            yield fix
+
+    def stats(self):
+        return {
+            "lines": self.lines,
+            "checksum_errors": self.checksum_errors,
+            "malformed": self.malformed,
+            "ignored": self.ignored,
+            "orphans": self.orphans,
+            "epochs": self.epochs,
+            "accepted": self.accepted,
+            "rejected": dict(self.rejected),
+        }
+
+
+def benchmark(epochs=100_000, path=None):
+    """
+    Assemble a large capture (1 in 20 epochs without a fix, 1 in 500
+    sentences corrupted) and compare with per-line NMEAParser parsing.
+    """
+    from GPS.GPS_reader import NMEAParser
+    from GPS.fake_gps import FakeGPS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if path is None:
+            path = os.path.join(tmp, "capture.nmea")
+            count = FakeGPS().capture(path, epochs, degraded_every=20, corrupt_every=500)
+            print(f"📝 Capture: {count} sentences, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        assembler = FixAssembler()
+        start = time.perf_counter()
+        fixes = sum(1 for _ in assembler.feed_file(path))
+        elapsed = time.perf_counter() - start
+        stats = assembler.stats()
+        print(f"🧩 Assembler: {elapsed:.2f} s, {stats['lines'] / elapsed / 1e3:.0f}k lines/s, "
+              f"{fixes} epochs")
+        print(f"   {stats}")
+
+        # The old path: GGA/RMC parsed line by line, no checksum, no gating
+        start = time.perf_counter()
+        parsed = wrong = 0
+        with open(path, "rb") as f:
+            for line in f:
+                line = line.decode("ascii", errors="ignore").strip()
+                if line[3:6] not in ("GGA", "RMC"):
+                    continue
+                try:
+                    NMEAParser.parse(line)
+                    parsed += 1
+                except (IndexError, ValueError):
+                    wrong += 1
+        elapsed = time.perf_counter() - start
+        print(f"📄 Per-line NMEAParser: {elapsed:.2f} s, {parsed} positions handed out "
+              f"(corrupt and no-fix ones included), {wrong} crashed the parser")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assemble GNSS fixes from NMEA")
+    parser.add_argument("capture", nargs="?", help="NMEA capture to assemble")
+    parser.add_argument("--benchmark", action="store_true", help="Run on a generated capture")
+    parser.add_argument("--epochs", type=int, default=100_000)
+    parser.add_argument("--min-satellites", type=int, default=4)
+    parser.add_argument("--max-hdop", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.epochs, args.capture)
+    elif args.capture:
+        assembler = FixAssembler(min_satellites=args.min_satellites, max_hdop=args.max_hdop)
+        for fix in assembler.feed_file(args.capture):
+            if fix.accepted:
+                print(f"{fix.time} {fix.latitude:.6f},{fix.longitude:.6f} "
+                      f"{fix.speed_mps or 0:.2f} m/s sats {fix.satellites} hdop {fix.hdop}")
+        print(assembler.stats())
+    else:
+        parser.print_help()
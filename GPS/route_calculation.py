@@ -0,0 +1,395 @@
+"""
+Geodesy for routes and navigation.
+
+Every function takes degrees and meters and works on single points or on
+NumPy arrays (broadcast against each other). Plain floats take a `math`
+fast path, since control loops ask about one fix at a time; anything else
+goes through NumPy, so a whole track or capture is one call.
+
+- haversine / equirectangular: distance between points
+- initial_bearing, destination_point
+- track_distances / segment_distance: along-track and cross-track
+  distance of points to the great circle through a route segment
+- LocalFrame: East-North-Up meters around a reference point (WGS84)
+- PolylineIndex / polyline_track: nearest segment of a route polyline,
+  distance along the route and signed offset from it
+
+The spherical functions use the mean Earth radius; against WGS84 they are
+off by at most ~0.5 %, which is well below GPS noise at bike distances.
+
+    python3 -m GPS.route_calculation --benchmark
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+EARTH_RADIUS = 6_371_008.8  # mean radius, m
+
+WGS84_A = 6_378_137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+WGS84_EP2 = (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+
+
+def _is_scalar(*values):
+    return all(isinstance(v, (int, float)) for v in values)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters."""
+    if _is_scalar(lat1, lon1, lat2, lon2):
+        phi1, phi2 = math.radians(lat1), math.radians(lat2)
+        a = (math.sin((phi2 - phi1) / 2) ** 2
+             + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+        return 2 * EARTH_RADIUS * math.asin(math.sqrt(min(1.0, a)))
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    a = (np.sin((phi2 - phi1) / 2) ** 2
+         + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(np.subtract(lon2, lon1)) / 2) ** 2)
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(1.0, a)))
+
+
+def equirectangular(lat1, lon1, lat2, lon2):
+    """
+    Flat-Earth distance in meters: cheaper than haversine and within
+    0.1 % of it up to a few kilometers.
+    """
+    if _is_scalar(lat1, lon1, lat2, lon2):
+        d_lon = (math.radians(lon2 - lon1) + math.pi) % (2 * math.pi) - math.pi
+        x = d_lon * math.cos(math.radians((lat1 + lat2) / 2))
+        return EARTH_RADIUS * math.hypot(x, math.radians(lat2 - lat1))
+    d_lon = (np.radians(np.subtract(lon2, lon1)) + np.pi) % (2 * np.pi) - np.pi
+    x = d_lon * np.cos(np.radians(np.add(lat1, lat2) / 2))
+    return EARTH_RADIUS * np.hypot(x, np.radians(np.subtract(lat2, lat1)))
+
+
+def initial_bearing(lat1, lon1, lat2, lon2):
+    """Bearing from point 1 towards point 2 in degrees, 0 = north, clockwise."""
+    if _is_scalar(lat1, lon1, lat2, lon2):
+        phi1, phi2 = math.radians(lat1), math.radians(lat2)
+        d_lon = math.radians(lon2 - lon1)
+        y = math.sin(d_lon) * math.cos(phi2)
+        x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(d_lon)
+        return math.degrees(math.atan2(y, x)) % 360
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    d_lon = np.radians(np.subtract(lon2, lon1))
+    y = np.sin(d_lon) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(d_lon)
+    return np.degrees(np.arctan2(y, x)) % 360
+
+
+def destination_point(lat, lon, bearing, distance):
+    """Point reached from (lat, lon) after `distance` meters on `bearing` degrees."""
+    if _is_scalar(lat, lon, bearing, distance):
+        phi1, theta = math.radians(lat), math.radians(bearing)
+        delta = distance / EARTH_RADIUS
+        phi2 = math.asin(math.sin(phi1) * math.cos(delta)
+                         + math.cos(phi1) * math.sin(delta) * math.cos(theta))
+        lambda2 = math.radians(lon) + math.atan2(
+            math.sin(theta) * math.sin(delta) * math.cos(phi1),
+            math.cos(delta) - math.sin(phi1) * math.sin(phi2))
+        return math.degrees(phi2), (math.degrees(lambda2) + 540) % 360 - 180
+    phi1, theta = np.radians(lat), np.radians(bearing)
+    delta = np.asarray(distance) / EARTH_RADIUS
+    phi2 = np.arcsin(np.sin(phi1) * np.cos(delta) + np.cos(phi1) * np.sin(delta) * np.cos(theta))
+    lambda2 = np.radians(lon) + np.arctan2(
+        np.sin(theta) * np.sin(delta) * np.cos(phi1),
+        np.cos(delta) - np.sin(phi1) * np.sin(phi2))
+    return np.degrees(phi2), (np.degrees(lambda2) + 540) % 360 - 180
+
+
+def track_distances(lat, lon, start_lat, start_lon, end_lat, end_lon):
+    """
+    Position of points relative to the great circle from start to end.
+    :return: (along, cross) in meters. along is measured from start in the
+             direction of end (negative behind start); cross is positive
+             to the right of the direction of travel.
+    """
+    delta13 = haversine(start_lat, start_lon, lat, lon) / EARTH_RADIUS
+    theta13 = initial_bearing(start_lat, start_lon, lat, lon)
+    theta12 = initial_bearing(start_lat, start_lon, end_lat, end_lon)
+    if _is_scalar(delta13, theta13, theta12):
+        angle = math.radians(theta13 - theta12)
+        cross = math.asin(math.sin(delta13) * math.sin(angle))
+        along = math.acos(max(-1.0, min(1.0, math.cos(delta13) / math.cos(cross))))
+        return math.copysign(along, math.cos(angle)) * EARTH_RADIUS, cross * EARTH_RADIUS
+    angle = np.radians(theta13 - theta12)
+    cross = np.arcsin(np.sin(delta13) * np.sin(angle))
+    along = np.arccos(np.clip(np.cos(delta13) / np.cos(cross), -1.0, 1.0))
+    return np.copysign(along, np.cos(angle)) * EARTH_RADIUS, cross * EARTH_RADIUS
+
+
+def segment_distance(lat, lon, start_lat, start_lon, end_lat, end_lon):
+    """
+    Distance in meters from points to the segment start-end: the cross-track
+    distance where the point is abreast of the segment, otherwise the
+    distance to the nearer end.
+    """
+    along, cross = track_distances(lat, lon, start_lat, start_lon, end_lat, end_lon)
+    length = haversine(start_lat, start_lon, end_lat, end_lon)
+    if _is_scalar(along, cross, length):
+        if along < 0:
+            return haversine(lat, lon, start_lat, start_lon)
+        if along > length:
+            return haversine(lat, lon, end_lat, end_lon)
+        return abs(cross)
+    return np.where(
+        along < 0,
+        haversine(lat, lon, start_lat, start_lon),
+        np.where(along > length, haversine(lat, lon, end_lat, end_lon), np.abs(cross)),
+    )
+
+
+class LocalFrame:
+    """East-North-Up coordinates in meters around a reference point (WGS84)."""
+
+    def __init__(self, ref_lat, ref_lon, ref_alt=0.0):
+        self.ref_lat = ref_lat
+        self.ref_lon = ref_lon
+        self.ref_alt = ref_alt
+        phi, lam = math.radians(ref_lat), math.radians(ref_lon)
+        self._sin_phi, self._cos_phi = math.sin(phi), math.cos(phi)
+        self._sin_lam, self._cos_lam = math.sin(lam), math.cos(lam)
+        self._origin = self._ecef(ref_lat, ref_lon, ref_alt)
+
+    @staticmethod
+    def _ecef(lat, lon, alt):
+        if _is_scalar(lat, lon, alt):
+            phi, lam = math.radians(lat), math.radians(lon)
+            sin_phi, cos_phi = math.sin(phi), math.cos(phi)
+            n = WGS84_A / math.sqrt(1 - WGS84_E2 * sin_phi ** 2)
+            return ((n + alt) * cos_phi * math.cos(lam),
+                    (n + alt) * cos_phi * math.sin(lam),
+                    (n * (1 - WGS84_E2) + alt) * sin_phi)
+        phi, lam = np.radians(lat), np.radians(lon)
+        sin_phi, cos_phi = np.sin(phi), np.cos(phi)
+        n = WGS84_A / np.sqrt(1 - WGS84_E2 * sin_phi ** 2)
+        return ((n + alt) * cos_phi * np.cos(lam),
+                (n + alt) * cos_phi * np.sin(lam),
+                (n * (1 - WGS84_E2) + alt) * sin_phi)
+
+    def to_enu(self, lat, lon, alt=0.0):
+        """:return: (east, north, up) in meters"""
+        x, y, z = self._ecef(lat, lon, alt)
+        dx, dy, dz = x - self._origin[0], y - self._origin[1], z - self._origin[2]
+        east = -self._sin_lam * dx + self._cos_lam * dy
+        north = (-self._sin_phi * self._cos_lam * dx - self._sin_phi * self._sin_lam * dy
+                 + self._cos_phi * dz)
+        up = (self._cos_phi * self._cos_lam * dx + self._cos_phi * self._sin_lam * dy
+              + self._sin_phi * dz)
+        return east, north, up
+
+    def from_enu(self, east, north, up=0.0):
+        """:return: (lat, lon, alt); Bowring's formula, mm-accurate near the surface"""
+        x = (self._origin[0] - self._sin_lam * east
+             - self._sin_phi * self._cos_lam * north + self._cos_phi * self._cos_lam * up)
+        y = (self._origin[1] + self._cos_lam * east
+             - self._sin_phi * self._sin_lam * north + self._cos_phi * self._sin_lam * up)
+        z = self._origin[2] + self._cos_phi * north + self._sin_phi * up
+        m = math if _is_scalar(x, y, z) else np
+        atan2 = m.atan2 if m is math else np.arctan2
+        p = m.hypot(x, y)
+        theta = atan2(z * WGS84_A, p * WGS84_B)
+        phi = atan2(z + WGS84_EP2 * WGS84_B * m.sin(theta) ** 3,
+                    p - WGS84_E2 * WGS84_A * m.cos(theta) ** 3)
+        n = WGS84_A / m.sqrt(1 - WGS84_E2 * m.sin(phi) ** 2)
+        return m.degrees(phi), m.degrees(atan2(y, x)), p / m.cos(phi) - n
+
+
+class PolylineIndex:
+    """
+    A route polyline in a local ENU frame at its first vertex (fine for
+    routes of a few kilometers), with its segments binned in a uniform grid.
+
+    track() matches each point against the segments listed in its cell,
+    which is exact whenever the nearest one is within one cell size: the
+    case for points on or near the route. Points farther away are matched
+    against every segment. Build one per route and reuse it.
+    """
+
+    def __init__(self, path_lat, path_lon, cell=None):
+        """
+        :param path_lat, path_lon: Vertices of the route, at least two
+        :param cell: Grid cell size in meters (default: median segment length, >= 25 m)
+        """
+        path_lat = np.asarray(path_lat, dtype=float)
+        path_lon = np.asarray(path_lon, dtype=float)
+        if len(path_lat) < 2:
+            raise ValueError("A polyline needs at least two vertices")
+        self.frame = LocalFrame(float(path_lat[0]), float(path_lon[0]))
+        px, py, _ = self.frame.to_enu(path_lat, path_lon)
+        self._ax, self._ay = px[:-1], py[:-1]
+        self._dx, self._dy = np.diff(px), np.diff(py)
+        self._length = np.hypot(self._dx, self._dy)
+        self._length2 = np.maximum(self._length ** 2, 1e-12)
+        self._start_along = np.concatenate([[0.0], np.cumsum(self._length)[:-1]])
+        self.length = float(self._length.sum())
+        self.cell = cell or max(25.0, float(np.median(self._length)))
+        self._build_grid(px, py)
+
+    def _build_grid(self, px, py):
+        h = self.cell
+        # Every segment goes into all cells its bounding box, grown by one
+        # cell size, touches: a point's own cell then lists every segment
+        # within h of it
+        self._x0, self._y0 = px.min() - 2 * h, py.min() - 2 * h
+        self._nx = int((px.max() - self._x0) // h) + 3
+        self._ny = int((py.max() - self._y0) // h) + 3
+        ix0 = ((np.minimum(px[:-1], px[1:]) - h - self._x0) // h).astype(np.int64)
+        ix1 = ((np.maximum(px[:-1], px[1:]) + h - self._x0) // h).astype(np.int64)
+        iy0 = ((np.minimum(py[:-1], py[1:]) - h - self._y0) // h).astype(np.int64)
+        iy1 = ((np.maximum(py[:-1], py[1:]) + h - self._y0) // h).astype(np.int64)
+        widths = ix1 - ix0 + 1
+        counts = widths * (iy1 - iy0 + 1)
+        segment = np.repeat(np.arange(len(counts)), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = (iy0[segment] + k // widths[segment]) * self._nx + ix0[segment] + k % widths[segment]
+        order = np.argsort(cells, kind="stable")
+        self._cell_segments = segment[order]
+        self._cell_start = np.searchsorted(cells[order], np.arange(self._nx * self._ny + 1))
+
+    def _distance2(self, x, y, segment):
+        """Squared distance of points (x, y) to their segments, and the position t on them."""
+        vx, vy = x - self._ax[segment], y - self._ay[segment]
+        dx, dy = self._dx[segment], self._dy[segment]
+        t = np.clip((vx * dx + vy * dy) / self._length2[segment], 0.0, 1.0)
+        return (vx - t * dx) ** 2 + (vy - t * dy) ** 2, t, vx, vy
+
+    def _match_grid(self, x, y, nearest):
+        """Fill `nearest` for points resolved by the grid; return the rest's indices."""
+        ix = ((x - self._x0) // self.cell).astype(np.int64)
+        iy = ((y - self._y0) // self.cell).astype(np.int64)
+        inside = (ix >= 0) & (ix < self._nx) & (iy >= 0) & (iy < self._ny)
+        points = np.flatnonzero(inside)
+        cells = iy[points] * self._nx + ix[points]
+        starts = self._cell_start[cells]
+        counts = self._cell_start[cells + 1] - starts
+
+        # Candidate (point, segment) pairs, grouped by point
+        has = counts > 0
+        points, starts, counts = points[has], starts[has], counts[has]
+        if len(points):
+            group_start = np.cumsum(counts) - counts
+            pair_point = np.repeat(points, counts)
+            pair_segment = self._cell_segments[
+                np.repeat(starts - group_start, counts) + np.arange(int(counts.sum()))]
+            d2, _, _, _ = self._distance2(x[pair_point], y[pair_point], pair_segment)
+            best = np.minimum.reduceat(d2, group_start)
+            group = np.repeat(np.arange(len(points)), counts)
+            first = np.flatnonzero(d2 == best[group])
+            first = first[np.r_[True, group[first][1:] != group[first][:-1]]]
+            resolved = best <= self.cell ** 2
+            nearest[points[resolved]] = pair_segment[first][resolved]
+        return np.flatnonzero(nearest < 0)
+
+    def _match_all(self, x, y, indices, nearest, chunk=256):
+        segments = np.arange(len(self._ax))
+        for i in range(0, len(indices), chunk):
+            rows = indices[i:i + chunk]
+            d2, _, _, _ = self._distance2(x[rows, None], y[rows, None], segments)
+            nearest[rows] = d2.argmin(axis=1)
+
+    def track(self, lat, lon):
+        """
+        :return: (segment, along, cross): index of the nearest segment, meters
+                 along the route from its start to the closest point, and the
+                 signed offset from the route (positive = right of travel)
+        """
+        scalar = _is_scalar(lat, lon)
+        x, y, _ = self.frame.to_enu(np.atleast_1d(np.asarray(lat, dtype=float)),
+                                    np.atleast_1d(np.asarray(lon, dtype=float)))
+        nearest = np.full(len(x), -1, dtype=np.int64)
+        rest = self._match_grid(x, y, nearest)
+        if len(rest):
+            self._match_all(x, y, rest, nearest)
+
+        d2, t, vx, vy = self._distance2(x, y, nearest)
+        along = self._start_along[nearest] + t * self._length[nearest]
+        # z of direction x offset is positive to the left of travel
+        side = self._dx[nearest] * vy - self._dy[nearest] * vx
+        cross = -np.sign(side) * np.sqrt(d2)
+        if scalar:
+            return int(nearest[0]), float(along[0]), float(cross[0])
+        return nearest, along, cross
+
+
+def polyline_track(lat, lon, path_lat, path_lon):
+    """One-off PolylineIndex(path_lat, path_lon).track(lat, lon)."""
+    return PolylineIndex(path_lat, path_lon).track(lat, lon)
+
+
+def benchmark(points=100_000, repeats=5):
+    """Time the batch functions on 100k points and check them against the scalar paths."""
+    rng = np.random.default_rng(0)
+    ref_lat, ref_lon = 42.3601, -71.0589
+    lat = ref_lat + rng.uniform(-0.02, 0.02, points)
+    lon = ref_lon + rng.uniform(-0.02, 0.02, points)
+    end_lat, end_lon = ref_lat + 0.01, ref_lon + 0.01
+    frame = LocalFrame(ref_lat, ref_lon)
+    path_lat = ref_lat + np.linspace(0, 0.02, 201) + 0.001 * np.sin(np.linspace(0, 6, 201))
+    path_lon = ref_lon + np.linspace(0, 0.01, 201)
+    # A ride along the route: fixes scattered a few metres around it
+    along = rng.uniform(0, len(path_lat) - 1, points)
+    ride_lat = np.interp(along, np.arange(len(path_lat)), path_lat) + rng.normal(0, 5e-5, points)
+    ride_lon = np.interp(along, np.arange(len(path_lon)), path_lon) + rng.normal(0, 5e-5, points)
+    index = PolylineIndex(path_lat, path_lon)
+
+    cases = {
+        "haversine": (lambda: haversine(ref_lat, ref_lon, lat, lon),
+                      lambda i: haversine(ref_lat, ref_lon, float(lat[i]), float(lon[i]))),
+        "equirectangular": (lambda: equirectangular(ref_lat, ref_lon, lat, lon),
+                            lambda i: equirectangular(ref_lat, ref_lon, float(lat[i]), float(lon[i]))),
+        "initial_bearing": (lambda: initial_bearing(ref_lat, ref_lon, lat, lon),
+                            lambda i: initial_bearing(ref_lat, ref_lon, float(lat[i]), float(lon[i]))),
+        "destination_point": (lambda: destination_point(ref_lat, ref_lon, lat * 0 + 45.0, lon * 0 + 500.0)[0],
+                              lambda i: destination_point(ref_lat, ref_lon, 45.0, 500.0)[0]),
+        "track_distances": (lambda: track_distances(lat, lon, ref_lat, ref_lon, end_lat, end_lon)[1],
+                            lambda i: track_distances(float(lat[i]), float(lon[i]), ref_lat, ref_lon,
+                                                      end_lat, end_lon)[1]),
+        "segment_distance": (lambda: segment_distance(lat, lon, ref_lat, ref_lon, end_lat, end_lon),
+                             lambda i: segment_distance(float(lat[i]), float(lon[i]), ref_lat, ref_lon,
+                                                        end_lat, end_lon)),
+        "LocalFrame.to_enu": (lambda: frame.to_enu(lat, lon)[0],
+                              lambda i: frame.to_enu(float(lat[i]), float(lon[i]))[0]),
+        "PolylineIndex.track": (lambda: index.track(ride_lat, ride_lon)[2],
+                                lambda i: index.track(float(ride_lat[i]), float(ride_lon[i]))[2]),
+        "polyline_track": (lambda: polyline_track(lat, lon, path_lat, path_lon)[2],
+                           lambda i: polyline_track(float(lat[i]), float(lon[i]), path_lat, path_lon)[2]),
+    }
+    print(f"🧭 {points} points (polyline: {len(path_lat) - 1} segments; PolylineIndex.track on "
+          f"fixes along the route, polyline_track on the whole box)")
+    for name, (batch, scalar) in cases.items():
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = batch()
+            timings.append(time.perf_counter() - start)
+        sample = range(0, points, max(1, points // 1000))
+        start = time.perf_counter()
+        worst = max(abs(scalar(i) - result[i]) for i in sample)
+        per_call = (time.perf_counter() - start) / len(sample)
+        print(f"   {name:>19}: batch {min(timings) * 1000:6.1f} ms, scalar {per_call * 1e6:5.1f} µs/point "
+              f"(loop over all: {per_call * points * 1000:6.0f} ms), max |batch - scalar| {worst:.1e}")
+
+    # Sanity checks between the models
+    e, n, _ = frame.to_enu(lat, lon)
+    flat = np.hypot(e, n)
+    sphere = haversine(ref_lat, ref_lon, lat, lon)
+    back_lat, back_lon, _ = frame.from_enu(e, n)
+    print(f"   WGS84 ENU vs spherical distance: max {np.max(np.abs(flat / sphere - 1)) * 100:.2f} %; "
+          f"ENU round trip error {np.max(np.abs(back_lat - lat)) * 111_320 * 1000:.3f} mm")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Geodesy for routes and navigation")
+    parser.add_argument("--benchmark", action="store_true", help="Time batch calls on 100k points")
+    parser.add_argument("--points", type=int, default=100_000)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.points)
+    else:
+        parser.print_help()
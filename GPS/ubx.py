@@ -0,0 +1,413 @@
+"""
+u-blox UBX protocol for the BN-220 (u-blox M8 inside).
+
+Out of the box the receiver sends 1 Hz NMEA at 9600 baud. configure()
+switches it at startup to UBX: a faster UART, a 10 Hz measurement rate,
+the NMEA sentences off and one binary NAV-PVT message per epoch (position,
+velocity, heading, accuracy estimates and iTOW in 100 bytes). If the
+receiver does not acknowledge a step, everything is put back and
+UBXConfigError is raised so the caller can stay on NMEA.
+
+UBXParser splits the byte stream into frames and unpacks NAV-PVT with a
+precompiled struct straight out of its receive buffer (unpack_from, no
+slicing), returning fix dicts shaped like GNSSFix.to_dict.
+
+    python3 -m GPS.ubx --port /dev/ttyAMA0
+    python3 -m GPS.ubx --benchmark
+"""
+
+import argparse
+import struct
+import time
+from itertools import accumulate
+
+import serial
+
+SYNC = b"\xb5\x62"
+NAV, ACK, CFG = 0x01, 0x05, 0x06
+NAV_PVT = 0x07
+ACK_NAK, ACK_ACK = 0x00, 0x01
+CFG_PRT, CFG_MSG, CFG_RATE = 0x00, 0x01, 0x08
+NMEA_CLASS = 0xF0
+NMEA_IDS = {"GGA": 0x00, "GLL": 0x01, "GSA": 0x02, "GSV": 0x03, "RMC": 0x04, "VTG": 0x05}
+
+PROTO_UBX, PROTO_NMEA = 0x01, 0x02
+MAX_PAYLOAD = 1024
+KNOTS_TO_MPS = 0.514444
+
+# UBX-NAV-PVT, 92 bytes (u-blox 8 protocol 15+)
+NAV_PVT_STRUCT = struct.Struct("<IH6BIi4B4i2I5i2IH6xihH")
+_CFG_PRT_STRUCT = struct.Struct("<BBHIIHHHH")
+_CFG_RATE_STRUCT = struct.Struct("<HHH")
+_HEADER = struct.Struct("<2sBBH")
+
+
+class UBXConfigError(Exception):
+    """The receiver could not be switched to UBX; it is left on NMEA."""
+
+
+def ubx_checksum(data, start=0, end=None):
+    """8-bit Fletcher checksum (CK_A, CK_B) over data[start:end]."""
+    # One pass: the running byte sums end in CK_A and add up to CK_B. Slicing
+    # copies one frame; islice would walk the receive buffer from its start.
+    running = list(accumulate(data[start:end], initial=0))
+    return running[-1] & 0xFF, sum(running) & 0xFF
+
+
+def ubx_frame(msg_class, msg_id, payload=b""):
+    body = bytes((msg_class, msg_id)) + struct.pack("<H", len(payload)) + payload
+    return SYNC + body + bytes(ubx_checksum(body))
+
+
+def cfg_prt(baudrate, out_protocols=PROTO_UBX | PROTO_NMEA):
+    """CFG-PRT for UART1: 8N1 at baudrate, UBX and NMEA accepted."""
+    return ubx_frame(CFG, CFG_PRT, _CFG_PRT_STRUCT.pack(
+        1, 0, 0, 0x08D0, baudrate, PROTO_UBX | PROTO_NMEA, out_protocols, 0, 0))
+
+
+def cfg_rate(rate_hz):
+    """CFG-RATE: one navigation solution per measurement, GPS time aligned."""
+    return ubx_frame(CFG, CFG_RATE, _CFG_RATE_STRUCT.pack(round(1000 / rate_hz), 1, 1))
+
+
+def cfg_msg(msg_class, msg_id, rate):
+    """CFG-MSG: output msg every `rate` navigation solutions on the current port (0 = off)."""
+    return ubx_frame(CFG, CFG_MSG, bytes((msg_class, msg_id, rate)))
+
+
+class UBXParser:
+    """
+    Splits a byte stream into UBX frames and turns NAV-PVT into fix dicts.
+    Bytes between frames (NMEA left over from before the switch, line
+    noise) are skipped; ACK/NAK are kept in `acks` for configure().
+    """
+
+    def __init__(self, min_satellites=4, min_fix_type=2, max_h_acc=15.0, on_frame=None):
+        """
+        :param min_satellites: Fewest satellites used in the solution
+        :param min_fix_type: 2 = 2D or better, 3 = 3D only
+        :param max_h_acc: Largest horizontal accuracy estimate in meters
+        :param on_frame: Callable(msg_class, msg_id, payload) for every other frame
+        """
+        self.min_satellites = min_satellites
+        self.min_fix_type = min_fix_type
+        self.max_h_acc = max_h_acc
+        self.on_frame = on_frame
+        self.acks = {}  # (class, id) -> True (ACK) / False (NAK)
+        self._buffer = bytearray()
+        self.frames = 0
+        self.nav_pvt = 0
+        self.accepted = 0
+        self.checksum_errors = 0
+        self.skipped_bytes = 0
+
+    def feed(self, chunk, received=None):
+        """
+        Add received bytes.
+        :return: Fix dicts of the NAV-PVT frames completed by this chunk
+        """
+        if received is None:
+            received = time.monotonic()
+        buf = self._buffer
+        buf += chunk
+        fixes = []
+        pos = 0
+        while True:
+            start = buf.find(SYNC, pos)
+            if start < 0:
+                # Keep a trailing 0xB5, it may be the first half of the next sync
+                keep = len(buf) - 1 if buf[-1:] == SYNC[:1] else len(buf)
+                self.skipped_bytes += keep - pos
+                pos = keep
+                break
+            self.skipped_bytes += start - pos
+            if len(buf) - start < 6:
+                pos = start
+                break
+            _, msg_class, msg_id, length = _HEADER.unpack_from(buf, start)
+            if length > MAX_PAYLOAD:
+                # Not a real header; resync on the next byte
+                self.skipped_bytes += 1
+                pos = start + 1
+                continue
+            end = start + 6 + length + 2
+            if len(buf) < end:
+                pos = start
+                break
+            if ubx_checksum(buf, start + 2, end - 2) != (buf[end - 2], buf[end - 1]):
+                self.checksum_errors += 1
+                self.skipped_bytes += 1
+                pos = start + 1
+                continue
+
+            self.frames += 1
+            if msg_class == NAV and msg_id == NAV_PVT and length == NAV_PVT_STRUCT.size:
+                fixes.append(self._nav_pvt(buf, start + 6, received))
+            elif msg_class == ACK and length == 2:
+                self.acks[(buf[start + 6], buf[start + 7])] = msg_id == ACK_ACK
+            elif self.on_frame is not None:
+                self.on_frame(msg_class, msg_id, bytes(buf[start + 6:end - 2]))
+            pos = end
+        del buf[:pos]
+        return fixes
+
+    def _nav_pvt(self, buf, offset, received):
+        (itow, year, month, day, hour, minute, second, valid, t_acc, nano,
+         fix_type, flags, flags2, satellites, lon, lat, height, h_msl, h_acc, v_acc,
+         vel_n, vel_e, vel_d, g_speed, head_mot, s_acc, head_acc, p_dop,
+         head_veh, mag_dec, mag_acc) = NAV_PVT_STRUCT.unpack_from(buf, offset)
+        self.nav_pvt += 1
+
+        fix_ok = bool(flags & 0x01)
+        h_acc_m = h_acc / 1000
+        if not fix_ok:
+            reason = "no fix"
+        elif not self.min_fix_type <= fix_type <= 4:  # 5 = time only
+            reason = "fix type"
+        elif satellites < self.min_satellites:
+            reason = "satellites"
+        elif h_acc_m > self.max_h_acc:
+            reason = "accuracy"
+        else:
+            reason = None
+            self.accepted += 1
+
+        speed = g_speed / 1000
+        # hhmmss.ss like NMEA; truncate the fraction, rounding 59.996 s up
+        # would give an invalid second "60.00"
+        hundredths = min(99, max(nano, 0) // 10_000_000)
+        return {
+            "type": "NAV-PVT",
+            "time": f"{hour:02d}{minute:02d}{second:02d}.{hundredths:02d}",
+            "itow": itow,
+            "date": f"{day:02d}{month:02d}{year % 100:02d}",
+            "received": received,
+            "latitude": lat * 1e-7,
+            "longitude": lon * 1e-7,
+            "altitude": h_msl / 1000,
+            "speed_mps": speed,
+            "speed_knots": speed / KNOTS_TO_MPS,
+            "course": head_mot * 1e-5,
+            "vel_n": vel_n / 1000,
+            "vel_e": vel_e / 1000,
+            "vel_d": vel_d / 1000,
+            "fix_quality": 1 if fix_ok else 0,
+            "fix_type": fix_type,
+            "satellites": satellites,
+            "pdop": p_dop / 100,
+            "h_acc": h_acc_m,
+            "v_acc": v_acc / 1000,
+            "s_acc": s_acc / 1000,
+            "head_acc": head_acc * 1e-5,
+            "valid": fix_ok,
+            "accepted": reason is None,
+            "reject_reason": reason,
+            "status": "Valid" if reason is None else "Warning",
+        }
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "nav_pvt": self.nav_pvt,
+            "accepted": self.accepted,
+            "checksum_errors": self.checksum_errors,
+            "skipped_bytes": self.skipped_bytes,
+        }
+
+
+def _hears_receiver(ser, baudrate, window):
+    """True if a checksummed NMEA sentence or UBX frame arrives at baudrate within window s."""
+    from GPS.fix_assembler import checksum_ok
+
+    ser.baudrate = baudrate
+    ser.reset_input_buffer()
+    parser = UBXParser()
+    data = bytearray()
+    end = time.monotonic() + window
+    while time.monotonic() < end:
+        chunk = ser.read(ser.in_waiting or 1)
+        parser.feed(chunk)
+        data += chunk
+        if parser.frames or any(checksum_ok(line.strip()) for line in data.split(b"\n")[:-1]):
+            return True
+        del data[:data.rfind(b"\n") + 1]
+    return False
+
+
+def _command(ser, parser, frame, timeout, retries):
+    """Send a CFG frame and wait for its ACK; raise on NAK or silence."""
+    key = (frame[2], frame[3])
+    for _ in range(retries):
+        parser.acks.pop(key, None)
+        ser.write(frame)
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            parser.feed(ser.read(ser.in_waiting or 1))
+            if key in parser.acks:
+                if parser.acks.pop(key):
+                    return
+                raise UBXConfigError(f"receiver rejected CFG 0x{key[1]:02X}")
+    raise UBXConfigError(f"no ACK for CFG 0x{key[1]:02X}")
+
+
+def configure(ser, baudrate=115200, rate_hz=10, keep_nmea=(), timeout=0.5, retries=2,
+              probe=1.5):
+    """
+    Switch the receiver on an open port to UBX NAV-PVT at rate_hz.
+
+    The port may be at the receiver's default baud rate or, if it kept its
+    configuration in battery-backed RAM, already at `baudrate`. On failure
+    the receiver's NMEA output and the port's baud rate are restored and
+    UBXConfigError is raised.
+
+    :param ser: Open serial.Serial (a read timeout of ~0.1 s is expected)
+    :param baudrate: UART speed for UBX; 10 Hz NAV-PVT needs ~1000 bytes/s
+    :param rate_hz: Navigation solutions per second
+    :param keep_nmea: NMEA sentences to leave enabled, e.g. ("RMC",)
+    :param timeout: Seconds to wait for each ACK
+    :param retries: Sends per CFG message before giving up
+    :param probe: Seconds to listen for the receiver at a baud rate
+    """
+    original = ser.baudrate
+    disabled = []
+    started = time.monotonic()
+    try:
+        if _hears_receiver(ser, original, probe):
+            if baudrate != original:
+                # The receiver acknowledges at the old rate and then switches;
+                # that ACK is lost to the host's own switch
+                ser.write(cfg_prt(baudrate))
+                ser.flush()
+                time.sleep(0.05)
+                ser.baudrate = baudrate
+                ser.reset_input_buffer()
+        elif not _hears_receiver(ser, baudrate, probe):
+            raise UBXConfigError(f"no data from the receiver at {original} or {baudrate} baud")
+
+        parser = UBXParser()
+        _command(ser, parser, cfg_rate(rate_hz), timeout, retries)
+        for name, msg_id in NMEA_IDS.items():
+            if name not in keep_nmea:
+                _command(ser, parser, cfg_msg(NMEA_CLASS, msg_id, 0), timeout, retries)
+                disabled.append(msg_id)
+        _command(ser, parser, cfg_msg(NAV, NAV_PVT, 1), timeout, retries)
+
+        end = time.monotonic() + timeout + 2.0 / rate_hz
+        while time.monotonic() < end:
+            if parser.feed(ser.read(ser.in_waiting or 1)):
+                print(f"🛰️ UBX NAV-PVT at {rate_hz:g} Hz, {baudrate} baud "
+                      f"(configured in {time.monotonic() - started:.2f} s)")
+                return
+        raise UBXConfigError("no NAV-PVT after configuration")
+    except (UBXConfigError, serial.SerialException, OSError) as e:
+        _restore_nmea(ser, original, disabled)
+        if isinstance(e, UBXConfigError):
+            raise
+        raise UBXConfigError(str(e)) from e
+
+
+def _restore_nmea(ser, baudrate, disabled):
+    """Best effort: NMEA sentences back on, receiver and port back at baudrate."""
+    try:
+        for msg_id in disabled:
+            ser.write(cfg_msg(NMEA_CLASS, msg_id, 1))
+        ser.write(cfg_msg(NAV, NAV_PVT, 0))
+        if ser.baudrate != baudrate:
+            ser.write(cfg_prt(baudrate))
+        ser.flush()
+        time.sleep(0.05)
+    except (serial.SerialException, OSError):
+        pass
+    ser.baudrate = baudrate
+    ser.reset_input_buffer()
+
+
+def benchmark(frames=100_000, seconds=5.0):
+    """
+    Decode cost per fix (NAV-PVT vs an NMEA epoch through FixAssembler), then
+    a live comparison on the pty receiver: fix rate and the age of the fix a
+    50 Hz steering loop would read, for NMEA at 1 Hz and UBX at 10 Hz, plus
+    a receiver that ignores UBX to show the NMEA fallback.
+    """
+    from GPS.GPS_reader import SerialGPSReader
+    from GPS.fake_gps import FakeUBXGPS
+    from GPS.fix_assembler import FixAssembler
+
+    fake = FakeUBXGPS(rate_hz=10)
+    stream = b"".join(fake.nav_pvt_frame(epoch) for epoch in range(frames))
+    parser = UBXParser()
+    start = time.perf_counter()
+    for i in range(0, len(stream), 4096):
+        parser.feed(stream[i:i + 4096], 0.0)
+    ubx_elapsed = time.perf_counter() - start
+
+    nmea = [s for epoch in range(frames // 10) for s in fake.sentences(epoch)[1]]
+    assembler = FixAssembler()
+    start = time.perf_counter()
+    for line in nmea:
+        assembler.feed(line, 0.0)
+    nmea_elapsed = (time.perf_counter() - start) * 10
+    print(f"🧮 Decode: NAV-PVT {ubx_elapsed / frames * 1e6:.1f} µs/fix "
+          f"({parser.accepted} accepted), NMEA epoch {nmea_elapsed / frames * 1e6:.1f} µs/fix "
+          f"({nmea_elapsed / ubx_elapsed:.1f}x)")
+
+    def run(label, ubx, supported):
+        gps = FakeUBXGPS(rate_hz=1, baudrate=9600, ubx_supported=supported).start()
+        try:
+            started = time.monotonic()
+            reader = SerialGPSReader(gps.port, 9600, ubx=ubx, rate_hz=10)
+            setup = time.monotonic() - started
+            ages, fixes, last = [], 0, None
+            end = time.monotonic() + seconds
+            while time.monotonic() < end:
+                fix = reader.read_data()
+                if fix is not None and fix["time"] in gps.sent_at:
+                    ages.append(time.monotonic() - gps.sent_at[fix["time"]])
+                    if fix["time"] != last:
+                        fixes, last = fixes + 1, fix["time"]
+                time.sleep(0.02)
+            protocol = reader.drain.protocol
+            reader.close()
+        finally:
+            gps.stop()
+        ages.sort()
+        if not ages:
+            print(f"📡 {label:>16}: no fixes")
+            return
+        print(f"📡 {label:>16}: {protocol}, setup {setup:.2f} s, {fixes / seconds:.1f} fixes/s, "
+              f"fix age at 50 Hz p50 {ages[len(ages) // 2] * 1000:.0f} ms, "
+              f"max {ages[-1] * 1000:.0f} ms")
+
+    run("NMEA 1 Hz", False, True)
+    run("UBX 10 Hz", True, True)
+    run("UBX unsupported", True, False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BN-220 in UBX NAV-PVT mode")
+    parser.add_argument("--port", default="/dev/ttyAMA0")
+    parser.add_argument("--baudrate", type=int, default=9600, help="Receiver's current baud rate")
+    parser.add_argument("--ubx-baudrate", type=int, default=115200)
+    parser.add_argument("--rate", type=float, default=10, help="Navigation rate in Hz")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Decode cost and live NMEA/UBX comparison on a pty receiver")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    else:
+        from GPS.GPS_reader import SerialGPSReader
+
+        gps = SerialGPSReader(args.port, args.baudrate, ubx=True,
+                              ubx_baudrate=args.ubx_baudrate, rate_hz=args.rate)
+        try:
+            while True:
+                reading = gps.read()
+                if reading.value and not reading.is_fallback:
+                    fix = reading.value
+                    print(f"[{fix['type']}] {fix['latitude']:.7f},{fix['longitude']:.7f} "
+                          f"{fix['speed_mps']:.2f} m/s hAcc {fix.get('h_acc', '-')} m")
+        except KeyboardInterrupt:
+            print(f"Stopped. {gps.stats()}")
+        finally:
+            gps.close()
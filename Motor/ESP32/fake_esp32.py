@@ -0,0 +1,207 @@
+import os
+import pty
+import threading
+import time
+import tty
+
+from Motor.ESP32.protocol import encode_frame
+
+
+class FakeESP32:
+    """
+    Emulates the ESP32 potentiometer firmware on a pseudo-terminal so the
+    serial reader can be exercised and benchmarked without hardware.
+
+    Commands understood (newline terminated):
+      r  - reply with one ADC reading
+      s  - start pushing readings at rate_hz
+      x  - stop pushing readings
+      b  - switch to binary frames (replies "BIN <sample_period_us>");
+           streamed frames then carry `batch` samples each
+
+    The ADC value sweeps 0..4095 by one count per sample, and the send time
+    of every value is recorded so read latency can be measured on the host.
+    """
+
+    def __init__(self, rate_hz=500, baudrate=9600, batch=16, corrupt_every=0):
+        """
+        :param rate_hz: Sample rate while streaming
+        :param baudrate: Emulated UART speed (the pty itself is unthrottled)
+        :param batch: Samples per binary frame while streaming
+        :param corrupt_every: Flip a bit in every Nth binary frame (0 = never)
+        """
+        self.rate_hz = rate_hz
+        self.baudrate = baudrate
+        self.batch = batch
+        self.corrupt_every = corrupt_every
+        self.binary = False
+        self._seq = 0
+        self.master_fd, self._slave_fd = pty.openpty()
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+
+        self.sent_at = {}  # adc value -> time.monotonic() when it went on the wire
+        self.samples_sent = 0
+        self._adc = 0
+        self._streaming = False
+        self._running = False
+        self._write_lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        self._running = True
+        for target in (self._command_loop, self._stream_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._running = False
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        os.close(self.master_fd)
+        os.close(self._slave_fd)
+
+    def _next_adc(self):
+        adc = self._adc
+        self._adc = (self._adc + 1) % 4096
+        return adc
+
+    def _write(self, payload):
+        with self._write_lock:
+            # Hold the line for as long as the real UART would (8N1 = 10 bits/byte)
+            time.sleep(len(payload) * 10 / self.baudrate)
+            now = time.monotonic()
+            os.write(self.master_fd, payload)
+        return now
+
+    def _send_reading(self):
+        adc = self._next_adc()
+        if self.binary:
+            self._send_frame([adc])
+            return
+        self.sent_at[adc] = self._write(f"{adc}\r\n".encode())
+        self.samples_sent += 1
+
+    def _send_frame(self, batch):
+        frame = bytearray(encode_frame(self._seq, batch))
+        self._seq = (self._seq + 1) % 256
+        if self.corrupt_every and self._seq % self.corrupt_every == 0:
+            frame[-3] ^= 0x10
+        # Only the newest sample of a batch is timestamped on arrival
+        self.sent_at[batch[-1]] = self._write(bytes(frame))
+        self.samples_sent += len(batch)
+
+    def _command_loop(self):
+        buffer = b""
+        while self._running:
+            try:
+                chunk = os.read(self.master_fd, 64)
+            except OSError:
+                break
+            buffer += chunk
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                command = line.strip()
+                if command == b"r":
+                    self._send_reading()
+                elif command == b"s":
+                    self._streaming = True
+                elif command == b"x":
+                    self._streaming = False
+                elif command == b"b":
+                    self.binary = True
+                    period_us = int(1e6 / self.rate_hz)
+                    self._write(f"BIN {period_us}\n".encode())
+
+    def _stream_loop(self):
+        period = 1.0 / self.rate_hz
+        next_tick = time.monotonic()
+        while self._running:
+            if self._streaming:
+                if self.binary:
+                    # Sample at rate_hz, ship a frame every `batch` samples
+                    batch = [self._next_adc() for _ in range(self.batch)]
+                    self._send_frame(batch)
+                    next_tick += period * self.batch
+                else:
+                    self._send_reading()
+                    next_tick += period
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.monotonic()
+            else:
+                time.sleep(0.005)
+                next_tick = time.monotonic()
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def benchmark(duration=3.0, rate_hz=500, baudrate=9600, protocol="ascii"):
+    """Compare request/response polling against streaming on a fake ESP32."""
+    from Motor.ESP32.main import ESP32SerialReader
+
+    fake = FakeESP32(rate_hz=rate_hz, baudrate=baudrate).start()
+    # No angle cache: every poll below must be a real round trip
+    reader = ESP32SerialReader(
+        port=fake.port, baudrate=baudrate, protocol=protocol, cache_freshness=0
+    )
+    reader.connect()
+    print(f"--- protocol: {reader.protocol} ---")
+
+    try:
+        # --- Polling: one "r" round trip per sample ---
+        latencies = []
+        count = 0
+        start = time.monotonic()
+        while time.monotonic() - start < duration:
+            t0 = time.monotonic()
+            reader.request_data()
+            latencies.append(time.monotonic() - t0)
+            count += 1
+        elapsed = time.monotonic() - start
+        print(
+            f"📊 Poll mode:   {count / elapsed:7.1f} samples/s, "
+            f"latency p50={_percentile(latencies, 50) * 1000:.2f} ms "
+            f"p99={_percentile(latencies, 99) * 1000:.2f} ms"
+        )
+
+        # --- Streaming: background reader + ring buffer ---
+        if not reader.start_streaming(buffer_size=4096):
+            print("❌ Streaming did not start")
+            return
+        start = time.monotonic()
+        time.sleep(duration)
+        samples = reader.since(start)
+        elapsed = time.monotonic() - start
+
+        latencies = [
+            s.timestamp - fake.sent_at[s.adc] for s in samples if s.adc in fake.sent_at
+        ]
+        t0 = time.perf_counter()
+        for _ in range(10000):
+            reader.latest()
+        access_us = (time.perf_counter() - t0) / 10000 * 1e6
+
+        print(
+            f"📊 Stream mode: {len(samples) / elapsed:7.1f} samples/s, "
+            f"latency p50={_percentile(latencies, 50) * 1000:.2f} ms "
+            f"p99={_percentile(latencies, 99) * 1000:.2f} ms, "
+            f"latest() {access_us:.2f} µs, errors={reader.stream_errors}"
+        )
+        if reader.protocol == "binary":
+            print(f"📦 Frame stats: {reader.frame_stats()}")
+    finally:
+        reader.close()
+        fake.stop()
+
+
+if __name__ == "__main__":
+    benchmark(protocol="ascii")
+    benchmark(protocol="binary")
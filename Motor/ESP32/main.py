@@ -1,57 +1,463 @@
 import serial
 import time
 import threading
+from collections import deque, namedtuple
+
+from Motor.ESP32.protocol import FrameDecoder
+from Motor.calibration import SteeringCalibration
+from Transport.serial_transaction import Reading, SerialTransaction
+
+
+AngleSample = namedtuple("AngleSample", ["timestamp", "angle", "adc"])
+
+
+class SampleRingBuffer:
+    """Bounded, thread-safe buffer of timestamped angle samples (oldest dropped first)."""
+
+    def __init__(self, capacity=512):
+        self._samples = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def append(self, sample):
+        with self._lock:
+            self._samples.append(sample)
+            self.total += 1
+
+    def latest(self):
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+    def since(self, t):
+        """Return samples with a timestamp strictly newer than t, oldest first."""
+        out = []
+        with self._lock:
+            for sample in reversed(self._samples):
+                if sample.timestamp <= t:
+                    break
+                out.append(sample)
+        out.reverse()
+        return out
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+
+class AngleCache:
+    """
+    Last good angle Reading plus hit/miss counters. Reads younger than the
+    freshness window are served from memory instead of the serial link.
+    """
+
+    def __init__(self, freshness=0.01):
+        self.freshness = freshness
+        self._reading = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, max_age=None):
+        """Cached Reading if younger than max_age (default: freshness), else None."""
+        if max_age is None:
+            max_age = self.freshness
+        with self._lock:
+            reading = self._reading
+            if reading is not None and max_age > 0 and reading.age <= max_age:
+                self.hits += 1
+                return reading
+            self.misses += 1
+            return None
+
+    def put(self, reading):
+        # Fallbacks carry no new information about the angle
+        if reading.is_fallback or reading.timestamp is None:
+            return
+        with self._lock:
+            self._reading = reading
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "freshness_ms": self.freshness * 1000,
+        }
 
 
 class ESP32SerialReader:
-    def __init__(self, port="/dev/ttyUSB0", baudrate=9600, timeout=1):
+    def __init__(
+        self,
+        port="/dev/ttyUSB0",
+        baudrate=9600,
+        timeout=1,
+        protocol="ascii",
+        deadline_ms=30,
+        calibration=None,
+        cache_freshness=0.01,
+    ):
+        """
+        :param protocol: "ascii" (newline-terminated integers) or "binary"
+                         (CRC-checked batched frames, see Motor/ESP32/protocol.py).
+                         Binary is negotiated at connect time and falls back
+                         to ASCII if the firmware does not acknowledge it.
+        :param deadline_ms: Default time budget for one angle request. A lost
+                            reply costs at most this long instead of `timeout`.
+        :param calibration: SteeringCalibration used to convert ADC readings
+                            (defaults to the saved calibration, or linear)
+        :param cache_freshness: Seconds a polled angle is reused before the
+                                next read goes to the wire (0 = always poll)
+        """
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
+        self.deadline_ms = deadline_ms
         self.ser = None
+        self.link = None
         self.lock = threading.Lock()
-        self.last_valid_angle = 150.0  # default center
+        self.calibration = calibration or SteeringCalibration.load()
+        self.last_valid_angle = self.calibration.center  # default center
+        self.requested_protocol = protocol
+        self.protocol = "ascii"
+        self.decoder = FrameDecoder()
+        self.sample_period = 0.0  # seconds between samples inside a binary batch
+        self.batch_size = 1  # samples in the last streamed binary frame
+        self.cache = AngleCache(cache_freshness)
+
+        # Streaming mode: the ESP32 pushes samples after "s\n" until "x\n"
+        self.samples = None
+        self.stream_errors = 0
+        self.stream_updates = 0  # lines (ASCII) or frames (binary) received while streaming
+        self._streaming = False
+        self._stream_thread = None
+        self._sample_listeners = []
 
     def connect(self):
         try:
             self.ser = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
+            self.link = SerialTransaction(self.ser, lock=self.lock)
             print(f"🔌 Connected to ESP32 on {self.port}")
         except serial.SerialException as e:
             print(f"❌ Failed to connect: {e}")
             raise
 
-    def request_data(self):
+        if self.requested_protocol == "binary":
+            self._negotiate_binary()
+
+    def _negotiate_binary(self):
+        """
+        Ask the firmware to switch to binary frames. It answers with
+        "BIN [sample_period_us]"; anything else keeps the ASCII protocol.
+        """
+        with self.lock:
+            try:
+                self.ser.reset_input_buffer()
+                self.ser.write(b"b\n")
+                reply = self.ser.readline().decode("utf-8", errors="ignore").split()
+            except Exception as e:
+                print(f"❗ Serial error during negotiation: {e}")
+                reply = []
+
+        if reply and reply[0] == "BIN":
+            self.protocol = "binary"
+            self.decoder.reset()
+            if len(reply) > 1 and reply[1].isdigit():
+                self.sample_period = int(reply[1]) / 1e6
+            print("📦 Using binary framed protocol")
+        else:
+            print("⚠️ Binary protocol not acknowledged, using ASCII")
+
+    def read_angle(self, deadline_ms=None, retries=None, max_age=None):
+        """
+        Read the current angle within a deadline.
+
+        :param deadline_ms: Total time budget in milliseconds (default self.deadline_ms)
+        :param retries: Extra attempts allowed inside the deadline
+        :param max_age: Accept a cached angle up to this many seconds old
+                        (default: the cache freshness window). While
+                        streaming, an older sample comes back flagged as a
+                        fallback, with its own timestamp.
+        :return: Reading with the angle, its age and whether it is a fallback
+        """
+        if self._streaming:
+            # Non-blocking: the reader thread keeps the buffer fresh
+            sample = self.samples.latest()
+            if sample is None:
+                return Reading(self.last_valid_angle, None, True)
+            stalled = max_age is not None and time.monotonic() - sample.timestamp > max_age
+            return Reading(sample.angle, sample.timestamp, stalled)
+
+        cached = self.cache.get(max_age)
+        if cached is not None:
+            return cached
+
+        if deadline_ms is None:
+            deadline_ms = self.deadline_ms
+        read_reply = (
+            self._read_frame_reply if self.protocol == "binary" else self._read_ascii_reply
+        )
+        try:
+            reading = self.link.transact(b"r\n", read_reply, deadline_ms, retries, key="angle")
+        except Exception as e:
+            print(f"❗ Serial read error: {e}")
+            return Reading(self.last_valid_angle, None, True)
+        self.cache.put(reading)
+        return reading
+
+    def read_adc(self, deadline_ms=None, retries=None):
+        """Read the raw ADC value (used when recording calibration sweeps)."""
+        if self._streaming:
+            sample = self.samples.latest()
+            if sample is None:
+                return Reading(None, None, True)
+            return Reading(sample.adc, sample.timestamp)
+
+        if deadline_ms is None:
+            deadline_ms = self.deadline_ms
+        read_reply = (
+            self._read_frame_adc if self.protocol == "binary" else self._read_ascii_adc
+        )
+        return self.link.transact(b"r\n", read_reply, deadline_ms, retries, key="adc")
+
+    def request_data(self, max_age=None):
+        reading = self.read_angle(max_age=max_age)
+        if reading.value is None:
+            return self.last_valid_angle  # fallback
+        return reading.value
+
+    def _read_ascii_adc(self, timeout):
+        line = self.link.read_line(timeout)
+        if line is None:
+            return None
+
+        response = line.decode("utf-8", errors="ignore").strip()
+        # print(f"Raw response from ESP32: {response}")  # Optional debug
+        try:
+            return int(response)
+        except ValueError:
+            print("⚠️ Invalid numeric response")
+            raise
+
+    def _read_ascii_reply(self, timeout):
+        adc_value = self._read_ascii_adc(timeout)
+        if adc_value is None:
+            return None
+
+        if not 0 <= adc_value <= 4095:
+            print(f"⚠️ Out-of-range ADC value: {adc_value}")
+            raise ValueError(f"Out-of-range ADC value: {adc_value}")
+
+        angle = self._convert_to_angle(adc_value)
+        self.last_valid_angle = angle
+        print(f"🎯 Potentiometer angle: {angle:.2f}°")
+        return angle
+
+    def _read_frame_adc(self, timeout):
+        self.decoder.reset()
+        deadline = time.monotonic() + timeout
+        previous = self.ser.timeout
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.ser.timeout = remaining
+                chunk = self.ser.read(self.ser.in_waiting or 1)
+                if not chunk:
+                    return None
+                frames = self.decoder.feed(chunk)
+                if frames:
+                    return frames[-1][1][-1]
+        finally:
+            self.ser.timeout = previous
+
+    def _read_frame_reply(self, timeout):
+        adc_value = self._read_frame_adc(timeout)
+        if adc_value is None:
+            return None
+        angle = self._convert_to_angle(adc_value)
+        self.last_valid_angle = angle
+        return angle
+
+    def _convert_to_angle(self, adc_value):
+        # One table lookup: linearisation is baked into the calibration table
+        return self.calibration.table[adc_value]
+
+    def frame_stats(self):
+        """Frame counters for the binary protocol (drops, CRC errors, ...)."""
+        return self.decoder.stats()
+
+    def cache_stats(self):
+        return self.cache.stats()
+
+    def link_stats(self):
+        """Transaction counters (timeouts, retries, fallbacks, ...)."""
+        return self.link.stats() if self.link else {}
+
+    # ------------------------------------------------------------------
+    # Streaming mode
+    # ------------------------------------------------------------------
+    def start_streaming(self, buffer_size=512, first_sample_timeout=1.0, confirm_timeout=0.2):
+        """
+        Ask the ESP32 to push samples continuously and drain them on a
+        background thread into a bounded ring buffer.
+
+        :param buffer_size: Number of samples kept in the ring buffer
+        :param first_sample_timeout: Seconds to wait for the first sample
+        :param confirm_timeout: Seconds after the first sample within which
+                                a second one must arrive. Firmware that
+                                answers "s" with a single reading would
+                                otherwise leave the reader on a frozen sample.
+        :return: True if samples are flowing, False if the firmware did not
+                 keep answering (the reader then stays in request/response mode)
+        """
+        if self._stream_thread and self._stream_thread.is_alive():
+            return True
+
+        self.samples = SampleRingBuffer(buffer_size)
+        self.stream_errors = 0
+        self.stream_updates = 0
+        with self.lock:
+            # Short read timeout so the reader thread notices stop requests
+            self.ser.timeout = 0.05
+            self.ser.reset_input_buffer()
+            self.decoder.reset()
+            self.ser.write(b"s\n")
+            self._streaming = True
+
+        target = self._stream_frames if self.protocol == "binary" else self._stream_loop
+        self._stream_thread = threading.Thread(target=target, daemon=True)
+        self._stream_thread.start()
+
+        deadline = time.monotonic() + first_sample_timeout
+        first_seen = False
+        while time.monotonic() < deadline:
+            if self.stream_updates >= 2:
+                print(f"📡 Streaming angle samples from {self.port}")
+                return True
+            if self.stream_updates and not first_seen:
+                first_seen = True
+                deadline = min(deadline, time.monotonic() + confirm_timeout)
+            time.sleep(0.005)
+
+        if first_seen:
+            print("⚠️ Only one streamed sample received, staying in request mode")
+        else:
+            print("⚠️ No streamed samples received, staying in request mode")
+        self.stop_streaming()
+        return False
+
+    def stop_streaming(self):
+        if not self._streaming:
+            return
+        self._streaming = False
+        if self._stream_thread:
+            self._stream_thread.join(timeout=1.0)
         with self.lock:
             try:
-                message = "r\n"
-                self.ser.write(message.encode())
-                # print(f"Sent to ESP32: {message.strip()}")  # Optional debug
+                self.ser.write(b"x\n")
+                self.ser.reset_input_buffer()
+                self.decoder.reset()
+            except Exception as e:
+                print(f"❗ Serial write error: {e}")
+            self.ser.timeout = self.timeout
 
-                response = self.ser.readline().decode("utf-8").strip()
-                if response:
-                    # print(f"Raw response from ESP32: {response}")  # Optional debug
-                    try:
-                        adc_value = int(response)
-                        angle = self._convert_to_angle(adc_value)
+    def _stream_loop(self):
+        while self._streaming:
+            try:
+                line = self.ser.readline()
+            except Exception as e:
+                print(f"❗ Serial read error: {e}")
+                time.sleep(0.05)
+                continue
 
-                        if 0 <= angle <= 300:
-                            self.last_valid_angle = angle
-                            print(f"🎯 Potentiometer angle: {angle:.2f}°")
-                            return angle
-                        else:
-                            print(f"⚠️ Out-of-range angle: {angle:.2f}°")
+            if not line:
+                continue
 
-                    except ValueError:
-                        print("⚠️ Invalid numeric response")
+            timestamp = time.monotonic()
+            try:
+                adc_value = int(line.strip())
+            except ValueError:
+                self.stream_errors += 1
+                continue
 
-                return self.last_valid_angle  # fallback
+            if 0 <= adc_value <= 4095:
+                angle = self._convert_to_angle(adc_value)
+                self.last_valid_angle = angle
+                sample = AngleSample(timestamp, angle, adc_value)
+                self.samples.append(sample)
+                self.stream_updates += 1
+                self._notify(sample)
+            else:
+                self.stream_errors += 1
 
+    def _stream_frames(self):
+        while self._streaming:
+            try:
+                chunk = self.ser.read(self.ser.in_waiting or 1)
             except Exception as e:
                 print(f"❗ Serial read error: {e}")
-                return self.last_valid_angle
+                time.sleep(0.05)
+                continue
 
-    def _convert_to_angle(self, adc_value):
-        return (adc_value / 4095.0) * 300.0
+            if not chunk:
+                continue
+
+            timestamp = time.monotonic()
+            for _, batch in self.decoder.feed(chunk):
+                # Samples in a batch were taken sample_period apart, newest last
+                last = len(batch) - 1
+                for i, adc_value in enumerate(batch):
+                    angle = self._convert_to_angle(adc_value)
+                    sample_time = timestamp - (last - i) * self.sample_period
+                    sample = AngleSample(sample_time, angle, adc_value)
+                    self.samples.append(sample)
+                self.last_valid_angle = sample.angle
+                self.batch_size = len(batch)
+                self.stream_updates += 1
+                self._notify(sample)
+
+    def add_sample_listener(self, callback):
+        """
+        Call callback(sample) from the streaming thread for every new sample
+        (the newest one per binary batch). Keep callbacks short.
+        """
+        self._sample_listeners.append(callback)
+
+    def remove_sample_listener(self, callback):
+        if callback in self._sample_listeners:
+            self._sample_listeners.remove(callback)
+
+    def _notify(self, sample):
+        for callback in list(self._sample_listeners):
+            try:
+                callback(sample)
+            except Exception as e:
+                print(f"❗ Sample listener error: {e}")
+
+    def latest(self):
+        """Newest streamed AngleSample, or None. Never blocks on the serial link."""
+        return self.samples.latest() if self.samples else None
+
+    def since(self, t):
+        """Streamed samples newer than t (time.monotonic() seconds), oldest first."""
+        return self.samples.since(t) if self.samples else []
+
+    @property
+    def is_streaming(self):
+        return self._streaming
+
+    @property
+    def update_interval(self):
+        """
+        Seconds between new samples reaching the host while streaming. In
+        binary mode a whole batch arrives at once, so the newest sample is
+        up to batch_size * sample_period old before the next frame lands.
+        """
+        if self._streaming and self.protocol == "binary":
+            return self.batch_size * self.sample_period
+        return 0.0
 
     def run_loop(self, interval=1):
         try:
@@ -64,6 +470,7 @@ class ESP32SerialReader:
             self.close()
 
     def close(self):
+        self.stop_streaming()
         if self.ser and self.ser.is_open:
             self.ser.close()
             print("🔒 Serial connection closed.")
@@ -0,0 +1,220 @@
+"""
+Binary framing for ESP32 potentiometer samples.
+
+Frame layout (all multi-byte fields big-endian):
+
+    +------+-----+-------+----------------------------+--------+
+    | 0xA5 | seq | count | count x 12-bit ADC samples | CRC-16 |
+    +------+-----+-------+----------------------------+--------+
+
+Two samples are packed into three bytes; an odd trailing sample is padded
+with a zero nibble. The CRC is CRC-16/CCITT-FALSE over seq, count and the
+payload. A batch of 16 samples takes 29 bytes (1.8 bytes/sample) against
+roughly 6 bytes/sample for the newline-terminated ASCII protocol.
+"""
+
+import binascii
+import struct
+import time
+
+SYNC = 0xA5
+HEADER_SIZE = 3
+CRC_SIZE = 2
+MAX_BATCH = 64
+ADC_MAX = 4095
+
+
+def payload_size(count):
+    return (count * 3 + 1) // 2
+
+
+def frame_size(count):
+    return HEADER_SIZE + payload_size(count) + CRC_SIZE
+
+
+def crc16(data):
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def pack12(samples):
+    """Pack 12-bit samples two-per-three-bytes."""
+    out = bytearray()
+    for i in range(0, len(samples) - 1, 2):
+        a, b = samples[i], samples[i + 1]
+        out += bytes((a >> 4, ((a & 0x0F) << 4) | (b >> 8), b & 0xFF))
+    if len(samples) % 2:
+        a = samples[-1]
+        out += bytes((a >> 4, (a & 0x0F) << 4))
+    return bytes(out)
+
+
+def unpack12(payload, count):
+    samples = []
+    for j in range(0, (count // 2) * 3, 3):
+        b0, b1, b2 = payload[j], payload[j + 1], payload[j + 2]
+        samples.append((b0 << 4) | (b1 >> 4))
+        samples.append(((b1 & 0x0F) << 8) | b2)
+    if count % 2:
+        j = (count // 2) * 3
+        samples.append((payload[j] << 4) | (payload[j + 1] >> 4))
+    return samples
+
+
+def encode_frame(seq, samples):
+    """Build one frame carrying 1..MAX_BATCH ADC samples."""
+    count = len(samples)
+    if not 1 <= count <= MAX_BATCH:
+        raise ValueError(f"Batch size must be 1..{MAX_BATCH}, got {count}")
+    if any(not 0 <= s <= ADC_MAX for s in samples):
+        raise ValueError("ADC samples must be 12-bit values")
+    body = bytes((seq & 0xFF, count)) + pack12(samples)
+    return bytes((SYNC,)) + body + struct.pack(">H", crc16(body))
+
+
+class FrameDecoder:
+    """
+    Incremental frame decoder. Feed it whatever bytes the serial port
+    returns; complete frames come back as (seq, samples) tuples.
+
+    Corrupted frames (bad CRC or impossible length) are counted once and
+    the decoder resynchronises on the next sync byte; candidates that fail
+    while it is still resynchronising are not counted again. Gaps in the
+    sequence number are counted as dropped frames.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._expected_seq = None
+        self._resyncing = False
+        self.frames_ok = 0
+        self.frames_dropped = 0
+        self.crc_errors = 0
+        self.bytes_discarded = 0
+        self.samples_decoded = 0
+
+    def feed(self, data):
+        self._buffer += data
+        frames = []
+        buf = self._buffer
+
+        while True:
+            start = buf.find(SYNC)
+            if start < 0:
+                self.bytes_discarded += len(buf)
+                buf.clear()
+                break
+            if start:
+                self.bytes_discarded += start
+                del buf[:start]
+            if len(buf) < HEADER_SIZE:
+                break
+
+            count = buf[2]
+            if not 1 <= count <= MAX_BATCH:
+                self._reject(buf)
+                continue
+
+            size = frame_size(count)
+            if len(buf) < size:
+                break
+
+            body = bytes(buf[1 : size - CRC_SIZE])
+            (crc,) = struct.unpack_from(">H", buf, size - CRC_SIZE)
+            if crc != crc16(body):
+                self._reject(buf)
+                continue
+
+            seq = body[0]
+            if self._expected_seq is not None and seq != self._expected_seq:
+                self.frames_dropped += (seq - self._expected_seq) % 256
+            self._expected_seq = (seq + 1) % 256
+
+            samples = unpack12(body[2:], count)
+            self._resyncing = False
+            self.frames_ok += 1
+            self.samples_decoded += count
+            frames.append((seq, samples))
+            del buf[:size]
+
+        return frames
+
+    def _reject(self, buf):
+        """Skip the sync byte of a bad frame; count the frame, not every retry."""
+        if not self._resyncing:
+            self.crc_errors += 1
+            self._resyncing = True
+        self.bytes_discarded += 1
+        del buf[:1]
+
+    def reset(self):
+        self._buffer.clear()
+        self._expected_seq = None
+        self._resyncing = False
+
+    def stats(self):
+        return {
+            "frames_ok": self.frames_ok,
+            "frames_dropped": self.frames_dropped,
+            "crc_errors": self.crc_errors,
+            "bytes_discarded": self.bytes_discarded,
+            "samples_decoded": self.samples_decoded,
+        }
+
+
+def encode_ascii(samples):
+    """The legacy wire format, for comparison."""
+    return b"".join(f"{s}\r\n".encode() for s in samples)
+
+
+def _decode_ascii(data):
+    values = []
+    for line in data.split(b"\n"):
+        line = line.strip()
+        if line:
+            try:
+                values.append(int(line))
+            except ValueError:
+                pass
+    return values
+
+
+def benchmark(n_samples=200_000, batch=16, baudrate=9600):
+    """Compare wire size and host decode cost of ASCII vs binary framing."""
+    samples = [(i * 37) % (ADC_MAX + 1) for i in range(n_samples)]
+
+    ascii_stream = encode_ascii(samples)
+    binary_stream = b"".join(
+        encode_frame(i // batch, samples[i : i + batch])
+        for i in range(0, n_samples, batch)
+    )
+
+    t0 = time.perf_counter()
+    ascii_values = _decode_ascii(ascii_stream)
+    ascii_time = time.perf_counter() - t0
+
+    decoder = FrameDecoder()
+    t0 = time.perf_counter()
+    binary_values = []
+    for i in range(0, len(binary_stream), 256):  # serial-sized chunks
+        for _, batch_samples in decoder.feed(binary_stream[i : i + 256]):
+            binary_values.extend(batch_samples)
+    binary_time = time.perf_counter() - t0
+
+    assert ascii_values == samples and binary_values == samples
+
+    bits_per_byte = 10  # 8N1
+    for name, stream, elapsed in (
+        ("ASCII ", ascii_stream, ascii_time),
+        ("Binary", binary_stream, binary_time),
+    ):
+        per_sample = len(stream) / n_samples
+        wire_rate = baudrate / bits_per_byte / per_sample
+        print(
+            f"📊 {name}: {per_sample:.2f} bytes/sample, "
+            f"{wire_rate:6.0f} samples/s at {baudrate} baud, "
+            f"decode {n_samples / elapsed / 1e3:8.1f} k samples/s"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
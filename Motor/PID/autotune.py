@@ -0,0 +1,241 @@
+"""
+Offline PID gain tuner for the steering loop.
+
+Identifies the steering plant from recorded angle/duty traces (see
+Motor/sysid.py) or loads a saved model, then simulates thousands of
+candidate gain sets at once (vectorised with NumPy and split across a
+process pool) and ranks them by settle time, overshoot and motor effort.
+Gains are in TimedPIDController units (ki per second, kd in seconds),
+ready for ContinuousSteeringController.
+
+    python3 -m Motor.PID.autotune pid_traces/*.json
+    python3 -m Motor.PID.autotune --synthetic      # no recorded data needed
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Motor.sysid import SteeringPlantModel, identify
+from Motor.traces import load_trace
+
+
+def build_scenario(center=150.0, steps=(30.0, -30.0, 0.0), hold=3.0, dt=0.02):
+    """Setpoint schedule: a series of offsets from center, each held `hold` s."""
+    per_step = int(round(hold / dt))
+    setpoints = np.concatenate([np.full(per_step, center + s) for s in steps])
+    return setpoints, per_step
+
+
+def simulate(model, kp, ki, kd, setpoints, start_angle, derivative_tau=0.02,
+             integral_limit=100.0, output_limit=100.0):
+    """
+    Closed-loop simulation of TimedPIDController + plant for N gain sets at
+    once. kp, ki, kd are arrays of shape (N,); returns angle and duty
+    histories of shape (steps, N).
+    """
+    dt = model.dt
+    n = kp.shape[0]
+    angle = np.full(n, float(start_angle))
+    velocity = np.zeros(n)
+    integral = np.zeros(n)
+    derivative = np.zeros(n)
+    last_measurement = angle.copy()
+    last_output = np.zeros(n)
+    alpha = dt / (derivative_tau + dt) if derivative_tau > 0 else 1.0
+
+    angles = np.empty((len(setpoints), n))
+    outputs = np.empty((len(setpoints), n))
+    for k, setpoint in enumerate(setpoints):
+        error = setpoint - angle
+        derivative += alpha * (-(angle - last_measurement) / dt - derivative)
+        last_measurement = angle
+
+        saturated = ((last_output >= output_limit) & (error > 0)) | (
+            (last_output <= -output_limit) & (error < 0)
+        )
+        integral = np.where(
+            saturated,
+            integral,
+            np.clip(integral + ki * error * dt, -integral_limit, integral_limit),
+        )
+        output = np.clip(
+            kp * error + integral + kd * derivative, -output_limit, output_limit
+        )
+        last_output = output
+
+        angles[k] = angle
+        outputs[k] = output
+        velocity = model.a * velocity + model.drive(output)
+        angle = angle + velocity * dt
+
+    return angles, outputs
+
+
+def score(angles, outputs, setpoints, per_step, dt, tolerance=2.0,
+          weights=(1.0, 0.02, 0.005)):
+    """
+    Per-candidate metrics: mean settle time (s), mean overshoot (% of step)
+    and mean |duty| (%), plus the weighted cost used for ranking. A step that
+    never settles counts as twice its hold time.
+    """
+    n_steps = len(setpoints) // per_step
+    settle = np.zeros(angles.shape[1])
+    overshoot = np.zeros(angles.shape[1])
+    previous = angles[0]
+
+    for i in range(n_steps):
+        seg = slice(i * per_step, (i + 1) * per_step)
+        target = setpoints[seg][0]
+        error = angles[seg] - target
+        step = target - previous
+        direction = np.sign(step)
+        size = np.maximum(np.abs(step), 1e-6)
+
+        outside = np.abs(error) > tolerance
+        # Index of the last out-of-tolerance sample (+1), 0 if always inside
+        last_out = per_step - np.argmax(outside[::-1], axis=0)
+        last_out = np.where(outside.any(axis=0), last_out, 0)
+        seg_settle = last_out * dt
+        seg_settle = np.where(outside[-1], 2 * per_step * dt, seg_settle)
+        settle += seg_settle
+
+        beyond = np.max(error * direction, axis=0)
+        overshoot += np.where(np.abs(step) > tolerance, np.maximum(0, beyond) / size * 100, 0)
+        previous = angles[seg][-1]
+
+    settle /= n_steps
+    overshoot /= n_steps
+    effort = np.mean(np.abs(outputs), axis=0)
+    w_settle, w_overshoot, w_effort = weights
+    cost = w_settle * settle + w_overshoot * overshoot + w_effort * effort
+    return cost, settle, overshoot, effort
+
+
+def _evaluate_chunk(args):
+    model_dict, gains, scenario = args
+    model = SteeringPlantModel.from_dict(model_dict)
+    setpoints, per_step, start_angle = scenario
+    angles, outputs = simulate(
+        model, gains[:, 0], gains[:, 1], gains[:, 2], setpoints, start_angle
+    )
+    return score(angles, outputs, setpoints, per_step, model.dt)
+
+
+def sample_gains(n, seed=0, kp_range=(0.1, 10.0), ki_range=(0.001, 2.0),
+                 kd_range=(0.0001, 0.05)):
+    """Log-uniform random gain sets, shape (n, 3)."""
+    rng = np.random.default_rng(seed)
+
+    def log_uniform(low, high):
+        return np.exp(rng.uniform(np.log(low), np.log(high), n))
+
+    return np.column_stack(
+        [log_uniform(*kp_range), log_uniform(*ki_range), log_uniform(*kd_range)]
+    )
+
+
+def tune(model, n_candidates=20000, workers=None, seed=0, center=150.0):
+    """
+    Evaluate n_candidates random gain sets on the model and return them
+    sorted best-first as a list of dicts.
+    """
+    workers = workers or os.cpu_count() or 1
+    gains = sample_gains(n_candidates, seed)
+    setpoints, per_step = build_scenario(center=center, dt=model.dt)
+    scenario = (setpoints, per_step, center)
+
+    chunks = np.array_split(gains, workers)
+    jobs = [(model.to_dict(), chunk, scenario) for chunk in chunks if len(chunk)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_evaluate_chunk, jobs))
+    else:
+        results = [_evaluate_chunk(job) for job in jobs]
+
+    cost, settle, overshoot, effort = (np.concatenate(r) for r in zip(*results))
+    order = np.argsort(cost)
+    return [
+        {
+            "kp": float(gains[i, 0]),
+            "ki": float(gains[i, 1]),
+            "kd": float(gains[i, 2]),
+            "cost": float(cost[i]),
+            "settle_s": float(settle[i]),
+            "overshoot_pct": float(overshoot[i]),
+            "effort_pct": float(effort[i]),
+        }
+        for i in order
+    ]
+
+
+def synthetic_trace(duration=60.0, dt=0.02, seed=1):
+    """Random duty steps through the simulated plant, in lieu of a recorded drive."""
+    from Motor.simulation import SimulatedClock, SimulatedSteeringPlant
+
+    rng = np.random.default_rng(seed)
+    clock = SimulatedClock()
+    plant = SimulatedSteeringPlant(clock=clock.now, backlash=0.0)
+    t, duty, angle = [], [], []
+    command = 0.0
+    for k in range(int(duration / dt)):
+        if k % 25 == 0:
+            command = rng.uniform(-60, 60)
+            # Steer back toward center before hitting an end stop
+            if plant.pot_angle > 230:
+                command = -abs(command)
+            elif plant.pot_angle < 70:
+                command = abs(command)
+        plant.set_duty(command)
+        t.append(clock.now())
+        duty.append(command)
+        angle.append(plant.read_angle())
+        clock.sleep(dt)
+    return np.array(t), np.array(duty), np.array(angle)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline steering PID auto-tuner")
+    parser.add_argument("traces", nargs="*", help="Recorded steering trace JSON files")
+    parser.add_argument("--synthetic", action="store_true", help="Fit to a simulated trace")
+    parser.add_argument("--model", help="Load a plant model JSON instead of fitting")
+    parser.add_argument("--save-model", help="Write the fitted plant model to this path")
+    parser.add_argument("--candidates", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", help="Write the ranked gains to this JSON file")
+    args = parser.parse_args()
+
+    if args.model:
+        model = SteeringPlantModel.load(args.model)
+    else:
+        if args.synthetic:
+            traces = [synthetic_trace()]
+        elif args.traces:
+            traces = [load_trace(path) for path in args.traces]
+        else:
+            parser.error("Give trace files, --synthetic or --model")
+        model = identify(traces)
+        if args.save_model:
+            model.save(args.save_model)
+    print(f"🔧 Plant model: {model.to_dict()}")
+
+    start = time.perf_counter()
+    ranked = tune(model, args.candidates, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️ Evaluated {args.candidates} gain sets in {elapsed:.2f} s")
+
+    print(f"{'kp':>8} {'ki':>8} {'kd':>8} {'cost':>7} {'settle s':>9} {'overshoot %':>12} {'effort %':>9}")
+    for r in ranked[: args.top]:
+        print(
+            f"{r['kp']:8.3f} {r['ki']:8.4f} {r['kd']:8.5f} {r['cost']:7.3f} "
+            f"{r['settle_s']:9.2f} {r['overshoot_pct']:12.1f} {r['effort_pct']:9.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(ranked[: args.top], f, indent=2)
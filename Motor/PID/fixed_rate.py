@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from collections import deque
+
+
+class JitterStats:
+    """Lateness of each tick relative to its schedule, in seconds."""
+
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.ticks = 0
+        self.overruns = 0
+        self.max_lateness = 0.0
+
+    def record(self, lateness):
+        self.ticks += 1
+        self.samples.append(lateness)
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+
+    def summary(self):
+        if not self.samples:
+            return {"ticks": 0, "overruns": self.overruns}
+        ordered = sorted(self.samples)
+        n = len(ordered)
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "mean_ms": sum(ordered) / n * 1000,
+            "p50_ms": ordered[n // 2] * 1000,
+            "p99_ms": ordered[min(n - 1, int(n * 0.99))] * 1000,
+            "max_ms": self.max_lateness * 1000,
+        }
+
+
+class LatencyHistogram:
+    """Event latencies in seconds, bucketed in milliseconds plus a recent window."""
+
+    BUCKETS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100)
+
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.total = 0
+
+    def record(self, latency):
+        self.total += 1
+        self.samples.append(latency)
+        latency_ms = latency * 1000
+        for i, edge in enumerate(self.BUCKETS_MS):
+            if latency_ms <= edge:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def summary(self):
+        if not self.samples:
+            return {"count": 0}
+        ordered = sorted(self.samples)
+        n = len(ordered)
+        labels = [f"<={edge}ms" for edge in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.total,
+            "p50_ms": ordered[n // 2] * 1000,
+            "p99_ms": ordered[min(n - 1, int(n * 0.99))] * 1000,
+            "max_ms": ordered[-1] * 1000,
+            "histogram": {label: c for label, c in zip(labels, self.counts) if c},
+        }
+
+
+class FixedRateExecutor:
+    """
+    Calls step(dt) every `period` seconds on a monotonic schedule.
+
+    Ticks are scheduled at start + k * period rather than "sleep after the
+    work", so a slow step shortens the next wait instead of shifting every
+    later tick. If a step overruns by more than a whole period the missed
+    ticks are skipped (and counted) instead of being run back to back.
+    dt passed to step is the measured time since the previous tick.
+
+    period may be changed while running; it applies from the next tick.
+    wake() cuts the current wait short and restarts the schedule from now.
+    A stop() stays in effect until reset(), so one issued before run() has
+    started is not lost; call reset() before running the executor again.
+    """
+
+    def __init__(self, step, period=0.02, clock=time.monotonic):
+        self.step = step
+        self.period = period
+        self.clock = clock
+        self.stats = JitterStats()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def reset(self):
+        """Clear a previous stop() so the executor can run again."""
+        self._stop.clear()
+        self._wake.clear()
+
+    def run(self):
+        """Run until stop() is called. Blocks the calling thread."""
+        next_tick = self.clock()
+        last = None
+        while not self._stop.is_set():
+            now = self.clock()
+            self.stats.record(max(0.0, now - next_tick))
+            dt = 0.0 if last is None else now - last
+            last = now
+
+            try:
+                self.step(dt)
+            except Exception as e:
+                logging.error(f"❗ Control step failed: {e}")
+
+            next_tick += self.period
+            now = self.clock()
+            if now - next_tick > self.period:
+                missed = int((now - next_tick) / self.period)
+                self.stats.overruns += missed
+                next_tick += missed * self.period
+
+            delay = next_tick - now
+            if delay > 0 and self._wake.wait(delay):
+                self._wake.clear()
+                next_tick = self.clock()
+
+    def wake(self):
+        """Run the next tick immediately instead of waiting for its slot."""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
@@ -1,3 +1,6 @@
+import time
+
+
 class PIDController:
     def __init__(self, kp, ki, kd, setpoint, output_limits=(-100, 100)):
         self.kp = kp
@@ -18,3 +21,123 @@ class PIDController:
         output = self.kp * error + self.ki * self.integral + self.kd * derivative
         output = max(self.output_limits[0], min(self.output_limits[1], output))
         return output
+
+
+class TimedPIDController:
+    """
+    PID controller that integrates over real elapsed time, so gains keep
+    their meaning when the loop runs faster or slower.
+
+    - ki is per second and kd is in seconds; dt comes from the caller or a
+      monotonic clock.
+    - The integral is clamped and frozen while the output is saturated in
+      the direction of the error (anti-windup).
+    - The derivative is taken on the measurement, not the error, and low-pass
+      filtered, so setpoint steps do not kick it and pot noise is damped.
+    - setpoint_weight < 1 softens the proportional jump on setpoint changes.
+      The weight applies to the setpoint's distance from `reference`, so for
+      absolute angles pass the resting position (e.g. the steering center);
+      with the default reference of 0 it is only meant for zero-centered
+      inputs.
+    """
+
+    def __init__(
+        self,
+        kp,
+        ki,
+        kd,
+        setpoint,
+        output_limits=(-100, 100),
+        integral_limit=None,
+        derivative_tau=0.02,
+        setpoint_weight=1.0,
+        reference=0.0,
+        clock=None,
+    ):
+        """
+        :param kp, ki, kd: Gains (ki in 1/s, kd in s)
+        :param setpoint: Initial target
+        :param output_limits: (min, max) clamp on the output
+        :param integral_limit: Max |ki * integral| contribution (default: output range)
+        :param derivative_tau: Derivative low-pass time constant in seconds (0 = off)
+        :param setpoint_weight: Fraction of the setpoint (relative to reference)
+                                used in the P term
+        :param reference: Input value the setpoint weight is taken around
+        :param clock: Callable returning seconds, used when compute() gets no dt
+        """
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.setpoint = setpoint
+        self.output_limits = output_limits
+        if integral_limit is None:
+            integral_limit = max(abs(output_limits[0]), abs(output_limits[1]))
+        self.integral_limit = integral_limit
+        self.derivative_tau = derivative_tau
+        self.setpoint_weight = setpoint_weight
+        self.reference = reference
+        self.clock = clock or time.monotonic
+
+        self.reset()
+
+    @classmethod
+    def from_tick_gains(cls, kp, ki, kd, period, setpoint, **kwargs):
+        """
+        Convert gains tuned for the per-tick PIDController running every
+        `period` seconds into time-based gains with the same behaviour.
+        """
+        return cls(kp, ki / period, kd * period, setpoint, **kwargs)
+
+    def reset(self):
+        self.integral_term = 0.0
+        self.derivative = 0.0
+        self.last_measurement = None
+        self.last_time = None
+        self.last_output = 0.0
+
+    def set_setpoint(self, setpoint):
+        """
+        Change the target without a bump: the integral is kept and the
+        derivative only sees the measurement, so the output moves by at most
+        kp * setpoint_weight * (change).
+        """
+        self.setpoint = setpoint
+
+    def compute(self, measurement, dt=None):
+        now = self.clock()
+        if dt is None:
+            dt = 0.0 if self.last_time is None else now - self.last_time
+        self.last_time = now
+
+        error = self.setpoint - measurement
+        low, high = self.output_limits
+
+        if dt > 0 and self.last_measurement is not None:
+            raw = -(measurement - self.last_measurement) / dt
+            if self.derivative_tau > 0:
+                alpha = dt / (self.derivative_tau + dt)
+                self.derivative += alpha * (raw - self.derivative)
+            else:
+                self.derivative = raw
+        self.last_measurement = measurement
+
+        p_term = self.kp * (
+            self.setpoint_weight * (self.setpoint - self.reference)
+            - (measurement - self.reference)
+        )
+        d_term = self.kd * self.derivative
+
+        if dt > 0:
+            # Conditional integration: don't wind up against a saturated output
+            saturated_high = self.last_output >= high and error > 0
+            saturated_low = self.last_output <= low and error < 0
+            if not (saturated_high or saturated_low):
+                self.integral_term += self.ki * error * dt
+                self.integral_term = max(
+                    -self.integral_limit, min(self.integral_limit, self.integral_term)
+                )
+
+        output = p_term + self.integral_term + d_term
+        output = max(low, min(high, output))
+        self.last_output = output
+        return output
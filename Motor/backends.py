@@ -0,0 +1,280 @@
+"""
+GPIO/PWM backends for MotorController.
+
+- RPiGPIOBackend: RPi.GPIO software PWM (the original behaviour)
+- SysfsPWMBackend: kernel hardware PWM through /sys/class/pwm/pwmchipN,
+  enable pins through another backend (RPi.GPIO by default)
+- SimulatedBackend: in-memory, records every pin/duty change with a timestamp
+
+The bike picks one with the BIKE_GPIO_BACKEND environment variable
+("rpi", "sysfs" or "sim"), see default_backend().
+
+Hardware PWM needs the overlay in /boot/config.txt, e.g.
+    dtoverlay=pwm-2chan,pin=18,func=2,pin2=19,func2=2
+On a Pi 4 GPIO12/18 share channel 0 and GPIO13/19 share channel 1, so
+only one motor at a time can use hardware PWM on the same chip.
+
+    python3 -m Motor.backends --benchmark
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from collections import namedtuple
+
+Edge = namedtuple("Edge", ["timestamp", "pin", "kind", "value"])
+
+# BCM pin -> pwmchip channel with the pwm-2chan overlay on a Pi 4
+DEFAULT_PWM_CHANNELS = {12: 0, 18: 0, 13: 1, 19: 1}
+
+
+class RPiGPIOBackend:
+    """RPi.GPIO digital outputs and software PWM."""
+
+    class _Channel:
+        def __init__(self, pwm):
+            self._pwm = pwm
+
+        def start(self, duty):
+            self._pwm.start(duty)
+
+        def set_duty(self, duty):
+            self._pwm.ChangeDutyCycle(duty)
+
+        def stop(self):
+            self._pwm.stop()
+
+    def __init__(self):
+        import RPi.GPIO as GPIO
+
+        self.GPIO = GPIO
+        GPIO.setmode(GPIO.BCM)
+
+    def setup_output(self, pin):
+        self.GPIO.setup(pin, self.GPIO.OUT)
+
+    def write(self, pin, level):
+        self.GPIO.output(pin, self.GPIO.HIGH if level else self.GPIO.LOW)
+
+    def pwm(self, pin, frequency):
+        self.setup_output(pin)
+        return self._Channel(self.GPIO.PWM(pin, frequency))
+
+    def cleanup(self):
+        self.GPIO.cleanup()
+
+
+class SysfsPWMBackend:
+    """
+    Hardware PWM through the kernel sysfs interface. Duty changes are a
+    single write to pwmN/duty_cycle; the PWM block keeps the waveform
+    without any CPU involvement.
+    """
+
+    class _Channel:
+        def __init__(self, backend, pin, channel, frequency):
+            self.backend = backend
+            self.pin = pin
+            self.path = os.path.join(backend.chip_path, f"pwm{channel}")
+            self.period_ns = int(round(1e9 / frequency))
+
+        def start(self, duty):
+            # period before duty: the kernel rejects duty_cycle > period
+            self.backend._write(os.path.join(self.path, "period"), self.period_ns)
+            self.set_duty(duty)
+            self.backend._write(os.path.join(self.path, "enable"), 1)
+
+        def set_duty(self, duty):
+            duty_ns = int(self.period_ns * max(0.0, min(100.0, duty)) / 100.0)
+            self.backend._write(os.path.join(self.path, "duty_cycle"), duty_ns)
+
+        def stop(self):
+            self.set_duty(0)
+            self.backend._write(os.path.join(self.path, "enable"), 0)
+
+    def __init__(self, root="/sys/class/pwm", chip=0, channels=None, gpio=None,
+                 export_timeout=1.0):
+        """
+        :param root: sysfs PWM class directory (a fake tree for tests)
+        :param chip: pwmchip number
+        :param channels: BCM pin -> PWM channel map (default: Pi 4 pwm-2chan)
+        :param gpio: Backend for the enable pins (default: RPiGPIOBackend)
+        :param export_timeout: Seconds to wait for pwmN/ to appear after export
+        """
+        self.chip_path = os.path.join(root, f"pwmchip{chip}")
+        if not os.path.isdir(self.chip_path):
+            raise FileNotFoundError(f"No PWM chip at {self.chip_path}")
+        self.channels = channels or DEFAULT_PWM_CHANNELS
+        self.gpio = gpio
+        self.export_timeout = export_timeout
+        self._claimed = {}
+
+    def _digital(self):
+        if self.gpio is None:
+            self.gpio = RPiGPIOBackend()
+        return self.gpio
+
+    @staticmethod
+    def _write(path, value):
+        with open(path, "w") as f:
+            f.write(str(value))
+
+    def _export(self, channel):
+        channel_path = os.path.join(self.chip_path, f"pwm{channel}")
+        if not os.path.isdir(channel_path):
+            self._write(os.path.join(self.chip_path, "export"), channel)
+        # udev may need a moment to create the directory and fix permissions
+        deadline = time.monotonic() + self.export_timeout
+        while not os.path.exists(os.path.join(channel_path, "duty_cycle")):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{channel_path} did not appear after export")
+            time.sleep(0.01)
+
+    def setup_output(self, pin):
+        self._digital().setup_output(pin)
+
+    def write(self, pin, level):
+        self._digital().write(pin, level)
+
+    def pwm(self, pin, frequency):
+        if pin not in self.channels:
+            raise ValueError(f"GPIO{pin} has no hardware PWM channel")
+        channel = self.channels[pin]
+        owner = self._claimed.get(channel)
+        if owner is not None and owner != pin:
+            raise ValueError(f"PWM channel {channel} already used by GPIO{owner}")
+        self._export(channel)
+        self._claimed[channel] = pin
+        logging.info(f"⚡ GPIO{pin} using hardware PWM channel {channel}")
+        return self._Channel(self, pin, channel, frequency)
+
+    def cleanup(self):
+        for channel in self._claimed:
+            try:
+                self._write(os.path.join(self.chip_path, f"pwm{channel}", "enable"), 0)
+                self._write(os.path.join(self.chip_path, "unexport"), channel)
+            except OSError as e:
+                logging.warning(f"⚠️ Could not release PWM channel {channel}: {e}")
+        self._claimed.clear()
+        if self.gpio is not None:
+            self.gpio.cleanup()
+
+
+class SimulatedBackend:
+    """
+    In-memory backend. Every level and duty change is appended to `edges`
+    as Edge(timestamp, pin, kind, value), kind being "level", "duty" or
+    "frequency".
+    """
+
+    class _Channel:
+        def __init__(self, backend, pin, frequency):
+            self.backend = backend
+            self.pin = pin
+            backend._record(pin, "frequency", frequency)
+
+        def start(self, duty):
+            self.set_duty(duty)
+
+        def set_duty(self, duty):
+            self.backend.duties[self.pin] = duty
+            self.backend._record(self.pin, "duty", duty)
+
+        def stop(self):
+            self.set_duty(0)
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.edges = []
+        self.levels = {}
+        self.duties = {}
+
+    def _record(self, pin, kind, value):
+        self.edges.append(Edge(self.clock(), pin, kind, value))
+
+    def setup_output(self, pin):
+        self.levels.setdefault(pin, False)
+
+    def write(self, pin, level):
+        self.levels[pin] = bool(level)
+        self._record(pin, "level", bool(level))
+
+    def pwm(self, pin, frequency):
+        self.setup_output(pin)
+        return self._Channel(self, pin, frequency)
+
+    def history(self, pin, kind=None):
+        return [e for e in self.edges if e.pin == pin and (kind is None or e.kind == kind)]
+
+    def cleanup(self):
+        self.levels.clear()
+        self.duties.clear()
+
+
+def default_backend():
+    """Backend chosen by BIKE_GPIO_BACKEND: "rpi" (default), "sysfs" or "sim"."""
+    name = os.environ.get("BIKE_GPIO_BACKEND", "rpi").lower()
+    if name == "sysfs":
+        return SysfsPWMBackend()
+    if name == "sim":
+        return SimulatedBackend()
+    if name != "rpi":
+        raise ValueError(f"Unknown BIKE_GPIO_BACKEND: {name}")
+    return RPiGPIOBackend()
+
+
+def make_fake_pwm_tree(root, chips=1, channels=2):
+    """
+    Create a /sys/class/pwm lookalike under root with already-exported
+    channels, so SysfsPWMBackend can run on any machine.
+    """
+    for chip in range(chips):
+        chip_path = os.path.join(root, f"pwmchip{chip}")
+        os.makedirs(chip_path, exist_ok=True)
+        for name, value in (("npwm", channels), ("export", ""), ("unexport", "")):
+            SysfsPWMBackend._write(os.path.join(chip_path, name), value)
+        for channel in range(channels):
+            channel_path = os.path.join(chip_path, f"pwm{channel}")
+            os.makedirs(channel_path, exist_ok=True)
+            for name in ("period", "duty_cycle", "enable"):
+                SysfsPWMBackend._write(os.path.join(channel_path, name), 0)
+    return root
+
+
+def benchmark(writes=20000):
+    """Steering-like duty writes through MotorController on each offline backend."""
+    import random
+
+    from Motor.config import MOTORS
+    from Motor.motor import MotorController
+
+    logging.getLogger().setLevel(logging.WARNING)  # one log line per write otherwise
+    with tempfile.TemporaryDirectory() as root:
+        make_fake_pwm_tree(root)
+        backends = {
+            "sim": SimulatedBackend(),
+            "sysfs (fake tree)": SysfsPWMBackend(root=root, gpio=SimulatedBackend()),
+        }
+        for name, backend in backends.items():
+            motor = MotorController(MOTORS["small_motor"], duty_step=0, backend=backend)
+            start = time.perf_counter()
+            for _ in range(writes):
+                motor.motor_control("left", speed=random.uniform(20, 60))
+            elapsed = time.perf_counter() - start
+            motor.cleanup()
+            print(f"📊 {name:>18}: {elapsed / writes * 1e6:7.1f} µs per motor_control, "
+                  f"{motor.write_stats()['issued']} writes issued")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GPIO/PWM backends")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--writes", type=int, default=20000)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.writes)
+    else:
+        parser.print_help()
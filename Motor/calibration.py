@@ -0,0 +1,221 @@
+import json
+import logging
+import os
+import time
+
+ADC_SIZE = 4096
+POT_RANGE = 300.0  # degrees of pot travel across the full ADC range
+
+DEFAULT_CALIBRATION_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "steering_calibration.json"
+)
+
+
+class SteeringCalibration:
+    """
+    Precomputed ADC -> angle lookup table for the steering potentiometer.
+
+    `table[adc]` is the corrected pot angle in degrees (0..300, the space
+    every steering controller and PID setpoint works in). It is built once
+    from a recorded sweep, so converting a sample at runtime is a single
+    index. Front-wheel commands are turned into pot degrees with
+    motor_delta() and clamp(), using the gear ratio and center saved here.
+
+    The same file also carries the steering profile found by the automatic
+    sweep in Motor/steering_sweep.py: end stops, center and backlash. Every
+    steering controller loads it instead of hard-coding 150/0/300. The
+    per-direction breakaway duties learned by Motor/friction.py live here
+    too.
+    """
+
+    def __init__(
+        self,
+        points,
+        gear_ratio=0.6667,
+        center=150.0,
+        table=None,
+        min_angle=0.0,
+        max_angle=POT_RANGE,
+        backlash=0.0,
+        breakaway_left=0.0,
+        breakaway_right=0.0,
+    ):
+        """
+        :param points: Sweep samples as (adc, true_pot_angle) pairs
+        :param gear_ratio: Front-wheel degrees per pot degree
+        :param center: Pot angle (degrees) with the wheel pointing straight
+        :param table: Previously built pot-angle table (rebuilt from points if omitted)
+        :param min_angle, max_angle: Usable pot range inside the end stops
+        :param backlash: Measured gear-train play in pot degrees
+        :param breakaway_left, breakaway_right: Duty (%) at which the motor
+                                                starts turning in each direction
+        """
+        self.points = sorted((int(a), float(d)) for a, d in points)
+        if len(self.points) < 2:
+            raise ValueError("A calibration sweep needs at least two points")
+        self.gear_ratio = gear_ratio
+        self.center = center
+        self.min_angle = min_angle
+        self.max_angle = max_angle
+        self.backlash = backlash
+        self.breakaway_left = breakaway_left
+        self.breakaway_right = breakaway_right
+        if table is not None and len(table) == ADC_SIZE:
+            self.table = tuple(float(v) for v in table)
+        else:
+            self.table = self._build_table(self.points)
+
+    @classmethod
+    def linear(cls, gear_ratio=0.6667, center=150.0):
+        """The uncalibrated 0..4095 -> 0..300° mapping."""
+        return cls([(0, 0.0), (ADC_SIZE - 1, POT_RANGE)], gear_ratio, center)
+
+    @staticmethod
+    def _build_table(points):
+        # Merge repeated ADC readings so the interpolation is well defined
+        merged = {}
+        for adc, angle in points:
+            merged.setdefault(adc, []).append(angle)
+        knots = [(adc, sum(v) / len(v)) for adc, v in sorted(merged.items())]
+        if len(knots) < 2:
+            raise ValueError("A calibration sweep needs two distinct ADC values")
+
+        table = []
+        segment = 0
+        for adc in range(ADC_SIZE):
+            # Piecewise-linear between knots, extending the end segments
+            while segment < len(knots) - 2 and adc > knots[segment + 1][0]:
+                segment += 1
+            (x0, y0), (x1, y1) = knots[segment], knots[segment + 1]
+            angle = y0 + (adc - x0) * (y1 - y0) / (x1 - x0)
+            table.append(min(POT_RANGE, max(0.0, angle)))
+        return tuple(table)
+
+    def motor_delta(self, steering_delta):
+        """Pot degrees needed to move the front wheel by steering_delta degrees."""
+        return steering_delta / self.gear_ratio
+
+    def clamp(self, angle):
+        """Keep a pot-angle target inside the calibrated end stops."""
+        return min(self.max_angle, max(self.min_angle, angle))
+
+    def _copy(self, **changes):
+        fields = {
+            "gear_ratio": self.gear_ratio,
+            "center": self.center,
+            "table": self.table,
+            "min_angle": self.min_angle,
+            "max_angle": self.max_angle,
+            "backlash": self.backlash,
+            "breakaway_left": self.breakaway_left,
+            "breakaway_right": self.breakaway_right,
+        }
+        fields.update(changes)
+        return SteeringCalibration(self.points, **fields)
+
+    def with_profile(self, center, min_angle, max_angle, backlash):
+        """Copy of this calibration with a new center, range and backlash."""
+        return self._copy(
+            center=center, min_angle=min_angle, max_angle=max_angle, backlash=backlash
+        )
+
+    def with_breakaway(self, left, right):
+        """Copy of this calibration with new breakaway duties."""
+        return self._copy(breakaway_left=left, breakaway_right=right)
+
+    def to_dict(self):
+        return {
+            "gear_ratio": self.gear_ratio,
+            "center": self.center,
+            "min_angle": self.min_angle,
+            "max_angle": self.max_angle,
+            "backlash": self.backlash,
+            "breakaway_left": self.breakaway_left,
+            "breakaway_right": self.breakaway_right,
+            "points": self.points,
+            "table": [round(v, 4) for v in self.table],
+        }
+
+    def save(self, path=DEFAULT_CALIBRATION_PATH):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+        logging.info(f"💾 Steering calibration saved to {path}")
+
+    @classmethod
+    def load(cls, path=DEFAULT_CALIBRATION_PATH):
+        """Load a saved calibration, or the linear default if there is none."""
+        if not os.path.exists(path):
+            logging.info("📐 No steering calibration found, using linear mapping")
+            return cls.linear()
+
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        calibration = cls(
+            data["points"],
+            gear_ratio=data["gear_ratio"],
+            center=data["center"],
+            table=data.get("table"),
+            min_angle=data.get("min_angle", 0.0),
+            max_angle=data.get("max_angle", POT_RANGE),
+            backlash=data.get("backlash", 0.0),
+            breakaway_left=data.get("breakaway_left", 0.0),
+            breakaway_right=data.get("breakaway_right", 0.0),
+        )
+        logging.info(f"📐 Steering calibration loaded from {path}")
+        return calibration
+
+
+def record_sweep(esp32, samples_per_point=10):
+    """
+    Interactively record (adc, true_angle) pairs. Move the steering to a
+    reference mark, type the pot angle it corresponds to, repeat, then
+    type 'done'.
+    """
+    points = []
+    while True:
+        entry = input("Reference pot angle (or 'done'): ").strip().lower()
+        if entry == "done":
+            return points
+        try:
+            angle = float(entry)
+        except ValueError:
+            print("❗ Enter a number or 'done'.")
+            continue
+
+        readings = []
+        for _ in range(samples_per_point):
+            reading = esp32.read_adc()
+            if not reading.is_fallback:
+                readings.append(reading.value)
+            time.sleep(0.02)
+        if not readings:
+            print("❗ No ADC readings received, try again.")
+            continue
+
+        adc = round(sum(readings) / len(readings))
+        points.append((adc, angle))
+        print(f"📍 ADC {adc} -> {angle:.1f}°")
+
+
+if __name__ == "__main__":
+    from Motor.ESP32.main import ESP32SerialReader
+
+    esp32 = ESP32SerialReader(calibration=SteeringCalibration.linear())
+    esp32.connect()
+    try:
+        current = SteeringCalibration.load()
+        points = record_sweep(esp32)
+        calibration = SteeringCalibration(
+            points,
+            gear_ratio=current.gear_ratio,
+            center=current.center,
+            min_angle=current.min_angle,
+            max_angle=current.max_angle,
+            backlash=current.backlash,
+            breakaway_left=current.breakaway_left,
+            breakaway_right=current.breakaway_right,
+        )
+        calibration.save()
+    finally:
+        esp32.close()
@@ -0,0 +1,353 @@
+"""
+Closed-loop speed control (cruise control) for the drive motor.
+
+SpeedEstimator fuses the GPS speed over ground (RMC, about 1 Hz and noisy)
+with a first-order model of the bike driven by the commanded duty, in a
+small Kalman filter. Between fixes the model carries the estimate forward
+at the control rate; each fix pulls it back toward the measurement and
+updates a speed offset that stands for slope, wind and battery level, so
+the feed-forward follows the road and the battery as it drains.
+
+CruiseController runs a PI loop on that estimate, adds the model's
+feed-forward duty and slew-limits the result. The integrator takes up
+slopes and load. If the GPS goes quiet the integrator is frozen and the
+last correction is held, which degrades to the old open-loop behaviour
+instead of running away.
+
+    python3 -m Motor.cruise --simulate
+"""
+
+import argparse
+import logging
+import math
+import threading
+import time
+
+from Motor.PID.fixed_rate import FixedRateExecutor
+
+logging.basicConfig(level=logging.INFO)
+
+KNOTS_TO_MPS = 0.514444
+
+
+class SpeedEstimator:
+    """
+    Bike speed (m/s) from the commanded duty, corrected by GPS fixes.
+
+    Two-state Kalman filter: the speed, and a speed offset standing for
+    everything the duty model does not know (slope, wind, battery level).
+    The model predicts the speed relaxing toward gain * duty + offset; a
+    GPS fix corrects both, so a climb shows up as a negative offset and the
+    estimate between fixes stops assuming a flat road.
+    """
+
+    def __init__(
+        self,
+        gain=0.04,
+        deadband=10.0,
+        time_constant=2.0,
+        speed_noise=0.2,
+        offset_noise=0.4,
+        gps_noise=0.25,
+        max_age=3.0,
+        clock=time.monotonic,
+    ):
+        """
+        :param gain: Steady-state speed (m/s) per % duty above the deadband
+        :param deadband: Duty (%) below which the bike does not move
+        :param time_constant: Seconds for the speed to follow a duty change
+        :param speed_noise: Model uncertainty growth of the speed, m/s per sqrt(s)
+        :param offset_noise: How fast the offset may wander, m/s per sqrt(s)
+        :param gps_noise: Standard deviation of GPS speed in m/s
+        :param max_age: Seconds without a fix after which the estimate is stale
+        :param clock: Time source for fix ages
+        """
+        self.gain = gain
+        self.deadband = deadband
+        self.time_constant = time_constant
+        self.speed_noise = speed_noise
+        self.offset_noise = offset_noise
+        self.gps_noise = gps_noise
+        self.max_age = max_age
+        self.clock = clock
+
+        self.speed = 0.0
+        self.offset = 0.0
+        # Covariance [[speed, cross], [cross, offset]]
+        self.p = [[1.0, 0.0], [0.0, 0.25]]
+        self.duty = 0.0
+        self.last_fix_time = None
+        self.fixes = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def model_speed(self, duty):
+        """Steady-state speed the duty model alone expects (flat road, no offset)."""
+        effective = max(0.0, abs(duty) - self.deadband)
+        return math.copysign(self.gain * effective, duty)
+
+    def duty_for(self, speed):
+        """Signed feed-forward duty expected to hold `speed`, offset included."""
+        if speed == 0:
+            return 0.0
+        with self._lock:
+            offset = self.offset
+        # The offset acts along the direction of travel
+        needed = abs(speed) - math.copysign(offset, speed)
+        return math.copysign(self.deadband + max(0.0, needed) / self.gain, speed)
+
+    def predict(self, duty, dt):
+        """Advance the model by dt seconds with the duty being applied."""
+        with self._lock:
+            self.duty = duty
+            alpha = min(1.0, dt / self.time_constant)
+            target = self.model_speed(duty) + (self.offset if duty != 0 else 0.0)
+            self.speed += (target - self.speed) * alpha
+
+            # P = F P F' + Q with F = [[1 - alpha, alpha], [0, 1]]
+            (p00, p01), (p10, p11) = self.p
+            f00, f01 = 1.0 - alpha, alpha if duty != 0 else 0.0
+            a00 = f00 * p00 + f01 * p10
+            a01 = f00 * p01 + f01 * p11
+            self.p = [
+                [a00 * f00 + a01 * f01 + self.speed_noise ** 2 * dt, a01],
+                [p10 * f00 + p11 * f01, p11 + self.offset_noise ** 2 * dt],
+            ]
+
+    def update_speed(self, speed_mps):
+        """Correct the estimate with a GPS speed over ground (unsigned)."""
+        with self._lock:
+            # GPS speed has no sign; the bike goes the way it is driven
+            measured = -speed_mps if self.duty < 0 else speed_mps
+            (p00, p01), (p10, p11) = self.p
+            innovation = measured - self.speed
+            s = p00 + self.gps_noise ** 2
+            k0, k1 = p00 / s, p10 / s
+            self.speed += k0 * innovation
+            self.offset += k1 * innovation
+            self.p = [
+                [(1 - k0) * p00, (1 - k0) * p01],
+                [p10 - k1 * p00, p11 - k1 * p01],
+            ]
+            self.last_fix_time = self.clock()
+            self.fixes += 1
+
+    def update_fix(self, fix):
+        """
+        Feed a fix dict (GPS/GPS_reader.py drain, GNSSFix.to_dict, or an RMC
+        from NMEAParser). Only valid fixes with a speed are used.
+        :return: True if the fix was used
+        """
+        if not fix or fix.get("status") != "Valid":
+            if fix and str(fix.get("type", "")).endswith("RMC"):
+                self.rejected += 1
+            return False
+        speed = fix.get("speed_mps")
+        if speed is None and fix.get("speed_knots") not in (None, ""):
+            speed = float(fix["speed_knots"]) * KNOTS_TO_MPS
+        if speed is None:
+            return False
+        self.update_speed(speed)
+        return True
+
+    @property
+    def fix_age(self):
+        if self.last_fix_time is None:
+            return float("inf")
+        return self.clock() - self.last_fix_time
+
+    @property
+    def stale(self):
+        return self.fix_age > self.max_age
+
+    def estimate(self):
+        with self._lock:
+            return self.speed
+
+    def stats(self):
+        return {
+            "speed": self.speed,
+            "std": math.sqrt(self.p[0][0]),
+            "offset": self.offset,
+            "fixes": self.fixes,
+            "rejected": self.rejected,
+            "fix_age": self.fix_age,
+        }
+
+
+class CruiseController:
+    """
+    Holds the bike at a target speed (m/s, negative = reverse) by writing
+    signed duties through `drive`, on a fixed-rate executor.
+    """
+
+    def __init__(
+        self,
+        drive,
+        estimator: SpeedEstimator,
+        target_speed=0.0,
+        kp=15.0,
+        ki=12.0,
+        period=0.1,
+        max_duty=70.0,
+        slew_rate=25.0,
+        clock=time.monotonic,
+    ):
+        """
+        :param drive: Callable receiving the signed duty (%) to apply
+        :param estimator: SpeedEstimator fed with GPS fixes elsewhere
+        :param target_speed: Initial target in m/s
+        :param kp: Duty (%) per m/s of speed error
+        :param ki: Duty (%) per m/s of error per second
+        :param period: Control period in seconds
+        :param max_duty: Duty limit (%)
+        :param slew_rate: Max duty change in % per second
+        """
+        self.drive = drive
+        self.estimator = estimator
+        self.target_speed = target_speed
+        self.kp = kp
+        self.ki = ki
+        self.max_duty = max_duty
+        self.slew_rate = slew_rate
+        self.integral = 0.0
+        self.duty = 0.0
+        self.stale_ticks = 0
+        self.executor = FixedRateExecutor(self._step, period=period, clock=clock)
+        self._thread = None
+        self._was_stale = False
+
+    def set_target_speed(self, speed):
+        if (speed >= 0) != (self.target_speed >= 0):
+            self.integral = 0.0  # correction learned going one way does not apply the other
+        self.target_speed = speed
+        logging.info(f"🚴 Cruise target {speed:.2f} m/s")
+
+    def _step(self, dt):
+        target = self.target_speed
+        speed = self.estimator.estimate()
+        feed_forward = self.estimator.duty_for(target)
+
+        # No warning before the first fix has ever arrived
+        stale = self.estimator.stale
+        if stale != self._was_stale and self.estimator.fixes:
+            if stale:
+                logging.warning("⚠️ No GPS speed, cruise holding its last correction")
+            else:
+                logging.info("📡 GPS speed back, cruise closed-loop again")
+            self._was_stale = stale
+
+        error = target - speed
+        if stale:
+            self.stale_ticks += 1
+            command = feed_forward + self.integral
+        else:
+            command = feed_forward + self.kp * error + self.integral
+            # Integrate only while the output is not pinned against its limit
+            # in the same direction as the error (anti-windup)
+            pinned = abs(command) >= self.max_duty and (command > 0) == (error > 0)
+            if not pinned and dt > 0:
+                self.integral += self.ki * error * dt
+                self.integral = max(-self.max_duty, min(self.max_duty, self.integral))
+
+        if target == 0:
+            command = 0.0
+        command = max(-self.max_duty, min(self.max_duty, command))
+        if dt > 0:
+            step = self.slew_rate * dt
+            command = max(self.duty - step, min(self.duty + step, command))
+        self.duty = command
+
+        self.drive(command)
+        self.estimator.predict(command, dt)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self.executor.reset()
+        self._thread = threading.Thread(target=self.executor.run, daemon=True)
+        self._thread.start()
+        logging.info(f"🚴 Cruise control started at {self.target_speed:.2f} m/s")
+
+    def stop(self, join=True):
+        """Stop the loop. The motor is left as is; the owner decides how to stop it."""
+        self.executor.stop()
+        if join and self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def stats(self):
+        return {
+            "target": self.target_speed,
+            "duty": self.duty,
+            "integral": self.integral,
+            "stale_ticks": self.stale_ticks,
+            "estimator": self.estimator.stats(),
+            "jitter": self.executor.stats.summary(),
+        }
+
+
+def simulate(target=1.0, duration=120.0, period=0.1, seed=1):
+    """
+    Open-loop duty vs cruise control on a simulated ride: flat, 4% climb,
+    3% descent, flat, with the battery sagging from 100% to 80%.
+    """
+    import random
+
+    from Motor.simulation import SimulatedBike, SimulatedClock
+
+    def grade(t):
+        if 30 <= t < 60:
+            return 0.04
+        if 60 <= t < 90:
+            return -0.03
+        return 0.0
+
+    segments = (("flat", 0, 30), ("climb", 30, 60), ("descent", 60, 90), ("flat, low battery", 90, 120))
+
+    for label in ("open loop", "cruise"):
+        random.seed(seed)
+        clock = SimulatedClock()
+        bike = SimulatedBike(clock=clock.now, grade=grade,
+                             battery=lambda t: 1.0 - 0.2 * t / duration)
+        estimator = SpeedEstimator(clock=clock.now)
+        # Open loop uses the duty that gives `target` on the flat with a full battery
+        open_duty = bike.duty_for(target)
+        controller = CruiseController(bike.set_duty, estimator, target, period=period,
+                                      clock=clock.now)
+        samples = []
+        next_fix = 1.0
+        t = 0.0
+        while t < duration:
+            if label == "cruise":
+                controller._step(period if t > 0 else 0.0)
+            else:
+                bike.set_duty(open_duty)
+            clock.sleep(period)
+            t = clock.now()
+            if t >= next_fix:
+                estimator.update_fix(bike.gps_fix())
+                next_fix += 1.0
+            samples.append((t, bike.speed))
+
+        parts = []
+        for name, start, end in segments:
+            speeds = [v for ts, v in samples if start + 10 <= ts < end]  # skip transients
+            mean = sum(speeds) / len(speeds)
+            parts.append(f"{name} {mean:.2f}")
+        rms = math.sqrt(sum((v - target) ** 2 for ts, v in samples if ts >= 10) /
+                        sum(1 for ts, _ in samples if ts >= 10))
+        print(f"🚴 {label:>9}: mean speed per segment (m/s) [{', '.join(parts)}], "
+              f"RMS error {rms:.2f} m/s")
+    print(f"📈 Final speed offset {estimator.offset:+.2f} m/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive motor cruise control")
+    parser.add_argument("--simulate", action="store_true", help="Compare open loop and cruise in simulation")
+    parser.add_argument("--target", type=float, default=1.0, help="Target speed in m/s")
+    args = parser.parse_args()
+
+    if args.simulate:
+        simulate(target=args.target)
+    else:
+        parser.print_help()
@@ -0,0 +1,207 @@
+import argparse
+import logging
+import statistics
+import time
+
+from Motor.calibration import SteeringCalibration
+
+logging.basicConfig(level=logging.INFO)
+
+
+class FrictionCompensator:
+    """
+    Static-friction (breakaway) compensation between the PID and the motor.
+
+    Any non-trivial PID output is offset by that direction's breakaway duty
+    and rescaled so 100% still maps to 100%:
+
+        duty = breakaway + |u| * (100 - breakaway) / 100
+
+    so small corrections actually move the wheel instead of sitting in the
+    motor's deadband. Inside hold_error of the target the output is zeroed,
+    otherwise the breakaway kick would keep hunting around the setpoint.
+    """
+
+    def __init__(self, breakaway_left=0.0, breakaway_right=0.0, min_output=0.5,
+                 hold_error=0.5):
+        """
+        :param breakaway_left, breakaway_right: Duty (%) at which the motor starts
+                                                turning left / right
+        :param min_output: PID outputs (%) below this are treated as zero
+        :param hold_error: Error (°) inside which no drive is applied
+        """
+        self.breakaway_left = breakaway_left
+        self.breakaway_right = breakaway_right
+        self.min_output = min_output
+        self.hold_error = hold_error
+
+    @classmethod
+    def from_calibration(cls, calibration, **kwargs):
+        return cls(calibration.breakaway_left, calibration.breakaway_right, **kwargs)
+
+    @classmethod
+    def from_model(cls, model, **kwargs):
+        """Breakaway duties from an identified SteeringPlantModel (Motor/sysid.py)."""
+        return cls(model.deadband_left, model.deadband_right, **kwargs)
+
+    @property
+    def enabled(self):
+        return self.breakaway_left > 0 or self.breakaway_right > 0
+
+    def compensate(self, output, error=None):
+        """
+        :param output: PID output, signed % (positive = "left")
+        :param error: Setpoint minus angle (°), enables the hold band
+        :return: Signed duty for the motor
+        """
+        if abs(output) < self.min_output:
+            return 0.0
+        if error is not None and abs(error) <= self.hold_error:
+            return 0.0
+        breakaway = self.breakaway_left if output > 0 else self.breakaway_right
+        duty = breakaway + min(100.0, abs(output)) * (100.0 - breakaway) / 100.0
+        return duty if output > 0 else -duty
+
+
+def measure_breakaway(
+    motor,
+    esp32,
+    direction,
+    start_duty=0.0,
+    step=1.0,
+    dwell=0.15,
+    move_threshold=0.5,
+    max_duty=60.0,
+    clock=time.monotonic,
+    sleep=time.sleep,
+):
+    """
+    Raise the duty from standstill in `step` increments, holding each for
+    `dwell` seconds, and return the first duty that moves the pot by
+    move_threshold degrees. Run after a move in the same direction so the
+    gear play is already taken up.
+    """
+    start_angle = esp32.read_angle().value
+    duty = start_duty
+    try:
+        while duty <= max_duty:
+            motor.motor_control(direction, speed=duty)
+            end = clock() + dwell
+            while clock() < end:
+                sleep(0.01)
+                if abs(esp32.read_angle().value - start_angle) >= move_threshold:
+                    return duty
+            duty += step
+    finally:
+        motor.stop_immediately()
+    raise RuntimeError(f"Steering did not move turning {direction} up to {max_duty}% duty")
+
+
+def learn_breakaway(motor, esp32, trials=3, settle=0.5, sleep=time.sleep, **kwargs):
+    """
+    Measure the breakaway duty `trials` times per direction and return the
+    medians as (left, right).
+    """
+    results = {}
+    for direction in ("left", "right"):
+        # Take up the gear play toward this direction first
+        measure_breakaway(motor, esp32, direction, sleep=sleep, **kwargs)
+        duties = []
+        for _ in range(trials):
+            sleep(settle)
+            duties.append(measure_breakaway(motor, esp32, direction, sleep=sleep, **kwargs))
+        results[direction] = statistics.median(duties)
+        logging.info(f"🧲 Breakaway {direction}: {results[direction]:.1f}% (trials {duties})")
+    return results["left"], results["right"]
+
+
+def settle_time(plant, clock, friction, target_offset=10.0, tolerance=1.0,
+                kp=0.8, ki=0.05, kd=0.001, period=0.02, limit=20.0):
+    """
+    Simulated step response of the continuous steering loop; returns the
+    time (s) until the angle stays within tolerance, or `limit`.
+    """
+    from BLT.continuous_steering import ContinuousSteeringController
+    from Motor.simulation import SimulatedESP32, SimulatedMotor
+
+    controller = ContinuousSteeringController(
+        SimulatedMotor(plant), SimulatedESP32(plant), kp=kp, ki=ki, kd=kd,
+        period=period, friction=friction,
+    )
+    target = plant.pot_angle + target_offset
+    controller.set_target_angle(target)
+    start = clock.now()
+    inside_since = None
+    while clock.now() - start < limit:
+        controller._step(period)
+        clock.sleep(period)
+        if abs(plant.pot_angle - target) <= tolerance:
+            if inside_since is None:
+                inside_since = clock.now()
+            elif clock.now() - inside_since >= 0.5:
+                return inside_since - start
+        else:
+            inside_since = None
+    return limit
+
+
+def simulate():
+    """Learn the breakaway duties on the simulated plant and compare settling."""
+    from Motor.simulation import (
+        SimulatedClock,
+        SimulatedESP32,
+        SimulatedMotor,
+        SimulatedSteeringPlant,
+    )
+
+    clock = SimulatedClock()
+    plant = SimulatedSteeringPlant(clock=clock.now)
+    left, right = learn_breakaway(
+        SimulatedMotor(plant), SimulatedESP32(plant), clock=clock.now, sleep=clock.sleep
+    )
+    print(f"🧲 Learned breakaway: left {left:.1f}%, right {right:.1f}% "
+          f"(true deadband {plant.deadband}%)")
+
+    for label, friction in (
+        ("uncompensated", FrictionCompensator()),
+        ("compensated", FrictionCompensator(left, right)),
+    ):
+        times = []
+        for offset in (5.0, 10.0, -10.0, 30.0):
+            clock = SimulatedClock()
+            plant = SimulatedSteeringPlant(clock=clock.now)
+            times.append(settle_time(plant, clock, friction, target_offset=offset))
+        print(f"⏱️ {label:>14}: settle time per step {[round(t, 2) for t in times]} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Learn steering breakaway duties")
+    parser.add_argument("--simulate", action="store_true", help="Run against the simulated plant")
+    parser.add_argument("--from-model", help="Take the duties from a Motor.sysid model JSON")
+    parser.add_argument("--trials", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.simulate:
+        simulate()
+    else:
+        calibration = SteeringCalibration.load()
+        if args.from_model:
+            from Motor.sysid import SteeringPlantModel
+
+            model = SteeringPlantModel.load(args.from_model)
+            left, right = model.deadband_left, model.deadband_right
+        else:
+            from Motor.config import MOTORS
+            from Motor.motor import MotorController
+            from Motor.ESP32.main import ESP32SerialReader
+
+            motor = MotorController(MOTORS["small_motor"])
+            esp32 = ESP32SerialReader(calibration=calibration)
+            esp32.connect()
+            try:
+                left, right = learn_breakaway(motor, esp32, trials=args.trials)
+            finally:
+                motor.cleanup()
+                esp32.close()
+        calibration.with_breakaway(left, right).save()
+        print(f"💾 Breakaway saved: left {left:.1f}%, right {right:.1f}%")
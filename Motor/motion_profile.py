@@ -0,0 +1,188 @@
+"""
+Non-blocking duty ramps for MotorController.
+
+A MotionProfile maps elapsed time onto a duty between a start and an end
+value along one of three shapes:
+
+- linear:       constant rate of change
+- trapezoidal:  rate ramps up, holds, ramps down (parabolic blends at each end)
+- s_curve:      minimum-jerk polynomial, smooth rate and acceleration
+
+RampEngine plays one profile at a time on its own thread and calls
+apply(duty) every period. Starting a new profile, or cancel(), preempts
+the one in progress. Each profile is returned as a Ramp handle that
+reports completion.
+"""
+
+import logging
+import threading
+import time
+
+
+def _linear(s):
+    return s
+
+
+def _trapezoidal(s, blend=0.25):
+    # Rate rises linearly over the first `blend` of the ramp and falls over the last
+    peak = 1.0 / (1.0 - blend)
+    if s < blend:
+        return peak * s * s / (2 * blend)
+    if s > 1.0 - blend:
+        return 1.0 - peak * (1.0 - s) ** 2 / (2 * blend)
+    return peak * (s - blend / 2)
+
+
+def _s_curve(s):
+    return s * s * s * (10 + s * (-15 + 6 * s))
+
+
+SHAPES = {
+    "linear": _linear,
+    "trapezoidal": _trapezoidal,
+    "s_curve": _s_curve,
+}
+
+
+class MotionProfile:
+    """Duty (or any value) moving from start to end over duration seconds."""
+
+    def __init__(self, start, end, duration, shape="trapezoidal"):
+        if shape not in SHAPES:
+            raise ValueError(f"Unknown profile shape '{shape}', use one of {list(SHAPES)}")
+        self.start = float(start)
+        self.end = float(end)
+        self.duration = max(0.0, float(duration))
+        self.shape = shape
+        self._curve = SHAPES[shape]
+
+    @classmethod
+    def from_rate(cls, start, end, rate, shape="trapezoidal"):
+        """Profile whose average rate of change is `rate` units per second."""
+        return cls(start, end, abs(end - start) / rate if rate > 0 else 0.0, shape)
+
+    def value(self, elapsed):
+        if self.duration <= 0 or elapsed >= self.duration:
+            return self.end
+        s = max(0.0, elapsed / self.duration)
+        return self.start + (self.end - self.start) * self._curve(s)
+
+
+class Ramp:
+    """Handle for a profile played by RampEngine."""
+
+    def __init__(self, profile, on_complete=None):
+        self.profile = profile
+        self.on_complete = on_complete
+        self.started = None
+        self.completed = False  # reached the end value
+        self.preempted = False  # replaced or cancelled before the end
+        self.done = threading.Event()
+
+    @classmethod
+    def finished(cls, value=0.0):
+        """An already-completed ramp, for when there is nothing to do."""
+        ramp = cls(MotionProfile(value, value, 0.0, "linear"))
+        ramp.completed = True
+        ramp.done.set()
+        return ramp
+
+    def wait(self, timeout=None):
+        """Block until the ramp completes or is preempted; True if done."""
+        return self.done.wait(timeout)
+
+
+class RampEngine:
+    """Plays one MotionProfile at a time on a background thread."""
+
+    def __init__(self, apply, period=0.02, clock=time.monotonic):
+        """
+        :param apply: Callable receiving each intermediate value
+        :param period: Seconds between updates
+        :param clock: Time source used to evaluate profiles
+        """
+        self.apply = apply
+        self.period = period
+        self.clock = clock
+        self.lock = threading.RLock()
+        self._ramp = None
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+
+    @property
+    def active(self):
+        return self._ramp is not None
+
+    def start(self, profile, on_complete=None):
+        """
+        Start playing profile, preempting any ramp in progress. Returns
+        immediately with a Ramp handle. on_complete runs on the engine
+        thread, under the engine lock, only if the end value is reached.
+        """
+        ramp = Ramp(profile, on_complete)
+        with self.lock:
+            self._preempt()
+            ramp.started = self.clock()
+            self._ramp = ramp
+        self._ensure_thread()
+        self._wake.set()
+        return ramp
+
+    def cancel(self):
+        """Stop the ramp in progress where it is. Safe to call from any thread."""
+        with self.lock:
+            self._preempt()
+
+    def _preempt(self):
+        if self._ramp is not None:
+            self._ramp.preempted = True
+            self._ramp.done.set()
+            self._ramp = None
+
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            ramp = self._ramp
+            if ramp is None:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            finished = False
+            with self.lock:
+                if self._ramp is not ramp:
+                    continue  # preempted while we were waiting
+                elapsed = self.clock() - ramp.started
+                try:
+                    self.apply(ramp.profile.value(elapsed))
+                    if elapsed >= ramp.profile.duration:
+                        finished = True
+                        self._ramp = None
+                        ramp.completed = True
+                        if ramp.on_complete:
+                            ramp.on_complete()
+                except Exception as e:
+                    logging.error(f"❗ Ramp step failed: {e}")
+                    self._ramp = None
+                    ramp.preempted = True
+                    finished = True
+            if finished:
+                ramp.done.set()
+                continue
+
+            self._wake.wait(self.period)
+            self._wake.clear()
+
+    def close(self):
+        self.cancel()
+        self._running = False
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
@@ -1,8 +1,9 @@
 import logging
-import time
 from enum import Enum
 
-import RPi.GPIO as GPIO
+from Motor.backends import default_backend
+from Motor.cruise import CruiseController
+from Motor.motion_profile import MotionProfile, RampEngine, Ramp
 
 logging.basicConfig(level=logging.INFO)
 
@@ -19,86 +20,143 @@ class SteeringSpeed(Enum):
 class MotorController:
     """Class to control a motor using PWM and GPIO."""
 
-    def __init__(self, motor_pins, pwm_freq=1000):
+    # direction -> (right PWM active, log label)
+    DIRECTIONS = {
+        "forward": (True, "running FORWARD"),
+        "reverse": (False, "running REVERSE"),
+        "right": (True, "turning RIGHT"),
+        "left": (False, "running LEFT"),
+    }
+
+    def __init__(self, motor_pins, pwm_freq=1000, duty_step=1.0, backend=None):
         """
         Initializes the motor controller with the given GPIO pin configuration.
         :param motor_pins: Dictionary containing 'rpwm', 'lpwm', 'r_en', 'l_en'
         :param pwm_freq: PWM frequency (default 1000Hz)
+        :param duty_step: Duty quantization in % (0 = none). Duty changes
+                          smaller than this do not touch the hardware.
+        :param backend: GPIO/PWM backend (see Motor/backends.py); defaults
+                        to the one selected by BIKE_GPIO_BACKEND
         """
         self.rpwm_pin = motor_pins["rpwm"]
         self.lpwm_pin = motor_pins["lpwm"]
         self.r_en_pin = motor_pins["r_en"]
         self.l_en_pin = motor_pins["l_en"]
+        self.duty_step = duty_step
+        self.backend = backend or default_backend()
 
         # Setup GPIO
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.rpwm_pin, GPIO.OUT)
-        GPIO.setup(self.lpwm_pin, GPIO.OUT)
-        GPIO.setup(self.r_en_pin, GPIO.OUT)
-        GPIO.setup(self.l_en_pin, GPIO.OUT)
+        self.backend.setup_output(self.r_en_pin)
+        self.backend.setup_output(self.l_en_pin)
 
         # Setup PWM
-        self.right_pwm = GPIO.PWM(self.rpwm_pin, pwm_freq)
-        self.left_pwm = GPIO.PWM(self.lpwm_pin, pwm_freq)
+        self.right_pwm = self.backend.pwm(self.rpwm_pin, pwm_freq)
+        self.left_pwm = self.backend.pwm(self.lpwm_pin, pwm_freq)
 
         # Start PWM with 0% duty cycle (off)
         self.right_pwm.start(0)
         self.left_pwm.start(0)
 
+        # Shadow copy of what the hardware was last told; None = unknown
+        self._shadow = {
+            "r_en": None,
+            "l_en": None,
+            "right_duty": 0.0,
+            "left_duty": 0.0,
+        }
+        self.writes_issued = 0
+        self.writes_suppressed = 0
+
+        # Duty ramps run on their own thread; any direct command preempts them
+        self._ramps = RampEngine(self._apply_signed)
+        self._ramp_names = ("forward", "reverse")
+
+        # Speed-closed-loop drive (cruise control); any other command ends it
+        self._cruise = None
+
         # Track current state
         self.current_direction = "stop"
         self.current_speed = 0
 
+    def _quantize(self, duty):
+        duty = max(0.0, min(100.0, float(duty or 0)))
+        if self.duty_step > 0:
+            duty = round(duty / self.duty_step) * self.duty_step
+        return duty
+
+    def _write_pin(self, key, pin, level):
+        if self._shadow[key] == level:
+            self.writes_suppressed += 1
+            return False
+        self.backend.write(pin, level)
+        self._shadow[key] = level
+        self.writes_issued += 1
+        return True
+
+    def _write_duty(self, key, pwm, duty):
+        if self._shadow[key] == duty:
+            self.writes_suppressed += 1
+            return False
+        pwm.set_duty(duty)
+        self._shadow[key] = duty
+        self.writes_issued += 1
+        return True
+
+    def _apply(self, enabled, right_duty, left_duty):
+        """Bring the pins to the requested state; returns True if anything was written."""
+        changed = self._write_pin("r_en", self.r_en_pin, enabled)
+        changed |= self._write_pin("l_en", self.l_en_pin, enabled)
+        changed |= self._write_duty("right_duty", self.right_pwm, right_duty)
+        changed |= self._write_duty("left_duty", self.left_pwm, left_duty)
+        return changed
+
+    def write_stats(self):
+        """Hardware writes issued vs suppressed by the shadow state."""
+        total = self.writes_issued + self.writes_suppressed
+        return {
+            "issued": self.writes_issued,
+            "suppressed": self.writes_suppressed,
+            "suppressed_pct": 100.0 * self.writes_suppressed / total if total else 0.0,
+        }
+
+    def _drive(self, direction, speed):
+        """Write direction and duty through the shadow state; True if anything changed."""
+        right_active, _ = self.DIRECTIONS[direction]
+        duty = self._quantize(speed)
+        self.current_direction = direction
+        self.current_speed = speed
+        if right_active:
+            return self._apply(True, duty, 0.0)
+        return self._apply(True, 0.0, duty)
+
+    def _signed_speed(self):
+        """Current duty, positive for the directions driving the right PWM."""
+        if self.current_direction not in self.DIRECTIONS:
+            return 0.0
+        right_active, _ = self.DIRECTIONS[self.current_direction]
+        speed = float(self.current_speed or 0)
+        return speed if right_active else -speed
+
+    def _apply_signed(self, value):
+        positive, negative = self._ramp_names
+        self._drive(positive if value >= 0 else negative, abs(value))
+
     def motor_control(self, direction, speed=None, time_duration: float = None):
         """
-        Controls the motor direction and speed.
-        :param direction: 'forward', 'reverse', or 'stop'
+        Controls the motor direction and speed. Only pins and duty cycles
+        that differ from the last written state are sent to the hardware,
+        and only those calls are logged. Preempts any ramp in progress.
+        :param direction: 'forward', 'reverse', 'left', 'right' or 'stop'
         :param speed: Speed as a percentage (0 to 100)
         """
-        if direction == "forward":
-            # Update state for forward
-            self.current_direction = "forward"
-            self.current_speed = speed
-            GPIO.output(self.r_en_pin, GPIO.HIGH)
-            GPIO.output(self.l_en_pin, GPIO.HIGH)
-            self.right_pwm.ChangeDutyCycle(speed)
-            self.left_pwm.ChangeDutyCycle(0)
-            logging.info(f"Motor running FORWARD at {speed}% speed")
-        elif direction == "reverse":
-            # Update state for reverse
-            self.current_direction = "reverse"
-            self.current_speed = speed
-            GPIO.output(self.r_en_pin, GPIO.HIGH)
-            GPIO.output(self.l_en_pin, GPIO.HIGH)
-            self.right_pwm.ChangeDutyCycle(0)
-            self.left_pwm.ChangeDutyCycle(speed)
-            logging.info(f"Motor running REVERSE at {speed}% speed")
-
-        elif direction == "right":
-            # Update state for right
-            self.current_speed = speed
-            self.current_direction = "right"
-            GPIO.output(self.r_en_pin, GPIO.HIGH)
-            GPIO.output(self.l_en_pin, GPIO.HIGH)
-            self.right_pwm.ChangeDutyCycle(speed)
-            self.left_pwm.ChangeDutyCycle(0)
-            logging.info(f"Motor turning RIGHT at {speed}% speed")
-            # time.sleep(time_duration)
-            # self.stop_immediately()
-            # logging.info(f"Motor Stop for {time_duration} seconds")
-
-        elif direction == "left":
-            # Update state for left
-            self.current_speed = speed
-            self.current_direction = "left"
-            GPIO.output(self.r_en_pin, GPIO.HIGH)
-            GPIO.output(self.l_en_pin, GPIO.HIGH)
-            self.right_pwm.ChangeDutyCycle(0)
-            self.left_pwm.ChangeDutyCycle(speed)
-            logging.info(f"Motor running LEFT at {speed}% speed")
-            # time.sleep(time_duration)
-            # self.stop_immediately()
-            # logging.info(f"Motor Stop for {time_duration} seconds")
+        if direction in self.DIRECTIONS:
+            with self._ramps.lock:
+                self._end_cruise()
+                self._ramps.cancel()
+                changed = self._drive(direction, speed)
+            if changed:
+                _, label = self.DIRECTIONS[direction]
+                logging.info(f"Motor {label} at {self._quantize(speed):g}% speed")
 
         elif direction == "stop":
             # For stop, do not update the state here.
@@ -107,59 +165,139 @@ class MotorController:
         else:
             logging.error("Invalid direction! Use 'forward', 'reverse', or 'stop'.")
 
+    def ramp_to(self, direction, speed, rate=25.0, duration=None, shape="trapezoidal"):
+        """
+        Ramp from the current duty to `speed` in `direction` without blocking.
+        A ramp into the opposite direction passes through zero.
+
+        :param rate: Average duty change in %/s (ignored if duration is given)
+        :param duration: Ramp time in seconds
+        :param shape: "linear", "trapezoidal" or "s_curve"
+        :return: Ramp handle; ramp.wait() blocks until it completes or is preempted
+        """
+        if direction not in self.DIRECTIONS:
+            raise ValueError(f"Invalid direction '{direction}'")
+        right_active, label = self.DIRECTIONS[direction]
+        target = speed if right_active else -speed
+        with self._ramps.lock:
+            self._end_cruise()
+            self._ramp_names = (
+                ("forward", "reverse") if direction in ("forward", "reverse") else ("right", "left")
+            )
+            start = self._signed_speed()
+            if duration is None:
+                profile = MotionProfile.from_rate(start, target, rate, shape)
+            else:
+                profile = MotionProfile(start, target, duration, shape)
+            logging.info(
+                f"Motor ramping {label} to {speed}% over {profile.duration:.2f}s ({shape})"
+            )
+            return self._ramps.start(profile)
+
     def stop_immediately(self):
-        """Stops the motor immediately."""
-        GPIO.output(self.r_en_pin, GPIO.LOW)
-        GPIO.output(self.l_en_pin, GPIO.LOW)
-        self.right_pwm.ChangeDutyCycle(0)
-        self.left_pwm.ChangeDutyCycle(0)
-        self.current_direction = "stop"
-        self.current_speed = 0
-        logging.info("Motor stopped immediately")
+        """Stops the motor immediately, cancelling any ramp."""
+        with self._ramps.lock:
+            self._end_cruise()
+            self._ramps.cancel()
+            changed = self._apply(False, 0.0, 0.0)
+            self.current_direction = "stop"
+            self.current_speed = 0
+        if changed:
+            logging.info("Motor stopped immediately")
 
-    def graceful_stop(self, step=5, delay=0.2):
+    def graceful_stop(self, step=5, delay=0.2, shape="linear"):
         """
-        Gradually slows down the motor before stopping completely.
+        Ramp the motor down to a stop on the background ramp thread and
+        return at once. The default rate matches the old blocking ramp
+        (5% every 0.2 s); a new command cancels the ramp where it is.
 
         :param step: Speed reduction step size for each iteration (default 5%)
         :param delay: Time delay between each step in seconds (default 0.2s)
+        :param shape: Ramp shape, see Motor/motion_profile.py
+        :return: Ramp handle; call .wait() to block until stopped
         """
-        # If motor is already stopped, exit immediately.
-        if self.current_speed == 0:
-            logging.info("Motor is already stopped")
-            return
-
-        logging.info(f"Gracefully stopping from {self.current_speed}% speed")
-
-        # Store original direction and speed for the deceleration process.
-        original_direction = self.current_direction
-        original_speed = self.current_speed
-
-        # Gradually reduce speed
-        while self.current_speed > 0:
-            self.current_speed = max(0, self.current_speed - step)
-
-            if original_direction == "forward":
-                self.right_pwm.ChangeDutyCycle(self.current_speed)
-            elif original_direction == "reverse":
-                self.left_pwm.ChangeDutyCycle(self.current_speed)
-
-            logging.info(f"Reducing speed to {self.current_speed}%")
-            time.sleep(delay)
-
-        # Finally, disable the motor completely.
-        GPIO.output(self.r_en_pin, GPIO.LOW)
-        GPIO.output(self.l_en_pin, GPIO.LOW)
-        self.right_pwm.ChangeDutyCycle(0)
-        self.left_pwm.ChangeDutyCycle(0)
-        self.current_direction = "stop"
-        logging.info(
-            f"Graceful stop completed: decelerated from {original_speed}% to 0%"
-        )
+        # Snapshot the speed and start the ramp under the ramp lock, so a
+        # concurrent command cannot change the duty in between
+        with self._ramps.lock:
+            self._end_cruise()
+
+            # If motor is already stopped, exit immediately.
+            if self.current_speed == 0:
+                logging.info("Motor is already stopped")
+                return Ramp.finished()
+
+            original_speed = self.current_speed
+            logging.info(f"Gracefully stopping from {original_speed}% speed")
+
+            if self.current_direction in ("left", "right"):
+                self._ramp_names = ("right", "left")
+            else:
+                self._ramp_names = ("forward", "reverse")
+
+            def disable():
+                # Finally, disable the motor completely.
+                self._apply(False, 0.0, 0.0)
+                self.current_direction = "stop"
+                self.current_speed = 0
+                logging.info(
+                    f"Graceful stop completed: decelerated from {original_speed}% to 0%"
+                )
+
+            profile = MotionProfile.from_rate(self._signed_speed(), 0.0, step / delay, shape)
+            return self._ramps.start(profile, on_complete=disable)
+
+    def cruise(self, target_speed, estimator, **options):
+        """
+        Hold the bike at target_speed (m/s, negative = reverse) from a fused
+        GPS speed estimate, see Motor/cruise.py. Calling it again while
+        cruising with the same estimator only changes the target. Any other
+        command (motor_control, ramp_to, stop) ends cruise control.
+
+        :param estimator: SpeedEstimator fed with GPS fixes by the caller
+        :param options: CruiseController options (kp, ki, period, max_duty, ...)
+        :return: The running CruiseController
+        """
+        with self._ramps.lock:
+            if self._cruise is not None and self._cruise.estimator is estimator:
+                self._cruise.set_target_speed(target_speed)
+                return self._cruise
+            self._end_cruise()
+            self._ramps.cancel()
+            self._ramp_names = ("forward", "reverse")
+            controller = CruiseController(None, estimator, target_speed, **options)
+            controller.duty = self._signed_speed()
+            controller.drive = lambda duty: self._cruise_drive(controller, duty)
+            self._cruise = controller
+        controller.start()
+        return controller
+
+    def _cruise_drive(self, controller, duty):
+        # A controller that has been replaced or ended must not touch the pins,
+        # even if its last tick was already running when it was stopped
+        with self._ramps.lock:
+            if controller is not self._cruise:
+                return
+            self._apply_signed(duty)
+
+    def _end_cruise(self):
+        """Stop cruise control if active. Caller holds the ramp lock."""
+        if self._cruise is not None:
+            self._cruise.stop(join=False)
+            self._cruise = None
+            logging.info("🚴 Cruise control ended")
+
+    def cruise_stats(self):
+        """Target, duty and estimator state of the active cruise control, or None."""
+        cruise = self._cruise
+        return cruise.stats() if cruise is not None else None
 
     def cleanup(self):
         """Stops PWM and cleans up GPIO."""
+        with self._ramps.lock:
+            self._end_cruise()
+        self._ramps.close()
         self.right_pwm.stop()
         self.left_pwm.stop()
-        GPIO.cleanup()
+        self.backend.cleanup()
+        self._shadow = dict.fromkeys(self._shadow)
         logging.info("GPIO cleanup completed")
@@ -0,0 +1,275 @@
+import math
+import random
+import threading
+import time
+
+from Motor.calibration import SteeringCalibration
+from Transport.serial_transaction import Reading
+
+
+class SimulatedClock:
+    """Manual clock: sleep() advances time instantly so simulations run fast."""
+
+    def __init__(self, start=0.0):
+        self._now = start
+
+    def now(self):
+        return self._now
+
+    def sleep(self, seconds):
+        self._now += max(0.0, seconds)
+
+
+class SimulatedSteeringPlant:
+    """
+    First-order model of the steering motor, gearbox and pot.
+
+    The motor speed follows the commanded duty with a time constant, duty
+    below the deadband does not move it, and the wheel is stopped hard by
+    end stops. Backlash is modelled as a gap between the motor side and the
+    pot side of the gear train.
+    """
+
+    def __init__(
+        self,
+        clock=time.monotonic,
+        min_stop=20.0,
+        max_stop=280.0,
+        start_angle=150.0,
+        max_speed=120.0,
+        time_constant=0.08,
+        deadband=12.0,
+        backlash=1.5,
+        noise=0.05,
+        step=0.001,
+    ):
+        """
+        :param clock: Callable returning the current time in seconds
+        :param min_stop, max_stop: Mechanical end stops in pot degrees
+        :param max_speed: Pot degrees per second at 100% duty
+        :param time_constant: Motor speed time constant in seconds
+        :param deadband: Duty (%) below which the motor does not turn
+        :param backlash: Total gear-train play in degrees
+        :param noise: Standard deviation of pot reading noise in degrees
+        :param step: Integration step in seconds
+        """
+        self.clock = clock
+        self.min_stop = min_stop
+        self.max_stop = max_stop
+        self.max_speed = max_speed
+        self.time_constant = time_constant
+        self.deadband = deadband
+        self.backlash = backlash
+        self.noise = noise
+        self.step = step
+
+        self.motor_angle = start_angle
+        self.pot_angle = start_angle
+        self.velocity = 0.0
+        self.duty = 0.0  # signed: positive drives the angle up ("left")
+        self._last_time = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_model(cls, model, **kwargs):
+        """
+        Build a plant from an identified SteeringPlantModel (Motor/sysid.py).
+        Left/right gains and deadbands are averaged; saturation is ignored.
+        """
+        deadband = (model.deadband_left + model.deadband_right) / 2.0
+        gain = (model.b_left + model.b_right) / 2.0
+        # Steady state of v = a*v + b*u is b*u / (1 - a), u at 100% = 100 - deadband
+        max_speed = gain / (1.0 - model.a) * (100.0 - deadband)
+        kwargs.setdefault("time_constant", model.time_constant)
+        return cls(max_speed=max_speed, deadband=deadband, **kwargs)
+
+    def set_duty(self, duty):
+        with self._lock:
+            self._advance()
+            self.duty = duty
+
+    def read_angle(self):
+        with self._lock:
+            self._advance()
+            return self.pot_angle + random.gauss(0.0, self.noise)
+
+    def _advance(self):
+        now = self.clock()
+        elapsed = now - self._last_time
+        self._last_time = now
+        while elapsed > 0:
+            dt = min(self.step, elapsed)
+            elapsed -= dt
+            self._integrate(dt)
+
+    def _integrate(self, dt):
+        effective = 0.0
+        if abs(self.duty) > self.deadband:
+            # Duty above the deadband maps linearly onto 0..max_speed
+            span = 100.0 - self.deadband
+            effective = (abs(self.duty) - self.deadband) / span
+            effective = effective if self.duty > 0 else -effective
+        target_velocity = effective * self.max_speed
+        self.velocity += (target_velocity - self.velocity) * min(
+            1.0, dt / self.time_constant
+        )
+        self.motor_angle += self.velocity * dt
+
+        # Pot side only moves once the motor side has taken up the play
+        half_gap = self.backlash / 2.0
+        if self.motor_angle - self.pot_angle > half_gap:
+            self.pot_angle = self.motor_angle - half_gap
+        elif self.pot_angle - self.motor_angle > half_gap:
+            self.pot_angle = self.motor_angle + half_gap
+
+        # End stops only block motion into them
+        if self.pot_angle > self.max_stop or self.pot_angle < self.min_stop:
+            self.pot_angle = min(self.max_stop, max(self.min_stop, self.pot_angle))
+            self.motor_angle = min(
+                self.pot_angle + half_gap, max(self.pot_angle - half_gap, self.motor_angle)
+            )
+            self.velocity = 0.0
+
+
+class SimulatedBike:
+    """
+    Longitudinal model of the bike on the drive motor. Duty above the
+    deadband sets a no-load speed scaled by the battery level; the speed
+    follows it with a time constant, less rolling resistance and the slope.
+    gps_fix() returns an RMC-like fix with noisy, unsigned speed.
+    """
+
+    GRAVITY = 9.81
+
+    def __init__(
+        self,
+        clock=time.monotonic,
+        max_speed=4.0,
+        deadband=10.0,
+        time_constant=2.0,
+        rolling=0.01,
+        grade=None,
+        battery=None,
+        gps_noise=0.1,
+        step=0.01,
+    ):
+        """
+        :param clock: Callable returning the current time in seconds
+        :param max_speed: No-load speed (m/s) at 100% duty and a full battery
+        :param deadband: Duty (%) below which the motor does not turn
+        :param time_constant: Speed time constant in seconds
+        :param rolling: Rolling resistance coefficient
+        :param grade: Callable(t) -> road grade (rise over run), default flat
+        :param battery: Callable(t) -> battery level 0..1, default full
+        :param gps_noise: Standard deviation of GPS speed in m/s
+        :param step: Integration step in seconds
+        """
+        self.clock = clock
+        self.max_speed = max_speed
+        self.deadband = deadband
+        self.time_constant = time_constant
+        self.rolling = rolling
+        self.grade = grade or (lambda t: 0.0)
+        self.battery = battery or (lambda t: 1.0)
+        self.gps_noise = gps_noise
+        self.step = step
+
+        self.speed = 0.0
+        self.distance = 0.0
+        self.duty = 0.0
+        self._start = clock()
+        self._last_time = self._start
+        self._lock = threading.Lock()
+
+    def duty_for(self, speed):
+        """Duty that holds `speed` on the flat with a full battery."""
+        drag = self.rolling * self.GRAVITY * self.time_constant
+        return self.deadband + (speed + drag) / self.max_speed * (100.0 - self.deadband)
+
+    def set_duty(self, duty):
+        with self._lock:
+            self._advance()
+            self.duty = duty
+
+    def gps_fix(self):
+        with self._lock:
+            self._advance()
+            speed = max(0.0, abs(self.speed) + random.gauss(0.0, self.gps_noise))
+        return {"type": "GNRMC", "status": "Valid", "speed_mps": speed}
+
+    def _advance(self):
+        now = self.clock()
+        elapsed = now - self._last_time
+        self._last_time = now
+        while elapsed > 0:
+            dt = min(self.step, elapsed)
+            elapsed -= dt
+            self._integrate(dt, now - self._start)
+
+    def _integrate(self, dt, t):
+        effective = 0.0
+        if abs(self.duty) > self.deadband:
+            effective = (abs(self.duty) - self.deadband) / (100.0 - self.deadband)
+            effective = effective if self.duty > 0 else -effective
+        target = effective * self.max_speed * self.battery(t)
+        accel = (target - self.speed) / self.time_constant
+        accel -= self.GRAVITY * self.grade(t)
+        if self.speed != 0 or abs(accel) > self.rolling * self.GRAVITY:
+            # Rolling resistance opposes motion (or the push, from standstill)
+            direction = self.speed if self.speed != 0 else accel
+            accel -= math.copysign(self.rolling * self.GRAVITY, direction)
+        new_speed = self.speed + accel * dt
+        if self.speed != 0 and (new_speed > 0) != (self.speed > 0) and target == 0:
+            new_speed = 0.0  # friction stops the bike, it does not reverse it
+        self.speed = new_speed
+        self.distance += self.speed * dt
+
+
+class SimulatedMotor:
+    """Stands in for MotorController and drives a SimulatedSteeringPlant."""
+
+    def __init__(self, plant):
+        self.plant = plant
+        self.current_direction = "stop"
+        self.current_speed = 0
+
+    def motor_control(self, direction, speed=None, time_duration: float = None):
+        if direction == "stop":
+            self.stop_immediately()
+            return
+        self.current_direction = direction
+        self.current_speed = speed
+        sign = 1.0 if direction in ("left", "forward") else -1.0
+        self.plant.set_duty(sign * speed)
+
+    def stop_immediately(self):
+        self.current_direction = "stop"
+        self.current_speed = 0
+        self.plant.set_duty(0.0)
+
+    def graceful_stop(self, step=5, delay=0.2):
+        self.stop_immediately()
+
+    def cleanup(self):
+        self.stop_immediately()
+
+
+class SimulatedESP32:
+    """Stands in for ESP32SerialReader and reads a SimulatedSteeringPlant."""
+
+    def __init__(self, plant, calibration=None):
+        self.plant = plant
+        self.calibration = calibration or SteeringCalibration.linear()
+        self.last_valid_angle = self.calibration.center
+
+    def read_angle(self, deadline_ms=None, retries=None, max_age=None):
+        angle = min(300.0, max(0.0, self.plant.read_angle()))
+        self.last_valid_angle = angle
+        # Simulated reads are always fresh in wall-clock terms
+        return Reading(angle, time.monotonic())
+
+    def request_data(self, max_age=None):
+        return self.read_angle().value
+
+    def close(self):
+        pass
@@ -1,10 +1,12 @@
+import argparse
 import threading
 import logging
+import time
 from Motor.config import MOTORS
 from Motor.motor import MotorController
 from Motor.ESP32.main import ESP32SerialReader
-from Motor.PID.pid_controller import PIDController
-from datetime import datetime
+from Motor.PID.pid_controller import TimedPIDController
+from Motor.traces import TraceBuffer, get_exporter
 
 # ✅ Setup logging
 logging.basicConfig(
@@ -17,103 +19,104 @@ logging.basicConfig(
 )
 
 
-class SteeringController:
+class SmallMotorController:
+    """
+    Steering commands for MQTT/CLI use. A single persistent worker thread
+    drives the motor toward the newest target: a command sent while a turn
+    is in progress replaces its target in place, and the PID state carries
+    over instead of restarting. Once a turn completes, times out or is
+    stopped, the next command starts from a reset PID.
+    """
+
     def __init__(
-        self, esp32_reader, motor_controller, target_angle, stop_callback=None
+        self,
+        neutral_angle: float = None,
+        period: float = 0.02,
+        tolerance: float = 2.0,
+        max_time: float = 30.0,
+        angle_freshness: float = 0.1,
+        debug: bool = False,
+        trace_size: int = 3000,
+        max_feedback_age: float = None,
+        motor: MotorController = None,
+        esp32: ESP32SerialReader = None,
     ):
-        self.esp32 = esp32_reader
-        self.motor = motor_controller
-        self.pid = PIDController(kp=0.8, ki=0.01, kd=0.05, setpoint=target_angle)
-        self.stop_callback = stop_callback
-
-    def rotate_to_angle(self, tolerance=2.0, max_time=30, debug=False):
-        import time
-
-        timestamps = []
-        angles = []
-        outputs = []
-        setpoints = []
-
-        start_time = time.time()
-
-        while True:
-            if self.stop_callback and self.stop_callback():
-                logging.warning("⛔ Movement interrupted by stop command.")
-                self.motor.stop_immediately()
-                break
-
-            current_time = time.time() - start_time
-            current_angle = self.esp32.request_data()
-            if current_angle is None:
-                continue
-
-            control = self.pid.compute(current_angle)
-
-            timestamps.append(current_time)
-            angles.append(current_angle)
-            outputs.append(control)
-            setpoints.append(self.pid.setpoint)
-
-            if abs(self.pid.setpoint - current_angle) <= tolerance:
-                self.motor.stop_immediately()
-                break
-
-            direction = "left" if control > 0 else "right"
-            speed = min(100, abs(control))
-            logging.info(
-                f"🌀 PID Output: {control:.2f} -> Direction: {direction}, Speed: {speed:.1f}"
-            )
-            self.motor.motor_control(direction=direction, speed=speed)
-
-            if current_time > max_time:
-                logging.warning("⏱️ Timeout reached")
-                break
-
-        self.motor.stop_immediately()
-
-        if debug:
-            import os
-            import matplotlib.pyplot as plt
-
-            os.makedirs("pid_plots", exist_ok=True)
-            timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-            plot_path = f"pid_plots/pid_plot_{timestamp_str}.png"
-
-            plt.figure(figsize=(10, 5))
-            plt.plot(timestamps, angles, label="Current Angle")
-            plt.plot(timestamps, setpoints, "--", label="Target Angle")
-            plt.plot(timestamps, outputs, ":", label="PID Output")
-            plt.xlabel("Time (s)")
-            plt.ylabel("Angle / Output")
-            plt.title("PID Motor Steering Plot")
-            plt.legend()
-            plt.grid(True)
-            plt.tight_layout()
-            plt.savefig(plot_path)
-            logging.info(f"📊 PID plot saved to: {plot_path}")
-
-
-class SmallMotorController:
-    def __init__(self, neutral_angle: float = 150.0):
-        self.motor = MotorController(MOTORS["small_motor"])
-        self.esp32 = ESP32SerialReader()
-        self.esp32.connect()
-        self.neutral_angle = neutral_angle
-        self.gear_ratio = 0.6667
-        self._stop_requested = False
-        self._rotation_thread = None
+        """
+        :param neutral_angle: Center angle (defaults to the calibrated center)
+        :param period: Control tick in seconds
+        :param tolerance: Error (°) at which a turn counts as completed
+        :param max_time: Seconds before an unfinished turn is abandoned
+        :param angle_freshness: Max age (s) of a cached angle for command
+                                bookkeeping
+        :param debug: Record every turn in a bounded TraceBuffer; the plot and
+                      trace are exported by a background process afterwards
+        :param trace_size: Max samples kept per turn (oldest dropped)
+        :param max_feedback_age: Oldest angle (s) a control tick steers on; the
+                                 motor is held on anything older. Defaults to
+                                 one period, or the reader's sample spacing
+                                 if longer (binary batches), plus half a period.
+        :param motor: Steering MotorController (default: the small motor)
+        :param esp32: Connected ESP32 reader (default: a new one on the
+                      default port); streaming is started here
+        """
+        self.motor = motor or MotorController(MOTORS["small_motor"])
+        if esp32 is None:
+            esp32 = ESP32SerialReader()
+            esp32.connect()
+        self.esp32 = esp32
+        self.esp32.start_streaming()
+        # Center and gear ratio come from the same calibration the ESP32
+        # reader converts with, so commands and feedback agree
+        self.calibration = self.esp32.calibration
+        self.neutral_angle = (
+            neutral_angle if neutral_angle is not None else self.calibration.center
+        )
+        self.gear_ratio = self.calibration.gear_ratio
+        self.period = period
+        self.tolerance = tolerance
+        self.max_time = max_time
+        self.angle_freshness = angle_freshness
+        self.max_feedback_age = max_feedback_age
+        self.debug = debug
+        self.trace_size = trace_size
+
+        # The old per-tick PID gains, converted to time-based ones at this tick
+        self.pid = TimedPIDController.from_tick_gains(
+            0.8, 0.01, 0.05, period=period, setpoint=self.neutral_angle
+        )
+        self._condition = threading.Condition()
+        self._target = None  # None = idle
+        self._command = None
+        self._generation = 0
+        self._reset_pid = False  # set when going idle; the worker resets the PID
+        self._shutdown = False
+        self._idle = threading.Event()
+        self._idle.set()
+        self.commands_received = 0
+        self.commands_replaced = 0
+        self.ticks = 0
+        self.stale_ticks = 0
+
+        self._worker = threading.Thread(target=self._rotation_worker, daemon=True)
+        self._worker.start()
 
     def get_current_angle(self):
-        angle = self.esp32.request_data()
+        angle = self.esp32.request_data(max_age=self.angle_freshness)
         if angle is None:
             raise RuntimeError("Unable to read angle from ESP32")
         return angle
 
+    def _base_angle(self):
+        """Relative turns build on the target in progress, else on the measured angle."""
+        with self._condition:
+            target = self._target
+        return target if target is not None else self.get_current_angle()
+
     def turn_left_by(self, delta_angle: float):
-        current_angle = self.get_current_angle()
-        motor_delta = delta_angle / self.gear_ratio
-        target_angle = max(0.0, current_angle - motor_delta)
-        self._start_rotation_thread(
+        current_angle = self._base_angle()
+        motor_delta = self.calibration.motor_delta(delta_angle)
+        target_angle = self.calibration.clamp(current_angle - motor_delta)
+        self._set_target(
             target_angle,
             command="left",
             requested_angle=delta_angle,
@@ -121,10 +124,10 @@ class SmallMotorController:
         )
 
     def turn_right_by(self, delta_angle: float):
-        current_angle = self.get_current_angle()
-        motor_delta = delta_angle / self.gear_ratio
-        target_angle = min(300.0, current_angle + motor_delta)
-        self._start_rotation_thread(
+        current_angle = self._base_angle()
+        motor_delta = self.calibration.motor_delta(delta_angle)
+        target_angle = self.calibration.clamp(current_angle + motor_delta)
+        self._set_target(
             target_angle,
             command="right",
             requested_angle=delta_angle,
@@ -132,81 +135,249 @@ class SmallMotorController:
         )
 
     def turn_to(self, absolute_angle: float):
-        current_angle = self.get_current_angle()
-        self._start_rotation_thread(
-            absolute_angle,
-            command="rotate",
-            requested_angle=None,
-            current_angle=current_angle,
-        )
+        self._set_target(self.calibration.clamp(absolute_angle), command="rotate")
 
     def center(self):
-        current_angle = self.get_current_angle()
-        self._start_rotation_thread(
-            self.neutral_angle,
-            command="center",
-            requested_angle=None,
-            current_angle=current_angle,
-        )
+        self._set_target(self.neutral_angle, command="center")
 
-    def _start_rotation_thread(
+    def _set_target(
         self, target_angle, command=None, requested_angle=None, current_angle=None
     ):
-        if self._rotation_thread and self._rotation_thread.is_alive():
-            logging.warning(
-                "⚠️ A rotation is already in progress. Please stop it first."
-            )
-            return
-
-        self._stop_requested = False
-        self._rotation_thread = threading.Thread(
-            target=self._rotate_to,
-            args=(target_angle, command, requested_angle, current_angle),
-        )
-        self._rotation_thread.start()
-
-    def _rotate_to(
-        self, target_angle, command=None, requested_angle=None, current_angle=None
-    ):
-        start_angle = self.get_current_angle()
-        controller = SteeringController(
-            self.esp32,
-            self.motor,
-            target_angle,
-            stop_callback=lambda: self._stop_requested,
-        )
-        controller.rotate_to_angle()
-        new_angle = self.get_current_angle()
-
-        # ✅ Final logs printed AFTER motion finishes
-        if command and requested_angle is not None and current_angle is not None:
+        """Hand a new target to the rotation worker, replacing any in progress."""
+        with self._condition:
+            if self._target is not None:
+                self.commands_replaced += 1
+                logging.info(
+                    f"🔀 Replacing target {self._target:.2f}° with {target_angle:.2f}°"
+                )
+            self.commands_received += 1
+            self._target = target_angle
+            self._command = (command, requested_angle, current_angle, time.monotonic())
+            self._generation += 1
+            self._idle.clear()
+            self.pid.set_setpoint(target_angle)
+            self._condition.notify()
+
+    def _finish(self, generation, reason):
+        """Idle the worker if no newer command arrived. Caller holds the condition."""
+        if generation != self._generation:
+            return False
+        self._target = None
+        self._reset_pid = True
+        self.motor.stop_immediately()
+        self._idle.set()
+        logging.info(f"✅ Rotation {reason}")
+        return True
+
+    def _feedback_age_limit(self):
+        if self.max_feedback_age is not None:
+            return self.max_feedback_age
+        # A binary frame delivers a batch at once: its newest sample ages by
+        # the whole batch spacing before the next frame lands
+        return max(self.period, self.esp32.update_interval) + self.period / 2
+
+    def _export_trace(self, trace):
+        if trace is not None and len(trace):
+            if trace.dropped:
+                logging.info(f"🧾 Trace kept the last {len(trace)} samples ({trace.dropped} dropped)")
+            get_exporter().submit(trace.snapshot())
+
+    def _rotation_worker(self):
+        last_tick = None
+        trace = None
+        trace_t0 = None
+        feedback_stale = False
+        with self._condition:
+            while not self._shutdown:
+                if self._target is None:
+                    self._export_trace(trace)
+                    trace = None
+                    self._condition.wait()
+                    continue
+
+                if self._reset_pid:
+                    # Nothing learned on an earlier, finished turn carries over
+                    self.pid.reset()
+                    self._reset_pid = False
+                    last_tick = None
+                    self._export_trace(trace)
+                    trace = None
+                if self.debug and trace is None:
+                    # One time origin per trace: replaced targets share it,
+                    # so the timestamps keep increasing across commands
+                    trace = TraceBuffer(self.trace_size)
+                    trace_t0 = time.monotonic()
+
+                generation = self._generation
+                target = self._target
+                command, requested_angle, base_angle, started = self._command
+
+                # Read and compute outside the lock so commands are never blocked
+                self._condition.release()
+                try:
+                    max_age = self._feedback_age_limit()
+                    reading = self.esp32.read_angle(max_age=max_age)
+                    fresh = (
+                        reading.value is not None
+                        and not reading.is_fallback
+                        and reading.age <= max_age
+                    )
+                    angle = reading.value if fresh else None
+                    output = None
+                    if fresh:
+                        if feedback_stale:
+                            # Don't integrate across the gap in feedback
+                            self.pid.reset()
+                            last_tick = None
+                        # Ticks run late by the serial read and lock waits;
+                        # give the PID the time that actually passed
+                        now = time.monotonic()
+                        dt = 0.0 if last_tick is None else now - last_tick
+                        last_tick = now
+                        output = self.pid.compute(angle, dt)
+                finally:
+                    self._condition.acquire()
+
+                if generation != self._generation or self._target is None:
+                    continue  # replaced or stopped while reading
+
+                now = time.monotonic()
+                elapsed = now - started
+                self.ticks += 1
+                if angle is None:
+                    self.stale_ticks += 1
+                    # Never steer on an old angle: hold the motor until a fresh one arrives
+                    if not feedback_stale:
+                        logging.warning(
+                            f"⚠️ Steering feedback stale ({reading.age * 1000:.0f} ms), holding motor"
+                        )
+                        self.motor.stop_immediately()
+                        feedback_stale = True
+                    if elapsed > self.max_time:
+                        logging.warning("⏱️ Timeout reached")
+                        self._finish(generation, "abandoned without fresh feedback")
+                        continue
+                    self._condition.wait(self.period)
+                    continue
+                if feedback_stale:
+                    logging.info("✅ Steering feedback restored")
+                    feedback_stale = False
+
+                error = target - angle
+                if abs(error) <= self.tolerance:
+                    if trace is not None:
+                        trace.append(now - trace_t0, angle, 0.0, target)  # motor stopped
+                    if self._finish(generation, f"completed at {angle:.2f}°"):
+                        self._log_completion(
+                            command, requested_angle, base_angle, target, angle
+                        )
+                    continue
+                if elapsed > self.max_time:
+                    if trace is not None:
+                        trace.append(now - trace_t0, angle, 0.0, target)
+                    logging.warning("⏱️ Timeout reached")
+                    self._finish(generation, f"abandoned at {angle:.2f}°")
+                    continue
+
+                direction = "left" if output > 0 else "right"
+                self.motor.motor_control(direction=direction, speed=min(100, abs(output)))
+                if trace is not None:
+                    trace.append(now - trace_t0, angle, output, target)
+                # Next tick, or sooner if a new command or stop arrives
+                self._condition.wait(self.period)
+            self._export_trace(trace)
+
+    def _log_completion(self, command, requested_angle, base_angle, target_angle, final_angle):
+        if command and requested_angle is not None and base_angle is not None:
             logging.info(f"\n➡️ {command.upper()} TURN COMPLETED")
             logging.info(f"🔢 Requested steering angle: {requested_angle:.2f}°")
             logging.info(f"⚙️ Gear ratio: 1 / {self.gear_ratio}")
-            logging.info(f"📐 Motor delta: {(requested_angle / self.gear_ratio):.2f}°")
             logging.info(
-                f"🎯 Target angle: {target_angle:.2f}° (from {current_angle:.2f}°)"
+                f"📐 Motor delta: {self.calibration.motor_delta(requested_angle):.2f}°"
             )
+            logging.info(
+                f"🎯 Target angle: {target_angle:.2f}° (from {base_angle:.2f}°)"
+            )
+        logging.info(f"✅ Final angle: {final_angle:.2f}°\n")
+
+    def cache_stats(self):
+        """Angle cache hits/misses shared with the ESP32 reader."""
+        return self.esp32.cache_stats()
 
-        logging.info(f"✅ Start angle: {start_angle:.2f}°")
-        logging.info(f"✅ Final angle: {new_angle:.2f}°\n")
+    def wait_until_idle(self, timeout=None):
+        """Block until the current turn completes, times out or is stopped."""
+        return self._idle.wait(timeout)
 
     def stop(self):
+        """Stop any turn in progress. Returns as soon as the motor is stopped."""
         logging.info("🛑 Stop command received.")
-        self._stop_requested = True
-        if self._rotation_thread and self._rotation_thread.is_alive():
-            self._rotation_thread.join()
-            logging.info("✅ Rotation thread stopped.")
+        with self._condition:
+            self._generation += 1
+            self._target = None
+            self._reset_pid = True
+            self.motor.stop_immediately()
+            self._idle.set()
+            self._condition.notify()
+        logging.info("✅ Rotation stopped.")
 
     def cleanup(self):
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify()
+        self.stop()
+        self._worker.join(timeout=1.0)
         self.motor.cleanup()
         self.esp32.close()
 
 
+def benchmark(duration=2.0):
+    """
+    Run the rotation worker against the fake ESP32 in both protocols and
+    count the ticks it held the motor on stale feedback. The fake's angle
+    sweeps on its own and the tolerance is negative, so the turn never
+    completes and every tick steers on the stream.
+    """
+    from Motor.backends import SimulatedBackend
+    from Motor.ESP32.fake_esp32 import FakeESP32
+
+    for protocol in ("ascii", "binary"):
+        fake = FakeESP32().start()
+        esp32 = ESP32SerialReader(port=fake.port, protocol=protocol, cache_freshness=0)
+        esp32.connect()
+        controller = SmallMotorController(
+            tolerance=-1.0,
+            max_time=duration * 2,
+            motor=MotorController(MOTORS["small_motor"], backend=SimulatedBackend()),
+            esp32=esp32,
+        )
+        try:
+            controller.turn_to(controller.calibration.max_angle)
+            time.sleep(duration)
+            limit = controller._feedback_age_limit()
+        finally:
+            controller.cleanup()
+            fake.stop()
+        ticks, stale = controller.ticks, controller.stale_ticks
+        print(
+            f"📊 {esp32.protocol:>6}: {ticks} ticks, {stale} held on stale feedback "
+            f"({100 * stale / max(ticks, 1):.0f}%), age limit {limit * 1000:.0f} ms"
+        )
+
+
 # 🧪 CLI Interface
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manual steering control")
+    parser.add_argument("--debug", action="store_true", help="Record and export a trace per turn")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Stale-feedback ticks against the fake ESP32, ASCII vs binary")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        raise SystemExit
+
     try:
-        controller = SmallMotorController()
+        controller = SmallMotorController(debug=args.debug)
         logging.info(
             "Commands: left [angle], right [angle], rotate [angle], center, stop"
         )
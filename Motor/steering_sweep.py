@@ -0,0 +1,290 @@
+import argparse
+import logging
+import time
+from collections import deque
+
+from Motor.calibration import SteeringCalibration
+
+logging.basicConfig(level=logging.INFO)
+
+
+class SteeringSweep:
+    """
+    Finds the steering end stops, center and backlash automatically.
+
+    The motor is driven at low duty in each direction until the pot angle
+    stops changing (stall against the end stop). Center is the midpoint of
+    the two stops. Backlash is estimated from how much longer the wheel
+    takes to start moving after a direction reversal than after a restart
+    in the same direction, multiplied by the measured turning speed.
+    """
+
+    def __init__(
+        self,
+        motor,
+        esp32,
+        duty=25,
+        max_duty=50,
+        stall_window=0.3,
+        stall_threshold=0.5,
+        move_threshold=1.0,
+        max_travel_time=20.0,
+        margin=3.0,
+        sample_period=0.02,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """
+        :param motor: MotorController (or SimulatedMotor) for the steering motor
+        :param esp32: ESP32SerialReader (or SimulatedESP32) for the pot angle
+        :param duty: Starting sweep duty (%); raised in 5% steps up to max_duty
+                     if the motor does not break away
+        :param stall_window: Seconds the angle must stay still to count as a stall
+        :param stall_threshold: Max angle change (°) inside the window for a stall
+        :param move_threshold: Angle change (°) that counts as "started moving"
+        :param max_travel_time: Give up after this long in one direction
+        :param margin: Degrees kept clear of each end stop in the saved range
+        :param clock, sleep: Time source, replaceable for simulation
+        """
+        self.motor = motor
+        self.esp32 = esp32
+        self.duty = duty
+        self.working_duty = duty  # raised if the sweep finds a higher breakaway duty
+        self.max_duty = max_duty
+        self.stall_window = stall_window
+        self.stall_threshold = stall_threshold
+        self.move_threshold = move_threshold
+        self.max_travel_time = max_travel_time
+        self.margin = margin
+        self.sample_period = sample_period
+        self.clock = clock
+        self.sleep = sleep
+
+    def _angle(self):
+        """Pot angle, or None when the read fell back to an old value."""
+        reading = self.esp32.read_angle()
+        return None if reading.is_fallback else reading.value
+
+    def _wait_angle(self):
+        """First fresh angle, waiting up to one stall window for it."""
+        start = self.clock()
+        while True:
+            angle = self._angle()
+            if angle is not None:
+                return angle
+            if self.clock() - start > self.stall_window:
+                raise RuntimeError("No angle feedback from the ESP32")
+            self.sleep(self.sample_period)
+
+    def _backs_off(self, direction, duty):
+        """
+        Drive away from `direction` for one stall window. True if the wheel
+        moved: it was resting against that end stop, not stuck below the
+        breakaway duty.
+        """
+        opposite = "right" if direction == "left" else "left"
+        before = self._wait_angle()
+        self.motor.motor_control(opposite, speed=duty)
+        end = self.clock() + self.stall_window
+        try:
+            while self.clock() < end:
+                self.sleep(self.sample_period)
+                angle = self._angle()
+                if angle is not None and abs(angle - before) >= self.move_threshold:
+                    return True
+            return False
+        finally:
+            self.motor.stop_immediately()
+
+    def _drive_until_stall(self, direction):
+        """Drive toward one end stop and return the angle where it stalls."""
+        start_angle = self._wait_angle()
+        duty = self.working_duty
+        self.motor.motor_control(direction, speed=duty)
+        start = self.clock()
+        history = deque()
+        try:
+            while self.clock() - start < self.max_travel_time:
+                self.sleep(self.sample_period)
+                now = self.clock()
+                angle = self._angle()
+                if angle is None:
+                    continue
+                history.append((now, angle))
+                while now - history[0][0] > self.stall_window:
+                    history.popleft()
+                if now - history[0][0] < self.stall_window * 0.9:
+                    continue
+
+                angles = [a for _, a in history]
+                if max(angles) - min(angles) >= self.stall_threshold:
+                    continue
+
+                if abs(angle - start_angle) >= self.move_threshold:
+                    self.working_duty = duty
+                    return sum(angles) / len(angles)
+
+                # Never moved. If the wheel starts at this end stop, raising
+                # the duty would only push it harder into the stop: back off
+                # and approach it again at the same duty instead
+                if self._backs_off(direction, duty):
+                    logging.info(f"↩️ Started against the {direction} end stop, backing off")
+                    start_angle = self._wait_angle()
+                    self.motor.motor_control(direction, speed=duty)
+                    history.clear()
+                    continue
+
+                # Below the breakaway duty, push a little harder
+                if duty >= self.max_duty:
+                    raise RuntimeError(
+                        f"Steering did not move turning {direction} at {duty}% duty"
+                    )
+                duty = min(self.max_duty, duty + 5)
+                logging.info(f"⬆️ No movement, raising sweep duty to {duty}%")
+                self.motor.motor_control(direction, speed=duty)
+                history.clear()
+            raise RuntimeError(f"No end stop found turning {direction}")
+        finally:
+            self.motor.stop_immediately()
+
+    def _move_and_time(self, direction, speed_window=0.2):
+        """
+        Drive briefly and return (dead_time, speed): seconds until the angle
+        moved by move_threshold, and the turning speed in °/s after that.
+        """
+        self.sleep(self.stall_window)  # let the wheel settle
+        start_angle = self._wait_angle()
+        self.motor.motor_control(direction, speed=self.working_duty)
+        start = self.clock()
+        try:
+            moved_at = None
+            while self.clock() - start < self.max_travel_time:
+                self.sleep(self.sample_period)
+                now = self.clock()
+                angle = self._angle()
+                if angle is None:
+                    continue
+                if moved_at is None:
+                    if abs(angle - start_angle) >= self.move_threshold:
+                        moved_at, moved_angle = now, angle
+                elif now - moved_at >= speed_window:
+                    speed = abs(angle - moved_angle) / (now - moved_at)
+                    return moved_at - start, speed
+            raise RuntimeError(f"Steering did not move turning {direction}")
+        finally:
+            self.motor.stop_immediately()
+
+    def _go_to(self, target):
+        """Bang-bang move to a target angle at sweep duty."""
+        angle = self._wait_angle()
+        direction = "left" if target > angle else "right"
+        self.motor.motor_control(direction, speed=self.working_duty)
+        start = self.clock()
+        try:
+            while self.clock() - start < self.max_travel_time:
+                self.sleep(self.sample_period)
+                angle = self._angle()
+                if angle is None:
+                    continue
+                if (direction == "left") == (angle >= target):
+                    return angle
+            raise RuntimeError(f"Could not reach {target:.1f}°")
+        finally:
+            self.motor.stop_immediately()
+
+    def measure_backlash(self):
+        # Restart in the same direction (spin-up only) vs after a reversal.
+        # The first move only takes up the play toward "right".
+        self._move_and_time("right")
+        same_right, _ = self._move_and_time("right")
+        reversed_left, speed_left = self._move_and_time("left")
+        same_left, _ = self._move_and_time("left")
+        reversed_right, speed_right = self._move_and_time("right")
+
+        estimates = [
+            max(0.0, reversed_left - same_left) * speed_left,
+            max(0.0, reversed_right - same_right) * speed_right,
+        ]
+        return sum(estimates) / len(estimates)
+
+    def run(self, calibration):
+        """
+        Sweep the steering and return a copy of calibration with the measured
+        center, usable range and backlash.
+        """
+        logging.info(f"🔁 Sweeping steering at {self.duty}% duty")
+        max_stop = self._drive_until_stall("left")
+        logging.info(f"⛔ Upper end stop at {max_stop:.2f}°")
+        min_stop = self._drive_until_stall("right")
+        logging.info(f"⛔ Lower end stop at {min_stop:.2f}°")
+
+        center = (min_stop + max_stop) / 2.0
+        self._go_to(center)
+        backlash = self.measure_backlash()
+        logging.info(f"⚙️ Backlash: {backlash:.2f}°")
+
+        final = self._go_to(center)
+        logging.info(f"🎯 Center: {center:.2f}° (parked at {final:.2f}°)")
+
+        return calibration.with_profile(
+            center=center,
+            min_angle=min_stop + self.margin,
+            max_angle=max_stop - self.margin,
+            backlash=backlash,
+        )
+
+
+def simulate():
+    """Run the sweep against the simulated plant and compare with the truth."""
+    from Motor.simulation import (
+        SimulatedClock,
+        SimulatedESP32,
+        SimulatedMotor,
+        SimulatedSteeringPlant,
+    )
+
+    clock = SimulatedClock()
+    plant = SimulatedSteeringPlant(clock=clock.now, min_stop=32.0, max_stop=261.0)
+    sweep = SteeringSweep(
+        SimulatedMotor(plant),
+        SimulatedESP32(plant),
+        duty=10,  # below the simulated deadband, exercises the duty ramp
+        max_travel_time=90.0,
+        clock=clock.now,
+        sleep=clock.sleep,
+    )
+    start = time.perf_counter()
+    profile = sweep.run(SteeringCalibration.linear())
+    elapsed = time.perf_counter() - start
+
+    print(f"📊 Simulated sweep took {clock.now():.1f} s of bike time ({elapsed:.2f} s wall)")
+    print(f"   End stops: {profile.min_angle - sweep.margin:.2f}° / "
+          f"{profile.max_angle + sweep.margin:.2f}° (true {plant.min_stop}° / {plant.max_stop}°)")
+    print(f"   Center:    {profile.center:.2f}° "
+          f"(true {(plant.min_stop + plant.max_stop) / 2:.2f}°)")
+    print(f"   Backlash:  {profile.backlash:.2f}° (true {plant.backlash}°)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Automatic steering calibration sweep")
+    parser.add_argument("--simulate", action="store_true", help="Run against the simulated plant")
+    parser.add_argument("--duty", type=float, default=25, help="Starting sweep duty (%%)")
+    args = parser.parse_args()
+
+    if args.simulate:
+        simulate()
+    else:
+        from Motor.config import MOTORS
+        from Motor.motor import MotorController
+        from Motor.ESP32.main import ESP32SerialReader
+
+        calibration = SteeringCalibration.load()
+        motor = MotorController(MOTORS["small_motor"])
+        esp32 = ESP32SerialReader(calibration=calibration)
+        esp32.connect()
+        try:
+            profile = SteeringSweep(motor, esp32, duty=args.duty).run(calibration)
+            profile.save()
+        finally:
+            motor.cleanup()
+            esp32.close()
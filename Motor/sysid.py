@@ -0,0 +1,249 @@
+"""
+System identification for the steering motor.
+
+Fits a discrete-time model to recorded (timestamp, duty, direction, angle)
+traces, such as the ones SmallMotorController records for each turn in
+debug mode:
+
+    v[k] = a * v[k-1] + b_dir * u_dir[k]
+    angle[k+1] = angle[k] + v[k] * dt
+
+u_dir is the duty beyond that direction's deadband, capped at the saturation
+duty. a sets the time constant, b_left/b_right the speed per % duty.
+Deadbands and saturation are found with a grid search. All grid points are
+solved at once as batched 3x3 normal equations.
+
+    python3 -m Motor.sysid pid_traces/*.json --output steering_model.json
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from Motor.traces import load_trace
+
+
+class SteeringPlantModel:
+    """Identified steering plant, usable by simulators and the PID tuner."""
+
+    def __init__(
+        self,
+        a,
+        b_left,
+        b_right,
+        deadband_left,
+        deadband_right,
+        saturation=100.0,
+        dt=0.02,
+        quality=None,
+    ):
+        self.a = float(a)
+        self.b_left = float(b_left)
+        self.b_right = float(b_right)
+        self.deadband_left = float(deadband_left)
+        self.deadband_right = float(deadband_right)
+        self.saturation = float(saturation)
+        self.dt = float(dt)
+        self.quality = quality or {}
+
+    @property
+    def time_constant(self):
+        """Continuous-time speed time constant in seconds."""
+        return float(-self.dt / np.log(self.a)) if 0 < self.a < 1 else float("inf")
+
+    def drive(self, duty):
+        """b * effective duty for signed duty (positive = "left"); works on arrays."""
+        duty = np.asarray(duty, dtype=float)
+        left = np.clip(duty - self.deadband_left, 0.0, self.saturation - self.deadband_left)
+        right = np.clip(-duty - self.deadband_right, 0.0, self.saturation - self.deadband_right)
+        return self.b_left * left - self.b_right * right
+
+    def simulate(self, duty, start_angle, start_velocity=0.0):
+        """Free-run the model on a uniformly sampled signed duty sequence."""
+        drive = self.drive(duty)
+        angle = np.empty(len(drive))
+        position, velocity = float(start_angle), float(start_velocity)
+        for k, u in enumerate(drive):
+            angle[k] = position
+            velocity = self.a * velocity + u
+            position += velocity * self.dt
+        return angle
+
+    def to_dict(self):
+        return {
+            "a": self.a,
+            "b_left": self.b_left,
+            "b_right": self.b_right,
+            "deadband_left": self.deadband_left,
+            "deadband_right": self.deadband_right,
+            "saturation": self.saturation,
+            "dt": self.dt,
+            "time_constant": self.time_constant,
+            "quality": self.quality,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["a"],
+            data["b_left"],
+            data["b_right"],
+            data["deadband_left"],
+            data["deadband_right"],
+            data.get("saturation", 100.0),
+            data.get("dt", 0.02),
+            data.get("quality"),
+        )
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+
+def resample(t, duty, angle, dt):
+    """Put a trace on a uniform dt grid (duty zero-order hold, angle interpolated)."""
+    grid = np.arange(t[0], t[-1], dt)
+    idx = np.searchsorted(t, grid, side="right") - 1
+    return duty[idx], np.interp(grid, t, angle)
+
+
+def _regression_data(traces, dt):
+    """Velocity regression rows: previous speed, duty, target speed."""
+    v_prev, duty, v_next = [], [], []
+    for t, d, angle in traces:
+        d_u, angle_u = resample(t, d, angle, dt)
+        v = np.diff(angle_u) / dt
+        v_prev.append(v[:-1])
+        duty.append(d_u[1 : len(v)])
+        v_next.append(v[1:])
+    return np.concatenate(v_prev), np.concatenate(duty), np.concatenate(v_next)
+
+
+def identify(traces, dt=0.02, deadbands=None, saturations=None):
+    """
+    Fit a SteeringPlantModel to traces given as (t, signed_duty, angle).
+
+    For each saturation level, every (deadband_left, deadband_right) pair is
+    solved in one batched call: left and right drive columns never overlap,
+    so the normal equations for a pair are assembled from per-deadband
+    dot products.
+    """
+    if deadbands is None:
+        deadbands = np.arange(0.0, 41.0, 1.0)
+    if saturations is None:
+        # Descending, so a tie (no duty ever reached saturation) keeps the highest
+        saturations = np.array([100.0, 90.0, 80.0, 70.0, 60.0])
+
+    v_prev, duty, y = _regression_data(traces, dt)
+    n_db = len(deadbands)
+    best = None
+
+    for saturation in saturations:
+        # (samples, n_db) drive columns for each candidate deadband
+        left = np.clip(duty[:, None] - deadbands[None, :], 0.0, saturation - deadbands[None, :])
+        right = -np.clip(-duty[:, None] - deadbands[None, :], 0.0, saturation - deadbands[None, :])
+
+        vv, vy, yy = v_prev @ v_prev, v_prev @ y, y @ y
+        vl, vr = v_prev @ left, v_prev @ right
+        ll, rr = np.sum(left * left, axis=0), np.sum(right * right, axis=0)
+        ly, ry = y @ left, y @ right
+
+        # Batched normal equations over all (i, j) = (left db, right db) pairs
+        gram = np.zeros((n_db, n_db, 3, 3))
+        gram[..., 0, 0] = vv
+        gram[..., 0, 1] = gram[..., 1, 0] = vl[:, None]
+        gram[..., 0, 2] = gram[..., 2, 0] = vr[None, :]
+        gram[..., 1, 1] = ll[:, None]
+        gram[..., 2, 2] = rr[None, :]
+        rhs = np.zeros((n_db, n_db, 3))
+        rhs[..., 0] = vy
+        rhs[..., 1] = ly[:, None]
+        rhs[..., 2] = ry[None, :]
+        gram[..., [1, 2], [1, 2]] += 1e-9  # keep unexcited directions solvable
+
+        coef = np.linalg.solve(gram, rhs[..., None])[..., 0]
+        # Residual sum of squares: y'y - 2 c'X'y + c'X'Xc
+        rss = (
+            yy
+            - 2 * np.einsum("ijk,ijk->ij", coef, rhs)
+            + np.einsum("ijk,ijkl,ijl->ij", coef, gram, coef)
+        )
+        i, j = np.unravel_index(np.argmin(rss), rss.shape)
+        if best is None or rss[i, j] < best[0]:
+            best = (rss[i, j], coef[i, j], deadbands[i], deadbands[j], saturation)
+
+    rss, (a, b_left, b_right), db_left, db_right, saturation = best
+    # Right drive columns were negated, so b_right comes out positive
+    model = SteeringPlantModel(a, b_left, b_right, db_left, db_right, saturation, dt)
+    model.quality = evaluate(model, traces)
+    return model
+
+
+def evaluate(model, traces):
+    """
+    Fit quality on traces:
+      speed_r2   - one-step-ahead R² of the speed prediction
+      angle_rmse - free-run angle error (°) when replaying the recorded duty
+      angle_nrmse - angle_rmse / range of the recorded angle
+    """
+    v_prev, duty, y = _regression_data(traces, model.dt)
+    predicted = model.a * v_prev + model.drive(duty)
+    ss_res = np.sum((y - predicted) ** 2)
+    ss_tot = np.sum((y - np.mean(y)) ** 2)
+
+    errors, spans = [], []
+    for t, d, angle in traces:
+        d_u, angle_u = resample(t, d, angle, model.dt)
+        simulated = model.simulate(d_u, angle_u[0])
+        errors.append(simulated - angle_u)
+        spans.append(np.ptp(angle_u))
+    errors = np.concatenate(errors)
+    rmse = float(np.sqrt(np.mean(errors**2)))
+    return {
+        "speed_r2": float(1 - ss_res / ss_tot) if ss_tot > 0 else 0.0,
+        "angle_rmse": rmse,
+        "angle_nrmse": rmse / max(float(max(spans)), 1e-9),
+        "samples": int(len(y)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Steering plant system identification")
+    parser.add_argument("traces", nargs="*", help="Recorded steering trace JSON files")
+    parser.add_argument("--synthetic", action="store_true", help="Use a simulated trace")
+    parser.add_argument("--holdout", type=float, default=0.0,
+                        help="Fraction of each trace kept back for validation")
+    parser.add_argument("--output", help="Write the identified model to this JSON file")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from Motor.PID.autotune import synthetic_trace
+
+        traces = [synthetic_trace(duration=120.0)]
+    elif args.traces:
+        traces = [load_trace(path) for path in args.traces]
+    else:
+        parser.error("Give trace files or --synthetic")
+
+    if args.holdout > 0:
+        fit_set, validation = [], []
+        for t, d, angle in traces:
+            cut = int(len(t) * (1 - args.holdout))
+            fit_set.append((t[:cut], d[:cut], angle[:cut]))
+            validation.append((t[cut:], d[cut:], angle[cut:]))
+    else:
+        fit_set, validation = traces, None
+
+    model = identify(fit_set)
+    print(f"🔧 Identified model: {json.dumps(model.to_dict(), indent=2)}")
+    if validation:
+        print(f"✅ Validation: {evaluate(model, validation)}")
+    if args.output:
+        model.save(args.output)
+        print(f"💾 Model saved to {args.output}")
@@ -0,0 +1,208 @@
+import json
+import logging
+import os
+from array import array
+from datetime import datetime
+
+TRACE_DIR = "pid_traces"
+PLOT_DIR = "pid_plots"
+
+
+class TraceBuffer:
+    """
+    Fixed-size ring of (timestamp, angle, output, setpoint) samples backed
+    by preallocated arrays, so recording never allocates in the control
+    loop. Once full, the oldest samples are overwritten and counted in
+    `dropped`.
+    """
+
+    FIELDS = ("timestamps", "angles", "outputs", "setpoints")
+
+    def __init__(self, capacity=3000):
+        self.capacity = capacity
+        self._columns = [array("d", bytes(8 * capacity)) for _ in self.FIELDS]
+        self._next = 0
+        self.count = 0
+        self.dropped = 0
+
+    def append(self, timestamp, angle, output, setpoint):
+        i = self._next
+        timestamps, angles, outputs, setpoints = self._columns
+        timestamps[i] = timestamp
+        angles[i] = angle
+        outputs[i] = output
+        setpoints[i] = setpoint
+        self._next = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self.dropped += 1
+
+    def __len__(self):
+        return self.count
+
+    def snapshot(self):
+        """Samples oldest first, as a dict of plain lists (cheap to pickle)."""
+        start = (self._next - self.count) % self.capacity
+        data = {}
+        for name, column in zip(self.FIELDS, self._columns):
+            if start + self.count <= self.capacity:
+                data[name] = column[start : start + self.count].tolist()
+            else:
+                data[name] = (column[start:] + column[: self._next]).tolist()
+        return data
+
+
+def export_trace(data, plot=True):
+    """
+    Write a recorded rotation as a trace JSON and, optionally, a PNG plot.
+    Meant to run in TraceExporter's worker process.
+
+    :param data: TraceBuffer.snapshot()
+    :return: (trace_path, plot_path or None)
+    """
+    outputs = data["outputs"]
+    trace_path = save_trace(
+        data["timestamps"],
+        [min(100, abs(c)) for c in outputs],
+        ["left" if c > 0 else "right" if c < 0 else "stop" for c in outputs],
+        data["angles"],
+    )
+    plot_path = None
+    if plot:
+        try:
+            import matplotlib
+        except ImportError:
+            logging.warning("⚠️ matplotlib not installed, skipping the PID plot")
+            return trace_path, None
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        os.makedirs(PLOT_DIR, exist_ok=True)
+        # Named after its trace, which is unique
+        stamp = os.path.basename(trace_path)[len("steering_trace_"):-len(".json")]
+        plot_path = os.path.join(PLOT_DIR, f"pid_plot_{stamp}.png")
+
+        plt.figure(figsize=(10, 5))
+        plt.plot(data["timestamps"], data["angles"], label="Current Angle")
+        plt.plot(data["timestamps"], data["setpoints"], "--", label="Target Angle")
+        plt.plot(data["timestamps"], outputs, ":", label="PID Output")
+        plt.xlabel("Time (s)")
+        plt.ylabel("Angle / Output")
+        plt.title("PID Motor Steering Plot")
+        plt.legend()
+        plt.grid(True)
+        plt.tight_layout()
+        plt.savefig(plot_path)
+        plt.close()
+    return trace_path, plot_path
+
+
+class TraceExporter:
+    """
+    Runs export_trace in a single background process so plotting never
+    blocks, or imports matplotlib into, the control process.
+    """
+
+    def __init__(self):
+        self._pool = None
+
+    def submit(self, data, plot=True):
+        """Queue an export and return its Future; results are logged when done."""
+        if self._pool is None:
+            import multiprocessing as mp
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._pool = ProcessPoolExecutor(
+                max_workers=1, mp_context=mp.get_context("spawn")
+            )
+        future = self._pool.submit(export_trace, data, plot)
+        future.add_done_callback(self._report)
+        return future
+
+    @staticmethod
+    def _report(future):
+        try:
+            trace_path, plot_path = future.result()
+        except Exception as e:
+            logging.error(f"❗ Trace export failed: {e}")
+            return
+        if plot_path:
+            logging.info(f"📊 PID plot saved to: {plot_path}")
+        logging.info(f"🧾 Steering trace saved to: {trace_path}")
+
+    def close(self, wait=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+
+_exporter = None
+
+
+def get_exporter():
+    """Process-wide TraceExporter, created on first use."""
+    global _exporter
+    if _exporter is None:
+        _exporter = TraceExporter()
+    return _exporter
+
+
+def save_trace(timestamps, duties, directions, angles, path=None):
+    """
+    Save a steering trace as JSON: one (timestamp, duty, direction, angle)
+    record per control tick. Used by tuning and system identification.
+
+    :param timestamps: Seconds since the start of the run
+    :param duties: Commanded duty (%) as sent to MotorController, 0..100
+    :param directions: "left", "right" or "stop" for each tick
+    :param angles: Measured pot angle (°) for each tick
+    :return: Path of the written file
+    """
+    samples = [
+        {"timestamp": t, "duty": d, "direction": direction, "angle": a}
+        for t, d, direction, a in zip(timestamps, duties, directions, angles)
+    ]
+    if path is not None:
+        with open(path, "w") as f:
+            json.dump(samples, f)
+        return path
+
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]  # ms
+    # Turns can finish within the same millisecond: never overwrite a trace
+    suffix = 0
+    while True:
+        name = timestamp_str if suffix == 0 else f"{timestamp_str}_{suffix}"
+        path = os.path.join(TRACE_DIR, f"steering_trace_{name}.json")
+        try:
+            with open(path, "x") as f:
+                json.dump(samples, f)
+            return path
+        except FileExistsError:
+            suffix += 1
+
+
+def load_trace(path):
+    """
+    Load a trace as NumPy arrays: time (s), signed duty (% , positive =
+    "left", i.e. increasing angle) and angle (°).
+    """
+    import numpy as np
+
+    with open(path, "r") as f:
+        samples = json.load(f)
+
+    t = np.array([s["timestamp"] for s in samples], dtype=float)
+    duty = np.array(
+        [
+            s["duty"] if s["direction"] == "left"
+            else -s["duty"] if s["direction"] == "right"
+            else 0.0
+            for s in samples
+        ],
+        dtype=float,
+    )
+    angle = np.array([s["angle"] for s in samples], dtype=float)
+    return t, duty, angle
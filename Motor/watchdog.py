@@ -0,0 +1,286 @@
+"""
+Failsafe watchdog for the command sources driving the motors.
+
+Every source (gamepad loop, MQTT loop, trajectory replay) registers with
+the Watchdog and gets a Heartbeat handle it beats from its own loop. The
+watchdog checks all sources every `period`; when one has been silent for
+longer than its deadline, the trip action runs once, normally cutting the
+drive PWM and centering the steering (see failsafe()). The source re-arms
+as soon as it beats again; the motors only move again on the next command.
+
+The reaction time is bounded: a silent source is noticed at most `period`
+after its deadline expires, plus the time the trip action takes. Both are
+measured and reported by stats().
+
+    python3 -m Motor.watchdog --simulate
+    python3 -m Motor.watchdog --benchmark
+"""
+
+import argparse
+import logging
+import threading
+import time
+
+from Motor.PID.fixed_rate import FixedRateExecutor, LatencyHistogram
+
+logging.basicConfig(level=logging.INFO)
+
+
+class Heartbeat:
+    """Handle for one command source; call beat() from the source's loop."""
+
+    def __init__(self, watchdog, name, deadline):
+        self.watchdog = watchdog
+        self.name = name
+        self.deadline = deadline
+        self.last_beat = watchdog.clock()
+        self.beats = 0
+        self.tripped = False
+        self.trips = 0
+        self.max_silence = 0.0
+
+    def beat(self):
+        self.last_beat = self.watchdog.clock()
+        self.beats += 1
+
+    def close(self):
+        """The source is done (e.g. a replay finished); stop watching it."""
+        self.watchdog.unregister(self.name)
+
+
+class Watchdog:
+    """Trips a failsafe action when any registered source goes silent."""
+
+    def __init__(self, on_trip, deadline=0.05, period=None, clock=time.monotonic):
+        """
+        :param on_trip: Callable(source_name, silence_seconds) run on each trip
+        :param deadline: Default silence (s) after which a source trips
+        :param period: Check interval in seconds (default deadline / 5)
+        :param clock: Time source, shared with the heartbeats
+        """
+        self.on_trip = on_trip
+        self.deadline = deadline
+        self.period = period if period is not None else deadline / 5
+        self.clock = clock
+        self.sources = {}
+        self.trips = 0
+        self.reaction = LatencyHistogram()
+        self._lock = threading.Lock()
+        self._executor = FixedRateExecutor(lambda dt: self.check(), self.period, clock)
+        self._thread = None
+
+    def register(self, name, deadline=None):
+        """Start watching a source; it counts as alive from now."""
+        heartbeat = Heartbeat(self, name, deadline if deadline is not None else self.deadline)
+        with self._lock:
+            self.sources[name] = heartbeat
+        logging.info(f"🐕 Watching '{name}' (deadline {heartbeat.deadline * 1000:.0f} ms)")
+        return heartbeat
+
+    def unregister(self, name):
+        with self._lock:
+            self.sources.pop(name, None)
+
+    def check(self):
+        """Check every source once; returns the names that tripped on this check."""
+        now = self.clock()
+        with self._lock:
+            sources = list(self.sources.values())
+
+        expired = []
+        for source in sources:
+            silence = now - source.last_beat
+            if silence > source.max_silence:
+                source.max_silence = silence
+            if silence <= source.deadline:
+                if source.tripped:
+                    source.tripped = False
+                    logging.info(f"🐕 '{source.name}' is back, watchdog re-armed")
+                continue
+            if not source.tripped:
+                expired.append((source, silence))
+
+        if not expired:
+            return []
+
+        # One action for however many sources expired on the same check
+        source, silence = max(expired, key=lambda item: item[1])
+        for s, _ in expired:
+            s.tripped = True
+            s.trips += 1
+        self.trips += 1
+        logging.error(
+            f"🚨 Watchdog: '{source.name}' silent for {silence * 1000:.0f} ms, "
+            f"stopping the motors"
+        )
+        try:
+            self.on_trip(source.name, silence)
+        except Exception as e:
+            logging.error(f"❗ Watchdog trip action failed: {e}")
+        # Reaction: from the moment the deadline expired until the action returned
+        for s, _ in expired:
+            self.reaction.record(self.clock() - (s.last_beat + s.deadline))
+        return [s.name for s, _ in expired]
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._executor.reset()
+        self._thread = threading.Thread(target=self._executor.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._executor.stop()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def stats(self):
+        return {
+            "trips": self.trips,
+            "reaction": self.reaction.summary(),
+            "jitter": self._executor.stats.summary(),
+            "sources": {
+                s.name: {
+                    "beats": s.beats,
+                    "trips": s.trips,
+                    "max_silence_ms": s.max_silence * 1000,
+                    "tripped": s.tripped,
+                }
+                for s in list(self.sources.values())
+            },
+        }
+
+
+def failsafe(drive_motor=None, steering=None):
+    """
+    Trip action that cuts the drive PWM and centers the steering.
+
+    :param drive_motor: MotorController of the big motor (stop_immediately)
+    :param steering: SmallMotorController (center) or a continuous steering
+                     controller/process (set_target_angle to its center)
+    """
+
+    def trip(source, silence):
+        if drive_motor is not None:
+            drive_motor.stop_immediately()
+        if steering is not None:
+            if hasattr(steering, "center"):
+                steering.center()
+            else:
+                steering.set_target_angle(steering.center_angle)
+
+    return trip
+
+
+class SimulatedSource:
+    """A command source that beats every `interval` until it is killed."""
+
+    def __init__(self, watchdog, name, interval=0.01, deadline=None):
+        self.heartbeat = watchdog.register(name, deadline)
+        self.interval = interval
+        self.alive = True
+        self._next = watchdog.clock()
+
+    def tick(self, now):
+        if self.alive and now >= self._next:
+            self.heartbeat.beat()
+            self._next = now + self.interval
+
+
+def simulate(deadline=0.05, period=0.01, duration=3.0):
+    """
+    Three simulated sources on a simulated clock; the gamepad dies at 1 s and
+    comes back at 2 s. Reports when the failsafe fired relative to the last beat.
+    """
+    from Motor.simulation import SimulatedClock
+
+    clock = SimulatedClock()
+    fired = []
+    watchdog = Watchdog(lambda name, silence: fired.append((clock.now(), name)),
+                        deadline=deadline, period=period, clock=clock.now)
+    sources = {
+        name: SimulatedSource(watchdog, name, interval)
+        for name, interval in (("gamepad", 0.01), ("mqtt", 0.01), ("replay", 0.02))
+    }
+
+    step = 0.001
+    last_beat = None
+    while clock.now() < duration:
+        now = clock.now()
+        if 1.0 <= now < 2.0 and sources["gamepad"].alive:
+            sources["gamepad"].alive = False
+            last_beat = sources["gamepad"].heartbeat.last_beat
+        elif now >= 2.0:
+            sources["gamepad"].alive = True
+        for source in sources.values():
+            source.tick(now)
+        # The checker runs on its own schedule
+        if round(now / step) % round(period / step) == 0:
+            watchdog.check()
+        clock.sleep(step)
+
+    for when, name in fired:
+        print(f"🚨 '{name}' tripped at {when:.3f} s, {(when - last_beat) * 1000:.0f} ms "
+              f"after its last beat (deadline {deadline * 1000:.0f} ms + check period "
+              f"{period * 1000:.0f} ms)")
+    print(f"🐕 Trips: {watchdog.trips}, gamepad tripped now: "
+          f"{watchdog.sources['gamepad'].tripped}")
+
+
+def benchmark(deadline=0.03, trials=50):
+    """Real threads: kill a beating source and time how long until the motors are cut."""
+    from Motor.backends import SimulatedBackend
+    from Motor.config import MOTORS
+    from Motor.motor import MotorController
+
+    logging.getLogger().setLevel(logging.CRITICAL)  # one trip line per trial otherwise
+    backend = SimulatedBackend()
+    motor = MotorController(MOTORS["big_motor"], duty_step=0, backend=backend)
+    cut = threading.Event()
+
+    def trip(name, silence):
+        failsafe(motor)(name, silence)
+        cut.set()
+
+    watchdog = Watchdog(trip, deadline=deadline)
+    watchdog.start()
+    since_last_beat = []
+    for _ in range(trials):
+        heartbeat = watchdog.register("source")
+        motor.motor_control("forward", speed=40)
+        cut.clear()
+        end = time.monotonic() + 0.1
+        while time.monotonic() < end:
+            heartbeat.beat()
+            time.sleep(0.005)
+        last = heartbeat.last_beat  # the source dies here
+        cut.wait(1.0)
+        assert backend.duties[motor.rpwm_pin] == 0
+        since_last_beat.append(time.monotonic() - last)
+        watchdog.unregister("source")
+    watchdog.stop()
+    motor.cleanup()
+
+    ordered = sorted(since_last_beat)
+    reaction = watchdog.stats()["reaction"]
+    print(f"🐕 Deadline {deadline * 1000:.0f} ms, check period {watchdog.period * 1000:.0f} ms, "
+          f"{trials} trials")
+    print(f"⏱️ Last beat -> PWM cut: p50 {ordered[len(ordered) // 2] * 1000:.1f} ms, "
+          f"max {ordered[-1] * 1000:.1f} ms")
+    print(f"⏱️ Deadline expiry -> PWM cut: p50 {reaction['p50_ms']:.1f} ms, "
+          f"p99 {reaction['p99_ms']:.1f} ms, max {reaction['max_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Command-source watchdog")
+    parser.add_argument("--simulate", action="store_true", help="Simulated sources and clock")
+    parser.add_argument("--benchmark", action="store_true", help="Measure reaction time with threads")
+    parser.add_argument("--deadline", type=float, default=0.05, help="Silence deadline in seconds")
+    args = parser.parse_args()
+
+    if args.simulate:
+        simulate(deadline=args.deadline)
+    elif args.benchmark:
+        benchmark(deadline=args.deadline)
+    else:
+        parser.print_help()
@@ -0,0 +1,125 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+
+@dataclass
+class Reading:
+    """A value returned by a serial transaction, with its freshness."""
+
+    value: Any
+    timestamp: Optional[float]  # time.monotonic() when the value was received
+    is_fallback: bool = False  # True if this is an older value reused after a failure
+    attempts: int = 0
+
+    @property
+    def age(self) -> float:
+        """Seconds since the value was received (inf if never received)."""
+        if self.timestamp is None:
+            return float("inf")
+        return time.monotonic() - self.timestamp
+
+
+class SerialTransaction:
+    """
+    Request/response layer over a pyserial port where every request has a
+    deadline in milliseconds and a bounded number of retries.
+
+    A reply reader is any callable taking the remaining time in seconds and
+    returning the parsed value, or None on timeout. It may raise ValueError
+    for a corrupt reply, which counts as a failed attempt. When all attempts
+    fail the last good value is returned, flagged as a fallback, with its
+    original timestamp so callers can see how old it is.
+    """
+
+    def __init__(self, ser, max_retries: int = 1, lock=None):
+        self.ser = ser
+        self.max_retries = max_retries
+        self.lock = lock or threading.Lock()
+        self._last_good = {}
+
+        # Diagnostics
+        self.requests = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.bad_replies = 0
+        self.fallbacks = 0
+
+    def transact(
+        self,
+        request: Optional[bytes],
+        read_reply: Callable[[float], Any],
+        deadline_ms: float,
+        retries: Optional[int] = None,
+        key: str = "default",
+    ) -> Reading:
+        """
+        :param request: Bytes to write before each attempt (None to only listen)
+        :param read_reply: Callable(remaining_seconds) -> value or None
+        :param deadline_ms: Total time budget for all attempts
+        :param retries: Extra attempts after the first (default max_retries)
+        :param key: Which last-good value to fall back on
+        """
+        if retries is None:
+            retries = self.max_retries
+        deadline = time.monotonic() + deadline_ms / 1000.0
+        attempts = 0
+
+        with self.lock:
+            self.requests += 1
+            while attempts <= retries:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if attempts:
+                    self.retries += 1
+                attempts += 1
+                # Split what is left of the budget across the remaining attempts
+                budget = remaining / (retries - attempts + 2)
+
+                try:
+                    if request is not None:
+                        # Drop late replies to an earlier, timed-out request
+                        self.ser.reset_input_buffer()
+                        self.ser.write(request)
+                    value = read_reply(budget)
+                except ValueError:
+                    self.bad_replies += 1
+                    continue
+
+                if value is None:
+                    self.timeouts += 1
+                    continue
+
+                reading = Reading(value, time.monotonic(), False, attempts)
+                self._last_good[key] = reading
+                return reading
+
+            self.fallbacks += 1
+            last = self._last_good.get(key)
+            if last is None:
+                return Reading(None, None, True, attempts)
+            return Reading(last.value, last.timestamp, True, attempts)
+
+    def read_line(self, timeout: float) -> Optional[bytes]:
+        """Read one newline-terminated line within timeout seconds."""
+        previous = self.ser.timeout
+        self.ser.timeout = max(0.0, timeout)
+        try:
+            line = self.ser.read_until(b"\n")
+        finally:
+            # Later users of the port expect the timeout it was opened with
+            self.ser.timeout = previous
+        if not line.endswith(b"\n"):
+            return None
+        return line
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "bad_replies": self.bad_replies,
+            "fallbacks": self.fallbacks,
+        }
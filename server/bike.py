@@ -4,10 +4,13 @@ import time
 import threading
 from server.mqtt_handler import MQTTHandler
 from Motor.motor import MotorController
+from Motor.cruise import SpeedEstimator
+from Motor.watchdog import Watchdog, failsafe
 from server.config.motor_config import MOTORS  # Import motor-related config
 from Motor.smallmotor import SmallMotorController
 from Redis.redis_manager import RedisManager
 from GPS.GPS_reader import SerialGPSReader
+from GPS.route_calculation import haversine, track_distances
 from Route.route import RoutePlanner
 from Route.key import API_KEY
 from server.config.server_config import (
@@ -16,6 +19,8 @@ from server.config.server_config import (
     MQTT_TOPIC,
     BIKE_ID,
     REDIS_HOST,
+    GPS_UBX,
+    GPS_RATE_HZ,
 )  # Import server settings
 
 logging.basicConfig(level=logging.INFO)
@@ -24,12 +29,18 @@ logging.basicConfig(level=logging.INFO)
 class BikeClient:
     """Handles bike-specific MQTT message processing."""
 
-    def __init__(self, debug=True):
-        """Initializes the bike and sets up MQTT communication."""
+    def __init__(self, debug=True, watchdog_deadline=0.05):
+        """
+        Initializes the bike and sets up MQTT communication.
+        :param watchdog_deadline: Seconds without a live MQTT loop before the
+                                  drive is cut and the steering centered
+        """
         self.mqtt_handler = MQTTHandler(
             MQTT_BROKER, MQTT_PORT, MQTT_TOPIC, self.on_mqtt_message
         )
         self.big_motor = MotorController(MOTORS["big_motor"])
+        # GPS speed over ground fused with the drive duty, for cruise control
+        self.speed_estimator = SpeedEstimator()
         # self.small_motor = MotorController(
         #     MOTORS["small_motor"]
         # )  # this is only for testing when esp32 is not connected
@@ -37,11 +48,15 @@ class BikeClient:
 
         self.redis = RedisManager(REDIS_HOST, 6379)
         # to add, intialize the GPS reader
-        self.gps_reader = SerialGPSReader()
+        self.gps_reader = SerialGPSReader(ubx=GPS_UBX, rate_hz=GPS_RATE_HZ)
         self.start_gps_thread()
         self.route_planner = RoutePlanner(API_KEY)
         self.debug = debug
-        #
+        # Routes run on their own thread so the MQTT loop keeps beating
+        self._navigation = None
+        self._abort_navigation = threading.Event()
+        self._failsafe = failsafe(self.big_motor, self.small_motor)
+        self.watchdog = Watchdog(self.on_watchdog_trip, deadline=watchdog_deadline)
 
     def on_mqtt_message(self, client, userdata, message):
         """Handles incoming MQTT messages."""
@@ -76,12 +91,18 @@ class BikeClient:
                 # self.small_motor.motor_control("right", time_duration=time_duration)
                 self.small_motor.turn_right_by(turning_angle)
 
+            case "cruise":
+                target_speed = payload.get("target_speed", self.FORWARD_SPEED_MPS)
+                logging.info(f"Cruising at {target_speed} m/s")
+                self.big_motor.cruise(target_speed, self.speed_estimator)
+
             case "center":
                 logging.info("Centering")
                 self.small_motor.center()
 
             case "stop":
                 logging.info("Stopping")
+                self._abort_navigation.set()
                 self.big_motor.motor_control("stop", 0)
                 self.small_motor.stop()
 
@@ -92,32 +113,60 @@ class BikeClient:
                     logging.info(
                         f"🧭 Received navigate command:\nStart: {start}\nDestination: {destination}"
                     )
-                    self.handle_navigation(start, destination)
+                    self.start_navigation(start, destination)
                 else:
                     logging.warning(
                         "⚠️ 'navigate' command missing start or destination coordinates."
                     )
 
+    def on_watchdog_trip(self, source, silence):
+        """Abort the route before cutting the drive, so it can't restart it."""
+        self._abort_navigation.set()
+        self._failsafe(source, silence)
+
     def acknowledge_connection(self):
         """Publishes an acknowledgment message to Redis."""
         self.redis.acknowledge_connection(BIKE_ID)
 
     def start(self):
         """Starts the MQTT client to listen for messages."""
+        self.mqtt_handler.heartbeat = self.watchdog.register("mqtt")
+        self.watchdog.start()
         self.mqtt_handler.start()
 
+    def start_navigation(self, start, destination):
+        """Run handle_navigation in the background, replacing any route in progress."""
+        # Each route has its own abort event, so an old route winding down
+        # never blocks the MQTT loop and never sees the new route's event
+        self._abort_navigation.set()
+        self._abort_navigation = threading.Event()
+        self._navigation = threading.Thread(
+            target=self.handle_navigation,
+            args=(start, destination, self._abort_navigation),
+            daemon=True,
+        )
+        self._navigation.start()
+
     def start_gps_thread(self):
+        # Cruise control sees the speed of every accepted fix from the drain thread;
+        # Redis gets the newest position once a second
+        self.gps_reader.add_listener(self.speed_estimator.update_fix)
+
         def gps_loop():
+            last_sent = None
             while True:
-                data = self.gps_reader.read_data()
-                if data:
+                reading = self.gps_reader.latest()
+                if reading and reading.timestamp != last_sent:
+                    data = reading.value
                     payload = {
                         "bike_id": BIKE_ID,
                         "latitude": data.get("latitude"),
                         "longitude": data.get("longitude"),
                         "timestamp": time.time(),
+                        "fix_age": reading.age,
                     }
                     self.redis.push_gps_data(BIKE_ID, payload)
+                    last_sent = reading.timestamp
                 time.sleep(1)
 
         gps_thread = threading.Thread(target=gps_loop, daemon=True)
@@ -126,14 +175,35 @@ class BikeClient:
     def estimate_duration(self, distance_meters):
         return distance_meters / self.FORWARD_SPEED_MPS
 
+    def drive_forward(self, speed=30, abort=None):
+        """
+        Drive at FORWARD_SPEED_MPS under cruise control when GPS speed is
+        available, else at a fixed duty as before.
+        :param abort: Route abort event; if it is set by the time the drive is
+                      on (e.g. the watchdog tripped meanwhile), the drive is cut
+        """
+        if abort is not None and abort.is_set():
+            return
+        if self.speed_estimator.stale:
+            logging.warning(f"⚠️ No GPS speed, driving open-loop at {speed}%")
+            self.big_motor.motor_control("forward", speed=speed)
+        else:
+            self.big_motor.cruise(self.FORWARD_SPEED_MPS, self.speed_estimator)
+        # The abort is set before the failsafe stops the motor, so a drive
+        # that raced past the check above is caught here
+        if abort is not None and abort.is_set():
+            self.big_motor.stop_immediately()
+
     TURN_ANGLE = 60  # degrees
     FORWARD_SPEED_MPS = 0.8  # meters/second
     TURN_DURATION_SEC = 5  # time to keep turn before centering (in seconds)
 
-    def execute_turn(self, direction, angle=None, speed=30, forward_duration=None):
+    def execute_turn(self, direction, angle=None, speed=30, forward_duration=None, abort=None):
         """
         Executes a turn by steering the small motor, moving forward, then centering.
+        :param abort: Route abort event; cuts the forward drive short
         """
+        abort = abort or threading.Event()
         if angle is None:
             angle = self.TURN_ANGLE
         if forward_duration is None:
@@ -155,17 +225,54 @@ class BikeClient:
             f"🚴 Moving forward during turn for {forward_duration:.2f} seconds at speed {speed}"
         )
         if not self.debug:
-            self.big_motor.motor_control("forward", speed)
-            time.sleep(forward_duration)
-            self.big_motor.motor_control("stop", 0)
+            self.drive_forward(speed, abort)
+            abort.wait(forward_duration)
+            # Decelerate fully before steering back to center
+            self.big_motor.graceful_stop().wait()
+            if abort.is_set():
+                return
 
         logging.info("🎯 Centering front wheel")
         if not self.debug:
             self.small_motor.center()
             time.sleep(0.5)
 
-    def handle_navigation(self, start, destination):
-        """Handles route planning using start and destination coordinates."""
+    ARRIVE_RADIUS = 5.0  # meters from a step's end that count as reaching it
+
+    def ride_step(self, step, duration, abort, period=0.2):
+        """
+        Keep riding until GPS shows the step's end has been reached or passed.
+        Without a fresh fix this is the old timed step; with one, the step may
+        take up to twice the estimated duration.
+        """
+        length = haversine(step.start_lat, step.start_lng, step.end_lat, step.end_lng)
+        started = time.monotonic()
+        while not abort.is_set():
+            elapsed = time.monotonic() - started
+            fix = self.gps_reader.read_data(max_age=2.0)
+            if fix is None or fix.get("latitude") is None:
+                if elapsed >= duration:
+                    return
+            else:
+                lat, lon = fix["latitude"], fix["longitude"]
+                along, cross = track_distances(
+                    lat, lon, step.start_lat, step.start_lng, step.end_lat, step.end_lng
+                )
+                remaining = haversine(lat, lon, step.end_lat, step.end_lng)
+                if along >= length or remaining <= self.ARRIVE_RADIUS:
+                    logging.info(f"📍 Step end reached ({remaining:.1f} m, {cross:+.1f} m off track)")
+                    return
+                if elapsed >= 2 * duration:
+                    logging.warning(f"⚠️ Step end not reached, {remaining:.1f} m short")
+                    return
+            abort.wait(period)
+
+    def handle_navigation(self, start, destination, abort=None):
+        """
+        Handles route planning using start and destination coordinates.
+        :param abort: Event that ends the route between and during steps
+        """
+        abort = abort or threading.Event()
         try:
             origin = {"latitude": start["lat"], "longitude": start["lon"]}
             dest = {"latitude": destination["lat"], "longitude": destination["lon"]}
@@ -174,6 +281,9 @@ class BikeClient:
             steps = self.route_planner.get_steps()
             print(steps)
             for idx, step in enumerate(steps, 1):
+                if abort.is_set():
+                    logging.info("🛑 Navigation aborted")
+                    break
                 logging.info(f"[Step {idx}] {step.instruction} ({step.distance} m)")
                 logging.info(f"    Start: ({step.start_lat}, {step.start_lng})")
                 logging.info(f"    End:   ({step.end_lat}, {step.end_lng})")
@@ -181,9 +291,9 @@ class BikeClient:
                 maneuver = step.maneuver.upper()
                 print(maneuver)
                 if "LEFT" in maneuver:
-                    self.execute_turn("LEFT", self.TURN_ANGLE)
+                    self.execute_turn("LEFT", self.TURN_ANGLE, abort=abort)
                 elif "RIGHT" in maneuver:
-                    self.execute_turn("RIGHT", self.TURN_ANGLE)
+                    self.execute_turn("RIGHT", self.TURN_ANGLE, abort=abort)
                 elif "DEPART" in maneuver or maneuver == "NAME_CHANGE":
                     logging.info("⬆️ Going STRAIGHT")
 
@@ -191,9 +301,10 @@ class BikeClient:
                 logging.info(f"🚴 Moving forward for approx {duration:.2f} seconds\n")
 
                 if not self.debug:
-                    self.big_motor.motor_control("forward", speed=30)
-                    time.sleep(duration)
-                    self.big_motor.motor_control("stop", speed=0)
+                    self.drive_forward(speed=30, abort=abort)
+                    self.ride_step(step, duration, abort)
+                    # The next step's command would cut a running ramp short
+                    self.big_motor.graceful_stop().wait()
                     time.sleep(1)
 
         except Exception as e:
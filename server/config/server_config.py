@@ -5,3 +5,7 @@ BIKE_ID = "bike1"
 MQTT_TOPIC = f"bike/{BIKE_ID}"
 CONNECT_SERVER_URL = "http://3.15.51.67/bike-response"
 REDIS_HOST = "3.15.51.67"
+
+# GPS: switch the BN-220 to 10 Hz UBX NAV-PVT at startup (falls back to NMEA)
+GPS_UBX = True
+GPS_RATE_HZ = 10
@@ -1,5 +1,8 @@
 import paho.mqtt.client as mqtt
 import logging
+import queue
+import threading
+import time
 from typing import Callable
 
 logging.basicConfig(level=logging.INFO)
@@ -7,33 +10,91 @@ logging.basicConfig(level=logging.INFO)
 class MQTTHandler:
     """Handles MQTT client setup, connections, and message reception."""
 
-    def __init__(self, broker: str, port: int, topic: str, on_message_callback: Callable):
+    def __init__(self, broker: str, port: int, topic: str, on_message_callback: Callable,
+                 heartbeat=None, loop_timeout: float = 0.01, keepalive: int = 2):
         """
         Initializes the MQTT connection.
         :param broker: MQTT Broker address
         :param port: MQTT Broker port
         :param topic: MQTT topic to subscribe to
         :param on_message_callback: Callback function for handling messages
+        :param heartbeat: Watchdog heartbeat (Motor/watchdog.py), beaten by the
+                          network loop while the broker connection is up
+        :param loop_timeout: Seconds each network loop pass may block
+        :param keepalive: MQTT keepalive in seconds. A link that dropped without
+                          a FIN is only noticed when a ping goes unanswered,
+                          within about two keepalives; the heartbeat stops then.
         """
         self.broker = broker
         self.port = port
         self.topic = topic
+        self.heartbeat = heartbeat
+        self.loop_timeout = loop_timeout
+        self.keepalive = keepalive
+        self.connected = False
         self.client = mqtt.Client()
 
-        # Attach callback for message handling
-        self.client.on_message = on_message_callback
+        # Handlers run on their own thread: a slow one (Redis, serial reads)
+        # must not stall the network loop, which beats the heartbeat
+        self.on_message_callback = on_message_callback
+        self._messages = queue.Queue()
+        self._worker = threading.Thread(target=self._handle_messages, daemon=True)
+        self._worker.start()
+        self.client.on_message = self._enqueue
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
 
         try:
-            self.client.connect(self.broker, self.port, 60)
+            self.client.connect(self.broker, self.port, self.keepalive)
             self.client.subscribe(self.topic)
             logging.info(f"Connected to MQTT Broker at {self.broker}:{self.port}, subscribed to {self.topic}")
         except Exception as e:
             logging.error(f"Failed to connect to MQTT Broker: {e}")
 
+    def _on_connect(self, client, userdata, flags, rc):
+        # Subscriptions do not survive a reconnect
+        if rc == 0:
+            self.connected = True
+            client.subscribe(self.topic)
+
+    def _on_disconnect(self, client, userdata, rc):
+        self.connected = False
+        if rc != 0:
+            logging.warning(f"⚠️ Lost MQTT connection (rc={rc})")
+
+    def _enqueue(self, client, userdata, message):
+        self._messages.put((client, userdata, message))
+
+    def _handle_messages(self):
+        """Run the message callback for each message, in arrival order."""
+        while True:
+            client, userdata, message = self._messages.get()
+            try:
+                self.on_message_callback(client, userdata, message)
+            except Exception as e:
+                logging.error(f"❗ MQTT message handler failed: {e}")
+
     def start(self):
         """Starts the MQTT loop to keep listening for messages."""
         logging.info("Listening for MQTT messages...")
-        self.client.loop_forever()
+        if self.heartbeat is None:
+            self.client.loop_forever()
+            return
+
+        # Like loop_forever, but the loop itself beats the heartbeat while the
+        # broker connection is up. Handlers run elsewhere, so only a stuck
+        # network loop or a lost connection goes silent.
+        while True:
+            rc = self.client.loop(timeout=self.loop_timeout)
+            if rc == mqtt.MQTT_ERR_SUCCESS:
+                if self.connected:
+                    self.heartbeat.beat()
+                continue
+            time.sleep(1.0)
+            try:
+                self.client.reconnect()
+            except Exception as e:
+                logging.error(f"Failed to reconnect to MQTT Broker: {e}")
 
     def publish(self, topic: str, message: str):
         """Publishes a message to a specific topic."""